@@ -1,9 +1,22 @@
 import os
+import threading
 from flask import Flask
 from dotenv import load_dotenv
 from App.config import config_by_name
-from App.extensions import db, init_cors
+from App.commands import register_commands
+from App.extensions import (
+    db,
+    init_cors,
+    init_db,
+    init_events,
+    init_jobs,
+    init_json,
+    init_scheduler,
+    init_uploads,
+)
+from App.extensions.indexes import ensure_indexes
 from App.routes import all_blueprints
+from App.schedule import register_schedule
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
 
@@ -11,6 +24,13 @@ load_dotenv()
 jwt = JWTManager()
 
 
+def build_indexes(app):
+    """Run ensure_indexes() and log the indexes it could not build."""
+    with app.app_context():
+        for collection, index, error in ensure_indexes():
+            app.logger.error("Index %s on %s not built: %s", index, collection, error)
+
+
 def create_app(config_name="development"):
     app = Flask(__name__)
     # Load configuration-
@@ -18,9 +38,22 @@ def create_app(config_name="development"):
     app.config["JWT_SECRET_KEY"] = os.getenv("JWT")
 
     # Initialize extensions
+    init_json(app)
+    init_uploads(app)
     init_cors(app)
+    init_db(app)
     app.db = db  # Add the MongoDB client to the app for easy access
+    if app.config["MONGO_ENSURE_INDEXES"]:
+        # In the background, so workers boot while MongoDB is unreachable
+        threading.Thread(
+            target=build_indexes, args=(app,), name="ensure-indexes", daemon=True
+        ).start()
+    init_jobs(app)
+    init_events(app)
+    init_scheduler(app)
     jwt.init_app(app)
     for bp in all_blueprints:
         app.register_blueprint(bp, url_prefix="/api")
+    register_commands(app)
+    register_schedule(app)
     return app
@@ -0,0 +1,98 @@
+import click
+from App.extensions.db import db, get_collection, get_collection_tasks
+from App.extensions.indexes import check_query_plans, ensure_indexes
+from App.models.efficiency_model import EfficiencyModel
+from App.models.efficiency_summary import backfill_summary_keys, slim_summaries
+from App.models.order_changes import prune_tombstones, revision_fields
+from App.models.order_import import normalize_order_keys
+from App.models.task_store import backfill_task_times, migrate_embedded_tasks
+
+
+def register_commands(app):
+    """Attach the maintenance commands to ``flask``."""
+
+    @app.cli.command("migrate-tasks")
+    @click.option("--batch-size", default=500, show_default=True)
+    def migrate_tasks(batch_size):
+        """Move embedded Task arrays into the task collection."""
+        orders, tasks = migrate_embedded_tasks(
+            get_collection(), get_collection_tasks(), batch_size=batch_size
+        )
+        click.echo(f"Migrated {tasks} tasks from {orders} orders.")
+        click.echo("Set TASK_STORAGE=collection to serve them.")
+
+    @app.cli.command("backfill-task-times")
+    @click.option("--batch-size", default=500, show_default=True)
+    def backfill_times(batch_size):
+        """Store task times as dates and add duration_seconds."""
+        converted = backfill_task_times(
+            get_collection(), get_collection_tasks(), batch_size=batch_size
+        )
+        click.echo(f"Converted {converted} tasks.")
+
+    @app.cli.command("calculate-efficiency")
+    @click.option(
+        "--incremental", is_flag=True, help="Only write results that changed."
+    )
+    @click.option("--batch-size", default=1000, show_default=True)
+    def calculate_efficiency(incremental, batch_size):
+        """Recompute KokkolaEfficiency from Kokkola."""
+        processed = EfficiencyModel(db).calculate_efficiency(
+            incremental=incremental, batch_size=batch_size
+        )
+        click.echo(f"Processed {processed} documents.")
+
+    @app.cli.command("backfill-revisions")
+    def backfill_revisions():
+        """Stamp a sync revision on orders written before revisions existed."""
+        result = get_collection().update_many(
+            {"_rev": {"$exists": False}}, {"$set": revision_fields()}
+        )
+        click.echo(f"Stamped {result.modified_count} orders.")
+
+    @app.cli.command("normalize-order-keys")
+    def normalize_keys():
+        """Store numeric Sales order/Item number/Reference number values as text."""
+        converted = normalize_order_keys(get_collection(), revision_fields())
+        click.echo(f"Converted {converted} order key values.")
+
+    @app.cli.command("prune-tombstones")
+    def prune_tombstones_command():
+        """Delete order tombstones older than the sync retention."""
+        click.echo(f"Pruned {prune_tombstones()} tombstones.")
+
+    @app.cli.command("backfill-summary-keys")
+    def backfill_keys():
+        """Add site/kind/iso_year/iso_week keys to efficiency summaries."""
+        updated, skipped = backfill_summary_keys()
+        for name, new_name in skipped:
+            click.echo(f"Skipped {name}: {new_name} already exists", err=True)
+        click.echo(f"Updated {updated} summaries.")
+
+    @app.cli.command("slim-summaries")
+    def slim_summaries_command():
+        """Keep only the Efficiency view fields on stored summary items."""
+        click.echo(f"Rewrote {slim_summaries()} summaries.")
+
+    @app.cli.command("ensure-indexes")
+    def ensure_indexes_command():
+        """Create the indexes declared in App/extensions/indexes.py."""
+        failures = ensure_indexes()
+        for collection, index, error in failures:
+            click.echo(f"{collection}.{index}: {error}", err=True)
+        if failures:
+            raise click.ClickException(f"{len(failures)} indexes were not built.")
+        click.echo("Indexes are up to date.")
+
+    @app.cli.command("check-indexes")
+    def check_indexes():
+        """Fail when a hot route's query plan is a collection scan."""
+        scans = check_query_plans()
+        for name, collection in scans:
+            click.echo(f"COLLSCAN: {name} on {collection}", err=True)
+        if scans:
+            raise click.ClickException(
+                f"{len(scans)} hot queries scan a whole collection; "
+                "run `flask ensure-indexes`."
+            )
+        click.echo("All hot queries use an index.")
@@ -4,11 +4,58 @@ from dotenv import load_dotenv
 load_dotenv()
 
 
+def _int_env(name, default=None):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _write_concern(value):
+    """``w`` option: a node count or a tag such as "majority"."""
+    return int(value) if value and value.isdigit() else value
+
+
 class Config:
     """Base configuration"""
 
     MONGO_URI = os.getenv("MONGO_URI")
     DATABASE_NAME = os.getenv("DATABASE_NAME")
+    # "embedded" keeps tasks in each order's Task array,
+    # "collection" stores one document per task (see `flask migrate-tasks`)
+    TASK_STORAGE = os.getenv("TASK_STORAGE", "embedded")
+    # Threads running imports and efficiency recomputes in the background
+    JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+    # GET /efficiency queues a rebuild when the summary is older than this (0: never)
+    EFFICIENCY_REFRESH_SECONDS = int(os.getenv("EFFICIENCY_REFRESH_SECONDS", "900"))
+    # Live section updates: "auto" uses change streams when the server
+    # supports them and polls the department counters otherwise
+    LIVE_UPDATES = os.getenv("LIVE_UPDATES", "auto")
+    LIVE_POLL_SECONDS = float(os.getenv("LIVE_POLL_SECONDS", "2"))
+    # /orders/changes re-sends writes younger than this, since a lower
+    # revision may still be committing
+    SYNC_LAG_SECONDS = float(os.getenv("SYNC_LAG_SECONDS", "5"))
+    # Weekly rollover and nightly recomputation (App/schedule.py), started
+    # by the serving entry points; one worker runs each occurrence
+    SCHEDULER = os.getenv("SCHEDULER", "0") == "1"
+    SCHEDULER_POLL_SECONDS = float(os.getenv("SCHEDULER_POLL_SECONDS", "60"))
+    # Largest request body accepted; uploads are held in memory while queued
+    MAX_CONTENT_LENGTH = _int_env("MAX_UPLOAD_BYTES", 64 * 1024 * 1024)
+    # MongoClient settings, applied per process when the client is created.
+    # The pool should cover the server threads plus JOB_WORKERS.
+    MONGO_MAX_POOL_SIZE = _int_env("MONGO_MAX_POOL_SIZE", 20)
+    MONGO_MIN_POOL_SIZE = _int_env("MONGO_MIN_POOL_SIZE", 0)
+    MONGO_MAX_IDLE_TIME_MS = _int_env("MONGO_MAX_IDLE_TIME_MS")
+    MONGO_CONNECT_TIMEOUT_MS = _int_env("MONGO_CONNECT_TIMEOUT_MS", 5000)
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = _int_env(
+        "MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000
+    )
+    MONGO_SOCKET_TIMEOUT_MS = _int_env("MONGO_SOCKET_TIMEOUT_MS")
+    MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primary")
+    MONGO_WRITE_CONCERN = _write_concern(os.getenv("MONGO_WRITE_CONCERN"))
+    # e.g. "zstd,snappy,zlib"; zstd and snappy need their extra packages
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS")
+    # Create the indexes in App/extensions/indexes.py in the background when
+    # the app starts; otherwise run `flask ensure-indexes` after deploying
+    MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "1") == "1"
     DEBUG = False
 
 
@@ -21,6 +68,14 @@ class DevelopmentConfig(Config):
 class ProductionConfig(Config):
     """Production configuration."""
 
+    MONGO_MAX_POOL_SIZE = _int_env("MONGO_MAX_POOL_SIZE", 50)
+    MONGO_MIN_POOL_SIZE = _int_env("MONGO_MIN_POOL_SIZE", 2)
+    MONGO_MAX_IDLE_TIME_MS = _int_env("MONGO_MAX_IDLE_TIME_MS", 300000)
+    MONGO_SOCKET_TIMEOUT_MS = _int_env("MONGO_SOCKET_TIMEOUT_MS", 30000)
+    MONGO_WRITE_CONCERN = _write_concern(os.getenv("MONGO_WRITE_CONCERN", "majority"))
+    # zlib ships with Python, so it needs no extra dependency
+    MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+    SCHEDULER = os.getenv("SCHEDULER", "1") == "1"
     DEBUG = False
 
 
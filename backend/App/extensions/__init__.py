@@ -1,5 +1,20 @@
-from .db import db
+from .db import db, init_db
 from .cors import init_cors
+from .events import init_events
+from .jobs import init_jobs
+from .json_provider import init_json
+from .uploads import init_uploads
+from .scheduler import init_scheduler, start_scheduler
 
 # Export extensions for easy import
-__all__ = ["db", "init_cors"]
+__all__ = [
+    "db",
+    "init_cors",
+    "init_db",
+    "init_events",
+    "init_jobs",
+    "init_json",
+    "init_scheduler",
+    "init_uploads",
+    "start_scheduler",
+]
@@ -1,5 +1,8 @@
+from flask import current_app, has_app_context
 from pymongo import MongoClient
+from werkzeug.local import LocalProxy
 import os
+import threading
 
 # Load MongoDB configuration from environment variables
 mongo_uri = os.getenv("MONGO_URI")
@@ -7,29 +10,130 @@ database_name = os.getenv("DATABASE_NAME")
 main_collection_name = os.getenv("COLLECTION_NAME")
 efficiency_collection_name = os.getenv("EFFICIENCY_COLLECTION_NAME")
 codes_collection_name = os.getenv("CODES_COLLECTION_NAME")
+counters_collection_name = os.getenv("COUNTERS_COLLECTION_NAME", "Counters")
+tasks_collection_name = os.getenv("TASKS_COLLECTION_NAME", "Tasks")
+jobs_collection_name = os.getenv("JOBS_COLLECTION_NAME", "Jobs")
+efficiency_items_collection_name = os.getenv(
+    "EFFICIENCY_ITEMS_COLLECTION_NAME", "EfficiencyItems"
+)
+tombstones_collection_name = os.getenv("TOMBSTONES_COLLECTION_NAME", "OrderTombstones")
 
-if not mongo_uri:
-    raise ValueError("MONGO_URI is not set in the environment variables.")
-if not database_name:
-    raise ValueError("DATABASE_NAME is not set in the environment variables.")
+# Config keys mapped to MongoClient options; unset (None) keys are left out
+CLIENT_OPTIONS = {
+    "MONGO_MAX_POOL_SIZE": "maxPoolSize",
+    "MONGO_MIN_POOL_SIZE": "minPoolSize",
+    "MONGO_MAX_IDLE_TIME_MS": "maxIdleTimeMS",
+    "MONGO_CONNECT_TIMEOUT_MS": "connectTimeoutMS",
+    "MONGO_SERVER_SELECTION_TIMEOUT_MS": "serverSelectionTimeoutMS",
+    "MONGO_SOCKET_TIMEOUT_MS": "socketTimeoutMS",
+    "MONGO_READ_PREFERENCE": "readPreference",
+    "MONGO_WRITE_CONCERN": "w",
+    "MONGO_COMPRESSORS": "compressors",
+}
 
-client = MongoClient(mongo_uri)
-db = client[database_name]
+_client = None
+_client_pid = None
+_client_options = {}
+_client_lock = threading.Lock()
+# Collection cache used outside an app context (CLI helpers, worker threads)
+_extensions = {}
 
-# Default collection (can be replaced or accessed dynamically)
-default_collection = db[main_collection_name]
+
+def init_db(app):
+    """
+    Take the MongoClient options from the app config.
+
+    No connection is made here: the client is created by the first query
+    in each process, so pre-fork servers never share a pool across workers.
+    """
+    global _client, _client_options
+    options = {
+        option: app.config[key]
+        for key, option in CLIENT_OPTIONS.items()
+        if app.config.get(key) is not None
+    }
+    with _client_lock:
+        if options != _client_options:
+            _client_options = options
+            _client = None
+            _extensions.clear()
+    app.extensions["mongo_collections"] = (os.getpid(), {})
+
+
+def get_client():
+    """Return this process's MongoClient, creating it on first use."""
+    global _client, _client_pid
+    pid = os.getpid()
+    if _client is None or _client_pid != pid:
+        with _client_lock:
+            # A client inherited through fork() must not be used by the child
+            if _client is None or _client_pid != pid:
+                if not mongo_uri:
+                    raise ValueError(
+                        "MONGO_URI is not set in the environment variables."
+                    )
+                _client = MongoClient(mongo_uri, connect=False, **_client_options)
+                _client_pid = pid
+    return _client
+
+
+def get_database():
+    """Return the application database."""
+    if not database_name:
+        raise ValueError("DATABASE_NAME is not set in the environment variables.")
+    return get_client()[database_name]
+
+
+# Resolved on every use, so importing the app never touches the network
+db = LocalProxy(get_database)
+
+
+def _cached_collection(name):
+    extensions = current_app.extensions if has_app_context() else _extensions
+    pid, collections = extensions.get("mongo_collections", (None, None))
+    if pid != os.getpid():
+        pid, collections = extensions["mongo_collections"] = (os.getpid(), {})
+    if name not in collections:
+        collections[name] = get_database()[name]
+    return collections[name]
 
 
 # Function to get any collection dynamically
 def get_collection(name=None):
     """Fetch a MongoDB collection by name."""
-    return db[name or main_collection_name]
+    return _cached_collection(name or main_collection_name)
 
 
 def get_collection_koodit(name=None):
     """Fetch a MongoDB collection by name."""
-    return db[name or codes_collection_name]
+    return _cached_collection(name or codes_collection_name)
+
 
 def get_collection_efficiency(name=None):
     """Fetch a MongoDB collection by name."""
-    return db[name or efficiency_collection_name]
+    return _cached_collection(name or efficiency_collection_name)
+
+
+def get_collection_efficiency_items(name=None):
+    """Fetch the collection holding the items of oversized summaries."""
+    return _cached_collection(name or efficiency_items_collection_name)
+
+
+def get_collection_counters(name=None):
+    """Fetch the collection holding change counters."""
+    return _cached_collection(name or counters_collection_name)
+
+
+def get_collection_tasks(name=None):
+    """Fetch the collection holding one document per task."""
+    return _cached_collection(name or tasks_collection_name)
+
+
+def get_collection_jobs(name=None):
+    """Fetch the collection holding background job state."""
+    return _cached_collection(name or jobs_collection_name)
+
+
+def get_collection_tombstones(name=None):
+    """Fetch the collection recording deleted orders for delta sync."""
+    return _cached_collection(name or tombstones_collection_name)
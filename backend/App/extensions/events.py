@@ -0,0 +1,155 @@
+import logging
+import queue
+import threading
+import time
+from pymongo.errors import OperationFailure, PyMongoError
+from App.extensions.db import get_collection, get_collection_tasks
+from App.models.order_changes import get_osasto_versions
+
+logger = logging.getLogger(__name__)
+# Seconds to wait before re-opening a change stream that failed
+RETRY_SECONDS = 5
+
+
+class OrderEvents:
+    """
+    Process-wide fan-out of order changes to live subscribers.
+
+    One background thread per process follows a MongoDB change stream on
+    the orders and tasks collections. Servers without change streams
+    (standalone mongod) fall back to polling the department counters.
+    Subscribers receive ``(order_id, targeted)`` messages on a queue; an
+    ``order_id`` of None asks them to re-read the whole department.
+    """
+
+    def __init__(self, mode="auto", poll_seconds=2.0):
+        self.mode = mode
+        self.poll_seconds = poll_seconds
+        self._subscribers = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, osasto):
+        """Register a subscriber for one department and return its queue."""
+        updates = queue.Queue()
+        with self._lock:
+            self._subscribers[updates] = osasto
+            # Started lazily so each (forked) worker process runs its own
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="order-events", daemon=True
+                )
+                self._thread.start()
+        return updates
+
+    def unsubscribe(self, updates):
+        with self._lock:
+            self._subscribers.pop(updates, None)
+
+    def publish(self, osasto, order_id=None):
+        """
+        Notify the subscribers of ``osasto``, or every subscriber when None.
+
+        Untargeted messages only matter to subscribers already showing the
+        order, e.g. to drop a row that moved to another department.
+        """
+        with self._lock:
+            targets = [
+                updates
+                for updates, subscribed in self._subscribers.items()
+                if osasto is None or subscribed == osasto
+            ]
+        for updates in targets:
+            updates.put((order_id, osasto is not None))
+
+    def _subscribed_osastot(self):
+        with self._lock:
+            return set(self._subscribers.values())
+
+    def _run(self):
+        if self.mode != "poll":
+            try:
+                self._watch()
+                return
+            except OperationFailure as e:
+                if self.mode == "changestream":
+                    raise
+                logger.info("Change streams unavailable (%s), polling instead", e)
+        self._poll()
+
+    def _watch(self):
+        orders = get_collection()
+        tasks = get_collection_tasks()
+        pipeline = [
+            {"$match": {"ns.coll": {"$in": [orders.name, tasks.name]}}},
+            {
+                "$project": {
+                    "operationType": 1,
+                    "ns": 1,
+                    "documentKey": 1,
+                    "fullDocument.Osasto": 1,
+                    "fullDocument.order_id": 1,
+                    "updateDescription.updatedFields.Osasto": 1,
+                }
+            },
+        ]
+        resume_token = None
+        opened = False
+        while True:
+            try:
+                with orders.database.watch(
+                    pipeline, full_document="updateLookup", resume_after=resume_token
+                ) as stream:
+                    opened = True
+                    for change in stream:
+                        resume_token = stream.resume_token
+                        self._dispatch(change, orders.name)
+            except OperationFailure:
+                if not opened:
+                    raise
+                logger.exception("Order change stream failed, resuming")
+                time.sleep(RETRY_SECONDS)
+            except PyMongoError:
+                logger.exception("Order change stream failed, resuming")
+                time.sleep(RETRY_SECONDS)
+
+    def _dispatch(self, change, orders_name):
+        document = change.get("fullDocument") or {}
+        if change["ns"]["coll"] != orders_name:
+            # Task changes never move an order between departments
+            self.publish(None, document.get("order_id"))
+            return
+
+        order_id = change["documentKey"]["_id"]
+        moved = "Osasto" in change.get("updateDescription", {}).get(
+            "updatedFields", {}
+        ) or change["operationType"] in ("delete", "replace")
+        if document.get("Osasto") is not None:
+            self.publish(document["Osasto"], order_id)
+        if moved:
+            self.publish(None, order_id)
+
+    def _poll(self):
+        versions = {}
+        while True:
+            time.sleep(self.poll_seconds)
+            osastot = self._subscribed_osastot()
+            if not osastot:
+                continue
+            try:
+                current = get_osasto_versions(osastot)
+            except PyMongoError:
+                logger.exception("Polling department counters failed")
+                continue
+            for osasto, version in current.items():
+                if versions.get(osasto) != version:
+                    versions[osasto] = version
+                    self.publish(osasto)
+
+
+def init_events(app):
+    """Attach the live order change feed to the app."""
+    app.extensions["order_events"] = OrderEvents(
+        mode=app.config.get("LIVE_UPDATES", "auto"),
+        poll_seconds=app.config.get("LIVE_POLL_SECONDS", 2.0),
+    )
@@ -0,0 +1,250 @@
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure, PyMongoError
+from App.extensions.db import (
+    get_collection,
+    get_collection_efficiency,
+    get_collection_efficiency_items,
+    get_collection_jobs,
+    get_collection_koodit,
+    get_collection_tasks,
+    get_collection_tombstones,
+)
+
+# Finished jobs are removed by MongoDB after this many seconds
+JOB_RETENTION_SECONDS = 7 * 24 * 3600
+# Collections read and written by EfficiencyModel
+EFFICIENCY_SOURCE = "Kokkola"
+EFFICIENCY_TARGET = "KokkolaEfficiency"
+
+
+def _named(name):
+    return lambda: get_collection(name)
+
+
+# Every index the backend relies on, per collection. Indexes are matched
+# by name, so changing the keys of an existing index needs a new name.
+INDEXES = {
+    get_collection: [
+        # /osasto/<n>, sorted by queue position
+        IndexModel(
+            [("Osasto", ASCENDING), ("Jononumero", ASCENDING)], name="osasto_jononumero"
+        ),
+        # /getData?order=Jononumero keyset pages
+        IndexModel(
+            [("Jononumero", ASCENDING), ("_id", ASCENDING)], name="jononumero_id"
+        ),
+        # Worker history with embedded tasks; {_id, Task.group_id} uses _id
+        IndexModel("Task.workerName", name="task_worker"),
+        IndexModel(
+            [("Task.section", ASCENDING), ("Task.start", ASCENDING)],
+            name="task_section_start",
+        ),
+        # Import upserts
+        IndexModel(
+            [
+                ("Sales order", ASCENDING),
+                ("Item number", ASCENDING),
+                ("Reference number", ASCENDING),
+            ],
+            name="order_key",
+        ),
+        # /orders/changes
+        IndexModel([("_rev", ASCENDING), ("_id", ASCENDING)], name="rev_id"),
+    ],
+    get_collection_tasks: [
+        IndexModel(
+            [("order_id", ASCENDING), ("task_id", ASCENDING)],
+            name="order_task",
+            unique=True,
+        ),
+        IndexModel(
+            [("order_id", ASCENDING), ("group_id", ASCENDING), ("open", ASCENDING)],
+            name="order_group_open",
+        ),
+        IndexModel(
+            [("order_id", ASCENDING), ("section", ASCENDING)], name="order_section"
+        ),
+        IndexModel(
+            [("workerName", ASCENDING), ("start", DESCENDING)], name="worker_start"
+        ),
+        IndexModel([("section", ASCENDING), ("open", ASCENDING)], name="section_open"),
+        IndexModel(
+            [("section", ASCENDING), ("start", ASCENDING)], name="section_start"
+        ),
+    ],
+    get_collection_koodit: [
+        IndexModel("Item number", name="item_number"),
+    ],
+    get_collection_efficiency: [
+        # One live and one saved summary per site and week; equality on
+        # site and kind first, so week ranges are a single index scan.
+        # Summaries without keys (see `flask backfill-summary-keys`) are left out.
+        IndexModel(
+            [
+                ("site", ASCENDING),
+                ("kind", ASCENDING),
+                ("iso_year", ASCENDING),
+                ("iso_week", ASCENDING),
+            ],
+            name="summary_key",
+            unique=True,
+            partialFilterExpression={"kind": {"$exists": True}},
+        ),
+        # Spilled items are stored under the summary name
+        IndexModel("summary_name", name="summary_name", unique=True),
+    ],
+    get_collection_efficiency_items: [
+        IndexModel(
+            [("summary_name", ASCENDING), ("item_id", ASCENDING)],
+            name="summary_item",
+            unique=True,
+        ),
+    ],
+    get_collection_jobs: [
+        IndexModel(
+            "finished_at", name="finished_ttl", expireAfterSeconds=JOB_RETENTION_SECONDS
+        ),
+    ],
+    get_collection_tombstones: [
+        IndexModel([("_rev", ASCENDING), ("_id", ASCENDING)], name="rev_id"),
+        # prune_tombstones(); not a TTL index, since pruning records a horizon
+        IndexModel("deleted_at", name="deleted_at"),
+    ],
+    _named(EFFICIENCY_TARGET): [
+        # Upserts and the stored results read by calculate-efficiency --incremental
+        IndexModel("KEY", name="key"),
+    ],
+}
+
+# Indexes that were replaced and are dropped by ensure_indexes()
+OBSOLETE_INDEXES = {
+    get_collection: ["rev"],
+    get_collection_tombstones: ["deleted_ttl", "rev"],
+    _named(EFFICIENCY_SOURCE): ["updated_at"],
+}
+
+# (name, collection getter, filter, sort) of the queries hot routes run;
+# check_query_plans() fails if any of them scans a whole collection
+HOT_QUERIES = [
+    ("osasto", get_collection, {"Osasto": 300}, [("Jononumero", ASCENDING)]),
+    (
+        "orders by queue position",
+        get_collection,
+        {"Jononumero": {"$gt": 0}},
+        [("Jononumero", ASCENDING), ("_id", ASCENDING)],
+    ),
+    ("worker history", get_collection, {"Task.workerName": ""}, None),
+    (
+        "import upsert",
+        get_collection,
+        {"Sales order": "", "Item number": "", "Reference number": ""},
+        None,
+    ),
+    (
+        "order changes",
+        get_collection,
+        {"_rev": {"$gt": 0}},
+        [("_rev", ASCENDING), ("_id", ASCENDING)],
+    ),
+    (
+        "end task group",
+        get_collection_tasks,
+        {"order_id": ObjectId(), "group_id": "", "open": True},
+        None,
+    ),
+    ("worker tasks", get_collection_tasks, {"workerName": ""}, [("start", DESCENDING)]),
+    ("open section tasks", get_collection_tasks, {"section": "", "open": True}, None),
+    ("codes lookup", get_collection_koodit, {"Item number": ""}, None),
+    (
+        "efficiency summary",
+        get_collection_efficiency,
+        {"site": "", "kind": "live", "iso_year": 2000, "iso_week": 1},
+        None,
+    ),
+    (
+        "spilled summary items",
+        get_collection_efficiency_items,
+        {"summary_name": ""},
+        None,
+    ),
+    (
+        "efficiency history",
+        get_collection_efficiency,
+        {
+            "site": "",
+            "kind": "saved",
+            "iso_year": 2000,
+            "iso_week": {"$gte": 1, "$lte": 12},
+        },
+        [("iso_year", ASCENDING), ("iso_week", ASCENDING)],
+    ),
+    ("efficiency target", _named(EFFICIENCY_TARGET), {"KEY": ""}, None),
+    (
+        "sync revision",
+        get_collection_tombstones,
+        {"_rev": {"$gt": 0}},
+        [("_rev", ASCENDING), ("_id", ASCENDING)],
+    ),
+]
+
+
+def ensure_indexes():
+    """
+    Create every index in INDEXES and drop OBSOLETE_INDEXES (idempotent).
+
+    Returns ``[(collection, index, error)]`` for indexes that could not be
+    built, e.g. a unique index over existing duplicates; the rest are
+    still created. Never raises: when the server cannot be reached, every
+    index not yet built is reported with the connection error.
+    """
+    specs = [(get(), model) for get, models in INDEXES.items() for model in models]
+    failures = []
+    # First, since a replacement may use the same keys with other options
+    for get, names in OBSOLETE_INDEXES.items():
+        collection = get()
+        for name in names:
+            try:
+                if name in collection.index_information():
+                    collection.drop_index(name)
+            except PyMongoError as e:
+                failures.append((collection.name, name, str(e)))
+    for position, (collection, model) in enumerate(specs):
+        try:
+            collection.create_indexes([model])
+        except OperationFailure as e:
+            failures.append((collection.name, model.document["name"], str(e)))
+        except PyMongoError as e:
+            # Connection and timeout errors would repeat for every other index
+            failures.extend(
+                (remaining.name, pending.document["name"], str(e))
+                for remaining, pending in specs[position:]
+            )
+            return failures
+    return failures
+
+
+def _stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            yield plan["stage"]
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+def check_query_plans():
+    """Return ``[(query name, collection)]`` of hot queries planned as a COLLSCAN."""
+    scans = []
+    for name, get, query, sort in HOT_QUERIES:
+        collection = get()
+        cursor = collection.find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        if "COLLSCAN" in _stages(plan):
+            scans.append((name, collection.name))
+    return scans
@@ -0,0 +1,184 @@
+import datetime
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import current_app
+from pymongo.errors import PyMongoError
+from App.extensions.db import get_collection_jobs
+
+logger = logging.getLogger(__name__)
+# Seconds between heartbeats of the jobs a process has queued or running
+HEARTBEAT_SECONDS = 30
+# Jobs without a heartbeat for this long lost their worker and are failed
+STALE_SECONDS = 4 * HEARTBEAT_SECONDS
+# Unfinished jobs of this process, kept alive by the heartbeat thread
+_owned = set()
+_owned_lock = threading.Lock()
+_heartbeat = {"thread": None, "pid": None}
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+def _beat():
+    while True:
+        time.sleep(HEARTBEAT_SECONDS)
+        with _owned_lock:
+            owned = list(_owned)
+        try:
+            if owned:
+                get_collection_jobs().update_many(
+                    {"_id": {"$in": owned}}, {"$set": {"heartbeat_at": _now()}}
+                )
+            fail_stale_jobs()
+        except PyMongoError:
+            logger.exception("Job heartbeat failed")
+
+
+def _own(job_id):
+    """Keep ``job_id`` alive from this process until _disown()."""
+    with _owned_lock:
+        _owned.add(job_id)
+        # Started lazily so each (forked) worker process runs its own
+        thread = _heartbeat["thread"]
+        if _heartbeat["pid"] != os.getpid() or not thread.is_alive():
+            _heartbeat["pid"] = os.getpid()
+            _heartbeat["thread"] = threading.Thread(
+                target=_beat, name="job-heartbeat", daemon=True
+            )
+            _heartbeat["thread"].start()
+
+
+def _disown(job_id):
+    with _owned_lock:
+        _owned.discard(job_id)
+
+
+def init_jobs(app):
+    """Attach the background job pool to the app."""
+    app.extensions["jobs"] = ThreadPoolExecutor(
+        max_workers=app.config.get("JOB_WORKERS", 2), thread_name_prefix="job"
+    )
+
+
+def enqueue(kind, func, *args, **kwargs):
+    """
+    Record a job and run ``func(*args, progress=..., **kwargs)`` on the pool.
+
+    Job state lives in MongoDB, so any worker process can report it. The
+    function's return value becomes the job result; an exception marks the
+    job failed with its message. Returns the job id as a string.
+
+    The process keeps a heartbeat on the job until it finishes, so a job
+    whose worker died is reported as failed (see fail_stale_job).
+    """
+    app = current_app._get_current_object()
+    now = _now()
+    job_id = (
+        get_collection_jobs()
+        .insert_one(
+            {
+                "kind": kind,
+                "status": "queued",
+                "progress": None,
+                "created_at": now,
+                "heartbeat_at": now,
+            }
+        )
+        .inserted_id
+    )
+    _own(job_id)
+    app.extensions["jobs"].submit(_run, app, job_id, func, args, kwargs)
+    return str(job_id)
+
+
+def _run(app, job_id, func, args, kwargs):
+    jobs = get_collection_jobs()
+
+    def progress(done, total=None, message=None):
+        jobs.update_one(
+            {"_id": job_id},
+            {
+                "$set": {
+                    "progress": {"done": done, "total": total, "message": message},
+                    "updated_at": _now(),
+                }
+            },
+        )
+
+    # Disowned however this ends, so a job whose status could not be
+    # written stops beating and is failed by the stale-job sweep
+    try:
+        with app.app_context():
+            try:
+                jobs.update_one(
+                    {"_id": job_id},
+                    {"$set": {"status": "running", "started_at": _now()}},
+                )
+                result = func(*args, progress=progress, **kwargs)
+            except Exception as e:
+                app.logger.exception("Job %s failed", job_id)
+                update = {"status": "failed", "error": str(e)}
+            else:
+                update = {"status": "done", "result": result}
+            update["finished_at"] = _now()
+            jobs.update_one({"_id": job_id}, {"$set": update})
+    finally:
+        _disown(job_id)
+
+
+def fail_stale_job(job):
+    """
+    Mark an unfinished job failed if its heartbeat stopped; returns the job.
+
+    A worker that dies mid-run (a crash, or a recycled gunicorn worker)
+    leaves its jobs queued or running with an old ``heartbeat_at``.
+    """
+    if job["status"] not in ("queued", "running"):
+        return job
+    heartbeat_at = job.get("heartbeat_at") or job.get("created_at")
+    if heartbeat_at.tzinfo is None:
+        # BSON dates are UTC and come back naive
+        heartbeat_at = heartbeat_at.replace(tzinfo=datetime.timezone.utc)
+    if _now() - heartbeat_at < datetime.timedelta(seconds=STALE_SECONDS):
+        return job
+    update = {
+        "status": "failed",
+        "error": "The server stopped before the job finished",
+        "finished_at": _now(),
+    }
+    # Unless a heartbeat or the job itself got there first
+    result = get_collection_jobs().update_one(
+        {
+            "_id": job["_id"],
+            "status": job["status"],
+            "heartbeat_at": job.get("heartbeat_at"),
+        },
+        {"$set": update},
+    )
+    if result.modified_count:
+        job.update(update)
+    return job
+
+
+def fail_stale_jobs():
+    """Fail every unfinished job whose heartbeat stopped; returns how many."""
+    cutoff = _now() - datetime.timedelta(seconds=STALE_SECONDS)
+    stale = get_collection_jobs().find(
+        {"status": {"$in": ["queued", "running"]}, "heartbeat_at": {"$lt": cutoff}}
+    )
+    return sum(fail_stale_job(job)["status"] == "failed" for job in stale)
+
+
+def get_job(job_id):
+    """Fetch a job document by its string id, or None."""
+    try:
+        job = get_collection_jobs().find_one({"_id": ObjectId(job_id)})
+    except InvalidId:
+        return None
+    return fail_stale_job(job) if job else None
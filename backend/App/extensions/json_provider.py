@@ -0,0 +1,90 @@
+import datetime
+import decimal
+import json
+import math
+import uuid
+import numpy as np
+from bson import ObjectId
+from flask.json.provider import JSONProvider
+
+# Optional: without orjson responses go through the slower stdlib encoder
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value):
+    """Types neither encoder handles by itself."""
+    if isinstance(value, ObjectId):
+        return str(value)
+    if isinstance(value, datetime.datetime):
+        # BSON dates are UTC and come back naive
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=datetime.timezone.utc)
+        return value.isoformat()
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return _finite(value.tolist())
+    if hasattr(value, "__html__"):
+        return str(value.__html__())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _finite(value):
+    """NaN and infinities as None, recursively; the stdlib path's extra pass."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    return value
+
+
+class MongoJSONProvider(JSONProvider):
+    """
+    JSON for MongoDB documents, used by ``jsonify`` and ``app.json``.
+
+    ObjectIds become strings, datetimes ISO 8601 strings (naive ones are
+    UTC, as BSON returns them) and NaN becomes null. With orjson installed
+    this is a single pass in C; otherwise the stdlib encoder runs after a
+    recursive NaN pass.
+    """
+
+    mimetype = "application/json"
+
+    def dumps(self, obj, **kwargs):
+        return self._encode(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if orjson is not None:
+            return orjson.loads(s)
+        return json.loads(s, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._encode(obj), mimetype=self.mimetype)
+
+    def _encode(self, obj):
+        if orjson is not None:
+            return orjson.dumps(
+                obj,
+                default=_default,
+                option=orjson.OPT_NAIVE_UTC
+                | orjson.OPT_NON_STR_KEYS
+                | orjson.OPT_SERIALIZE_NUMPY,
+            )
+        return json.dumps(
+            _finite(obj), default=_default, ensure_ascii=False, allow_nan=False
+        ).encode()
+
+
+def init_json(app):
+    """Serve every JSON response through MongoJSONProvider."""
+    app.json = MongoJSONProvider(app)
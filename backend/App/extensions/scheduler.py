@@ -0,0 +1,140 @@
+import datetime
+import logging
+import os
+import socket
+import threading
+import time
+import pytz
+from pymongo.errors import DuplicateKeyError, PyMongoError
+from App.extensions.db import get_collection_counters
+from App.extensions.jobs import enqueue
+
+logger = logging.getLogger(__name__)
+FINLAND_TZ = pytz.timezone("Europe/Helsinki")
+
+
+def _local(day, at):
+    return FINLAND_TZ.localize(datetime.datetime.combine(day, at))
+
+
+def weekly(weekday, at):
+    """Schedule due every ``weekday`` (0 is Monday) at ``at``, Helsinki time."""
+
+    def latest(now):
+        day = now.date() - datetime.timedelta(days=(now.weekday() - weekday) % 7)
+        due = _local(day, at)
+        if due > now:
+            due = _local(day - datetime.timedelta(weeks=1), at)
+        return due
+
+    return latest
+
+
+def daily(at):
+    """Schedule due every day at ``at``, Helsinki time."""
+
+    def latest(now):
+        due = _local(now.date(), at)
+        if due > now:
+            due = _local(now.date() - datetime.timedelta(days=1), at)
+        return due
+
+    return latest
+
+
+def claim(name, due):
+    """
+    Claim the run of job ``name`` due at ``due``.
+
+    True for exactly one caller across every process; later or older
+    occurrences than the last one claimed are refused.
+    """
+    try:
+        get_collection_counters().update_one(
+            {"_id": f"schedule:{name}", "due": {"$lt": due}},
+            {
+                "$set": {
+                    "due": due,
+                    "claimed_by": f"{socket.gethostname()}:{os.getpid()}",
+                    "claimed_at": datetime.datetime.now(datetime.timezone.utc),
+                }
+            },
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        # The document exists with this or a newer occurrence
+        return False
+    return True
+
+
+class Scheduler:
+    """
+    Queues jobs at fixed Helsinki times from a thread in each server process.
+
+    Every process polls, but an occurrence is claimed in MongoDB before its
+    job is queued, so it runs in one worker only. Occurrences missed while
+    no server was running are caught up when at most ``catch_up`` late.
+    Jobs run on the job pool and show up in /api/jobs like any other.
+    """
+
+    def __init__(self, app, poll_seconds=60):
+        self.app = app
+        self.poll_seconds = poll_seconds
+        self.entries = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def add(self, name, schedule, func, catch_up=datetime.timedelta(hours=1)):
+        """Run ``func(progress=...)`` as job ``name`` whenever ``schedule`` is due."""
+        self.entries.append((name, schedule, func, catch_up))
+
+    def start(self):
+        """Start polling in this process, once."""
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(
+                target=self._run, name="scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                self.run_due()
+            except PyMongoError:
+                logger.exception("Scheduler poll failed")
+            time.sleep(self.poll_seconds)
+
+    def run_due(self, now=None):
+        """Queue every job with a due, unclaimed occurrence; returns the job ids."""
+        now = (now or datetime.datetime.now(FINLAND_TZ)).astimezone(FINLAND_TZ)
+        queued = []
+        with self.app.app_context():
+            for name, schedule, func, catch_up in self.entries:
+                due = schedule(now)
+                if now - due > catch_up or not claim(name, due):
+                    continue
+                logger.info("Queueing %s due at %s", name, due.isoformat())
+                queued.append(enqueue(name, func))
+        return queued
+
+
+def init_scheduler(app):
+    """
+    Attach the scheduler to the app.
+
+    Nothing runs until the serving entry point calls ``start_scheduler``,
+    so ``flask`` commands never pick up scheduled work.
+    """
+    app.extensions["scheduler"] = Scheduler(
+        app, poll_seconds=app.config.get("SCHEDULER_POLL_SECONDS", 60)
+    )
+
+
+def start_scheduler(app):
+    """Start the scheduler in this process if SCHEDULER is enabled."""
+    if app.config.get("SCHEDULER"):
+        app.extensions["scheduler"].start()
@@ -0,0 +1,22 @@
+import io
+from flask import Request
+
+
+class MemoryUploadRequest(Request):
+    """
+    Request whose uploaded files stay in memory.
+
+    werkzeug spools uploads larger than 500 KB to a temporary file; order
+    imports read the upload straight from memory instead. MAX_CONTENT_LENGTH
+    bounds the memory a single request can take.
+    """
+
+    def _get_file_stream(
+        self, total_content_length, content_type, filename=None, content_length=None
+    ):
+        return io.BytesIO()
+
+
+def init_uploads(app):
+    """Keep uploaded files in memory instead of temporary files."""
+    app.request_class = MemoryUploadRequest
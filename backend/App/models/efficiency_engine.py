@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+KPL_STD = "KPL STD ajalla"
+KPL_TARGET = "KPL STD ajalla TARGET"
+
+
+def to_numeric(values):
+    """Coerce values to a float array; missing or non-numeric values become NaN."""
+    try:
+        return np.asarray(values, dtype=float)
+    except (TypeError, ValueError):
+        # Mixed text columns take the slower element-wise path
+        return pd.to_numeric(pd.Series(values, dtype=object), errors="coerce").to_numpy(
+            dtype=float
+        )
+
+
+def kpl(amount, standardiaika):
+    """
+    Vectorised ``round(amount * standardiaika, 2)``.
+
+    NaN wherever either side is missing or zero, which is when the old
+    per-document loops skipped the field.
+    """
+    amount = to_numeric(amount)
+    standardiaika = to_numeric(standardiaika)
+    counted = (amount != 0) & (standardiaika != 0)
+    return np.where(counted, np.round(amount * standardiaika, 2), np.nan)
+
+
+def kpl_frame(
+    orders, made="total_made", quantity="Quantity", standardiaika="Standardiaika"
+):
+    """
+    KPL STD columns for a sequence of order documents, one row per order.
+
+    Only the three input fields are read from the documents.
+    """
+    standard = [order.get(standardiaika) for order in orders]
+    return pd.DataFrame(
+        {
+            KPL_STD: kpl([order.get(made) for order in orders], standard),
+            KPL_TARGET: kpl([order.get(quantity) for order in orders], standard),
+        }
+    )
+
+
+def row_fields(frame):
+    """Per-row dicts of the KPL fields, leaving out the NaN ones."""
+    columns = list(frame.columns)
+    rows = zip(*(frame[column].tolist() for column in columns))
+    return [
+        {field: value for field, value in zip(columns, row) if value == value}
+        for row in rows
+    ]
+
+
+def totals(frame):
+    """Column sums of a KPL frame, skipping NaN."""
+    return {field: float(np.nansum(frame[field].to_numpy())) for field in frame}
+
+
+def efficiency(total, weekly_hours):
+    """``total / weekly_hours`` to two decimals, or None without hours."""
+    return round(total / weekly_hours, 2) if weekly_hours else None
@@ -1,4 +1,18 @@
-from pymongo import MongoClient
+from itertools import islice
+import numpy as np
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+from App.models.efficiency_engine import kpl, to_numeric
+
+# Fields read from the source collection
+SOURCE_FIELDS = (
+    "KEY",
+    "Item number",
+    "Standardiaika",
+    "Total made",
+    "Viikon työtunnit",
+)
+BATCH_SIZE = 1000
 
 
 class EfficiencyModel:
@@ -9,44 +23,83 @@ class EfficiencyModel:
         self.source_collection = db["Kokkola"]
         self.target_collection = db["KokkolaEfficiency"]
 
-    def calculate_efficiency(self):
+    def calculate_efficiency(self, incremental=False, batch_size=BATCH_SIZE):
         """
         Fetch data from Kokkola, perform efficiency calculations,
         and save results to KokkolaEfficiency.
+
+        Streams the source in batches and upserts each batch with one
+        ``bulk_write``. With ``incremental`` results equal to the stored
+        ones are not rewritten; Kokkola is written outside this app, so
+        nothing marks which sources changed. Returns the number of
+        documents written.
         """
-        documents = list(self.source_collection.find({}))
-        for doc in documents:
-            try:
-                # Fetch fields from document
-                standardiaika = doc.get("Standardiaika", 0)
-                total_made = doc.get("Total made", 0)
-                weekly_hours = doc.get("Viikon työtunnit", 0)
-
-                # Calculate fields
-                vkl_std = (
-                    round(float(standardiaika) * float(total_made), 2)
-                    if standardiaika and total_made
-                    else 0
-                )
-                efficiency_now = round(vkl_std / weekly_hours, 2) if weekly_hours else 0
-
-                # Prepare document for target collection
-                result_doc = {
-                    "KEY": doc.get("KEY"),
-                    "Item number": doc.get("Item number"),
-                    "Standardiaika": standardiaika,
-                    "Total made": total_made,
-                    "Viikonvalmistuneet kappaleet std": vkl_std,
-                    "EFFICIENCY NOW": efficiency_now,
-                    "Viikon työtunnit": weekly_hours,
-                }
-
-                # Save to target collection
-                self.target_collection.replace_one(
-                    {"KEY": doc.get("KEY")}, result_doc, upsert=True
-                )
-
-            except Exception as e:
-                print(f"Error processing document {doc.get('KEY')}: {e}")
-
-        print("Efficiency data processed and saved successfully.")
+        cursor = self.source_collection.find(
+            {},
+            {"_id": 0, **{field: 1 for field in SOURCE_FIELDS}},
+            batch_size=batch_size,
+        )
+        written = 0
+        while True:
+            documents = list(islice(cursor, batch_size))
+            if not documents:
+                break
+            written += self._write_batch(documents, skip_unchanged=incremental)
+
+        print(f"Efficiency data processed and saved successfully ({written}).")
+        return written
+
+    def _stored_results(self, documents):
+        """Stored results for the KEYs of ``documents``, by KEY."""
+        keys = [doc.get("KEY") for doc in documents]
+        stored = self.target_collection.find({"KEY": {"$in": keys}}, {"_id": 0})
+        return {doc.get("KEY"): doc for doc in stored}
+
+    def _write_batch(self, documents, skip_unchanged=False):
+        standardiaika = [doc.get("Standardiaika", 0) for doc in documents]
+        total_made = [doc.get("Total made", 0) for doc in documents]
+        weekly_hours = to_numeric([doc.get("Viikon työtunnit", 0) for doc in documents])
+
+        # Calculate fields for the whole batch at once
+        vkl_std = np.nan_to_num(kpl(total_made, standardiaika))
+        efficiency_now = np.round(
+            np.divide(
+                vkl_std,
+                weekly_hours,
+                out=np.zeros_like(vkl_std),
+                where=np.nan_to_num(weekly_hours) != 0,
+            ),
+            2,
+        )
+
+        stored = self._stored_results(documents) if skip_unchanged else {}
+        operations = []
+        written = []
+        for doc, std, now in zip(documents, vkl_std.tolist(), efficiency_now.tolist()):
+            # Prepare document for target collection
+            result_doc = {
+                "KEY": doc.get("KEY"),
+                "Item number": doc.get("Item number"),
+                "Standardiaika": doc.get("Standardiaika", 0),
+                "Total made": doc.get("Total made", 0),
+                "Viikonvalmistuneet kappaleet std": std,
+                "EFFICIENCY NOW": now,
+                "Viikon työtunnit": doc.get("Viikon työtunnit", 0),
+            }
+            if stored.get(doc.get("KEY")) == result_doc:
+                continue
+            operations.append(
+                ReplaceOne({"KEY": doc.get("KEY")}, result_doc, upsert=True)
+            )
+            written.append(doc)
+
+        if not operations:
+            return 0
+        try:
+            self.target_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: the rest of the batch is still written
+            for error in e.details.get("writeErrors", []):
+                key = written[error["index"]].get("KEY")
+                print(f"Error processing document {key}: {error.get('errmsg')}")
+        return len(operations)
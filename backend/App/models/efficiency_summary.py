@@ -0,0 +1,763 @@
+import datetime
+import re
+import pytz
+from pymongo import ReplaceOne, UpdateOne
+from pymongo.errors import DuplicateKeyError
+import bson
+from App.extensions.db import (
+    get_collection,
+    get_collection_counters,
+    get_collection_efficiency,
+    get_collection_efficiency_items,
+)
+from App.models.efficiency_engine import (
+    KPL_STD,
+    KPL_TARGET,
+    efficiency,
+    kpl_frame,
+    row_fields,
+    totals,
+)
+from App.models.order_changes import bump_osasto_versions, revision_fields
+
+FINLAND_TZ = pytz.timezone("Europe/Helsinki")
+# Site the weekly summaries belong to, part of every summary key
+SITE = "Pärnu"
+# Summary kinds: the week being built and the copies saved from it
+LIVE = "live"
+SAVED = "saved"
+# Production weeks end on Friday 17:30 local time, when roll_over_week runs
+WEEK_CUTOFF_WEEKDAY = 4
+WEEK_CUTOFF_TIME = datetime.time(17, 30)
+# Counter document holding the week roll_over_week last built
+LIVE_WEEK_KEY = "efficiency:live_week"
+# Orders in these departments make up the weekly summary
+EFFICIENCY_OSASTOT = (300, 400)
+# Items between progress reports while building a summary
+PROGRESS_EVERY = 100
+# KPL field updates sent per bulk_write
+BATCH_SIZE = 1000
+# Summary totals compared week over week by /efficiencyHistory
+COMPARED_FIELDS = (
+    "EFFICIENCY NOW",
+    "EFFICIENCY TARGET",
+    "total_kpl_std_ajalla",
+    "total_kpl_target_ajalla",
+)
+# Order fields kept on summary items; the Efficiency view shows no others
+ITEM_FIELDS = (
+    "VKO",
+    "Osasto",
+    "Jononumero",
+    "Item number",
+    "Sales order",
+    "Category",
+    "Quantity",
+    "total_made",
+    "Deliver remainder",
+    KPL_STD,
+    KPL_TARGET,
+    "Status",
+)
+# Items encoding larger than this move to the items collection, keeping
+# summaries well under MongoDB's 16 MB document limit
+MAX_INLINE_ITEMS_BYTES = 4 * 1024 * 1024
+# Names used before summaries had structured keys
+LEGACY_LIVE_NAME = re.compile(r"^PärnuEfficiency_Week(\d+)$")
+SAVED_NAME = re.compile(r"^PärnuEfficiency_(\d+)/(\d+)_saved$")
+
+
+def summary_week(now=None):
+    """
+    ISO year and week of the production week at ``now`` (default: now).
+
+    From Friday 17:30 Helsinki time on, that is the following ISO week.
+    The live summary follows it through roll_over_week(), see live_week().
+    """
+    now = (now or datetime.datetime.now(FINLAND_TZ)).astimezone(FINLAND_TZ)
+    if now.weekday() > WEEK_CUTOFF_WEEKDAY or (
+        now.weekday() == WEEK_CUTOFF_WEEKDAY and now.time() >= WEEK_CUTOFF_TIME
+    ):
+        now += datetime.timedelta(days=7)
+    iso_year, iso_week, _ = now.isocalendar()
+    return {"iso_year": iso_year, "iso_week": iso_week}
+
+
+def _week_order(week):
+    return week["iso_year"], week["iso_week"]
+
+
+def _rolled_over_week(now):
+    """
+    The week roll_over_week() last built, unless more than a week behind.
+
+    A week is only left behind that far when rollovers stopped, e.g. with
+    the scheduler turned off; then the clock decides instead.
+    """
+    state = get_collection_counters().find_one({"_id": LIVE_WEEK_KEY})
+    if state is None:
+        return None
+    week = {"iso_year": state["iso_year"], "iso_week": state["iso_week"]}
+    if _week_order(week) < _week_order(summary_week(now - datetime.timedelta(weeks=1))):
+        return None
+    return week
+
+
+def live_week(now=None):
+    """
+    ISO year and week of the live summary at ``now`` (default: now).
+
+    The live summary only moves on when roll_over_week() runs, so saves
+    and edits between the Friday cutoff and the rollover still reach the
+    week their data belongs to. Before any rollover, summary_week().
+    """
+    now = now or datetime.datetime.now(FINLAND_TZ)
+    return _rolled_over_week(now) or summary_week(now)
+
+
+def summary_key(kind=LIVE, week=None):
+    """Unique key of a summary; ``week`` defaults to the current live_week()."""
+    return {"site": SITE, "kind": kind, **(week or live_week())}
+
+
+def summary_name(key):
+    """Display name of the summary with ``key``, unique like the key."""
+    if key["kind"] == SAVED:
+        return f"{key['site']}Efficiency_{key['iso_week']}/{key['iso_year']}_saved"
+    return f"{key['site']}Efficiency_Week{key['iso_week']}/{key['iso_year']}"
+
+
+def slim_item(order):
+    """Summary entry for an order: its id and the ITEM_FIELDS it has."""
+    item = {"_id": str(order["_id"])}
+    for field in ITEM_FIELDS:
+        value = order.get(field)
+        if value is not None and value == value:  # NaN != NaN
+            item[field] = value
+    return item
+
+
+def place_items(summary_name, items):
+    """
+    Store the items of a summary and return the summary fields to ``$set``.
+
+    Items are kept inline unless they encode larger than
+    MAX_INLINE_ITEMS_BYTES; then they go to the items collection, one
+    document per item, and the summary only carries ``items_spilled``.
+    Spilled items are replaced in place and only items no longer present
+    are deleted, so single-item updates running meanwhile are not lost.
+    """
+    children = get_collection_efficiency_items()
+    if len(bson.encode({"items": items})) <= MAX_INLINE_ITEMS_BYTES:
+        children.delete_many({"summary_name": summary_name})
+        return {"items": items, "items_spilled": False}
+
+    if items:
+        children.bulk_write(
+            [
+                ReplaceOne(
+                    {"summary_name": summary_name, "item_id": item["_id"]},
+                    {
+                        "summary_name": summary_name,
+                        "item_id": item["_id"],
+                        **{key: value for key, value in item.items() if key != "_id"},
+                    },
+                    upsert=True,
+                )
+                for item in items
+            ],
+            ordered=False,
+        )
+    children.delete_many(
+        {
+            "summary_name": summary_name,
+            "item_id": {"$nin": [item["_id"] for item in items]},
+        }
+    )
+    return {"items": [], "items_spilled": True}
+
+
+def summary_items(summary):
+    """The items of a summary, wherever they are stored."""
+    if not summary.get("items_spilled"):
+        return summary.get("items", [])
+    children = get_collection_efficiency_items().find(
+        {"summary_name": summary["summary_name"]}, {"summary_name": 0}
+    )
+    return [
+        {
+            "_id": child["item_id"],
+            **{
+                key: value
+                for key, value in child.items()
+                if key not in ("_id", "item_id")
+            },
+        }
+        for child in children
+    ]
+
+
+def set_item_status(summary, item_id, status):
+    """Set the Status of one summary item; returns the UpdateResult."""
+    if summary.get("items_spilled"):
+        return get_collection_efficiency_items().update_one(
+            {"summary_name": summary["summary_name"], "item_id": item_id},
+            {"$set": {"Status": status}},
+        )
+    return get_collection_efficiency().update_one(
+        {"_id": summary["_id"], "items._id": item_id},
+        {"$set": {"items.$.Status": status}},
+    )
+
+
+def kpl_fields(order):
+    """The KPL STD fields an order contributes to the summary totals."""
+    return row_fields(kpl_frame([order]))[0]
+
+
+def build_efficiency_summary(weekly_hours, progress=None, statuses=None, week=None):
+    """
+    Recompute the KPL fields of osasto 300/400 items and upsert the weekly summary.
+
+    ``statuses`` maps item ids to a Status edited on the summary, which wins
+    over the order's own. ``week`` defaults to the current live_week().
+    Returns the summary document. Raises LookupError when there are no items.
+    """
+    items = list(
+        get_collection().find(
+            {"Osasto": {"$in": list(EFFICIENCY_OSASTOT)}},
+            {field: 1 for field in (*ITEM_FIELDS, "Standardiaika")},
+        )
+    )
+    if not items:
+        raise LookupError("No data found for osasto 300 or 400")
+
+    kpl = kpl_frame(items)
+    summed = totals(kpl)
+    total_kpl_std_ajalla = summed[KPL_STD]
+    total_kpl_target_ajalla = summed[KPL_TARGET]
+
+    processed_items = []
+    operations = []
+    changed_osastot = set()
+    revision = None
+    for index, (item, updates) in enumerate(zip(items, row_fields(kpl)), start=1):
+        # Only write the calculated fields that differ from the stored ones
+        stale = {
+            field: value for field, value in updates.items() if item.get(field) != value
+        }
+        if stale:
+            # One revision covers every order this rebuild touches
+            revision = revision or revision_fields()
+            operations.append(
+                UpdateOne({"_id": item["_id"]}, {"$set": {**stale, **revision}})
+            )
+            item.update(stale)
+            changed_osastot.add(item.get("Osasto"))
+            if len(operations) == BATCH_SIZE:
+                get_collection().bulk_write(operations, ordered=False)
+                operations = []
+
+        item = slim_item(item)
+        if statuses and item["_id"] in statuses:
+            item["Status"] = statuses[item["_id"]]
+        processed_items.append(item)
+        if progress and index % PROGRESS_EVERY == 0:
+            progress(index, len(items))
+
+    if operations:
+        get_collection().bulk_write(operations, ordered=False)
+    bump_osasto_versions(*changed_osastot)
+
+    # Calculate Efficiency NOW and TARGET
+    efficiency_now = efficiency(total_kpl_std_ajalla, weekly_hours)
+    efficiency_target = efficiency(total_kpl_target_ajalla, weekly_hours)
+
+    # Save the summary document
+    key = summary_key(week=week)
+    name = summary_name(key)
+    now = datetime.datetime.now(FINLAND_TZ)
+    summary_document = {
+        **key,
+        "summary_name": name,
+        "viikon_tyotunnit": weekly_hours,
+        "EFFICIENCY NOW": efficiency_now,
+        "EFFICIENCY TARGET": efficiency_target,
+        "total_kpl_std_ajalla": total_kpl_std_ajalla,
+        "total_kpl_target_ajalla": total_kpl_target_ajalla,
+        **place_items(name, processed_items),
+        "updated_at": now,
+        "refreshed_at": now,
+    }
+
+    # Use upsert to update the summary if it already exists
+    get_collection_efficiency().update_one(key, {"$set": summary_document}, upsert=True)
+    return {**summary_document, "items": processed_items}
+
+
+def refresh_efficiency_summary(progress=None, week=None):
+    """
+    Rebuild the current (or ``week``'s) summary from the orders.
+
+    Keeps the summary's weekly hours and the statuses edited on its items.
+    Raises LookupError when weekly hours have not been set yet.
+    """
+    summary = get_collection_efficiency().find_one(
+        summary_key(week=week),
+        {
+            "summary_name": 1,
+            "viikon_tyotunnit": 1,
+            "items_spilled": 1,
+            "items._id": 1,
+            "items.Status": 1,
+        },
+    )
+    if not summary or not summary.get("viikon_tyotunnit"):
+        raise LookupError("Weekly hours not set. Add weekly hours first.")
+
+    statuses = {
+        item["_id"]: item["Status"]
+        for item in summary_items(summary)
+        if item.get("Status") is not None
+    }
+    return build_efficiency_summary(
+        summary["viikon_tyotunnit"], progress, statuses, week
+    )
+
+
+def save_summary(week=None):
+    """
+    Copy the live summary of ``week`` (default: the current one) to its saved key.
+
+    Returns ``(saved summary, replaced)``; ``replaced`` is True when the
+    week had been saved before. Raises LookupError without a live summary.
+    """
+    efficiency_collection = get_collection_efficiency()
+    live_summary = efficiency_collection.find_one(summary_key(week=week))
+    if not live_summary:
+        raise LookupError("Summary not found.")
+
+    # The copy is keyed on the week of the summary it was saved from
+    saved_key = summary_key(
+        SAVED,
+        {"iso_year": live_summary["iso_year"], "iso_week": live_summary["iso_week"]},
+    )
+    saved_name = summary_name(saved_key)
+
+    saved_summary = live_summary.copy()
+    saved_summary.pop("_id", None)  # Generate a new ObjectId
+    saved_summary.update(saved_key)
+    saved_summary["summary_name"] = saved_name
+    saved_summary.update(place_items(saved_name, summary_items(live_summary)))
+    saved_summary["saved_at"] = datetime.datetime.now(FINLAND_TZ)
+
+    result = efficiency_collection.update_one(
+        saved_key, {"$set": saved_summary}, upsert=True
+    )
+    return saved_summary, bool(result.matched_count)
+
+
+def roll_over_week(progress=None, now=None):
+    """
+    Save the week that ended at the last Friday cutoff and build the next one.
+
+    The new live summary starts from the ended week's hours unless hours
+    were already entered for it; its statuses start from the orders. From
+    then on it is the live_week(). Returns the names of the saved and built
+    summaries, None where skipped.
+    """
+    now = now or datetime.datetime.now(FINLAND_TZ)
+    current = summary_week(now)
+    # The week the last rollover built; without one, a week before any
+    # moment falls in the production week that ended last
+    ended = _rolled_over_week(now) or summary_week(now - datetime.timedelta(weeks=1))
+    result = {"saved": None, "built": None}
+
+    weekly_hours = None
+    if ended != current:
+        try:
+            saved, _ = save_summary(ended)
+        except LookupError:
+            pass
+        else:
+            result["saved"] = saved["summary_name"]
+            weekly_hours = saved.get("viikon_tyotunnit")
+
+    # The ended week is saved, so edits from now on belong to the new one
+    get_collection_counters().update_one(
+        {"_id": LIVE_WEEK_KEY}, {"$set": current}, upsert=True
+    )
+
+    try:
+        built = refresh_efficiency_summary(progress, current)
+    except LookupError:
+        if not weekly_hours:
+            return result
+        built = build_efficiency_summary(weekly_hours, progress, week=current)
+    result["built"] = built["summary_name"]
+    return result
+
+
+def needs_refresh(summary, max_age_seconds):
+    """Whether the summary's last full rebuild is older than ``max_age_seconds``."""
+    refreshed_at = summary.get("refreshed_at")
+    if refreshed_at is None:
+        return True
+    if refreshed_at.tzinfo is None:
+        refreshed_at = refreshed_at.replace(tzinfo=datetime.timezone.utc)
+    age = datetime.datetime.now(datetime.timezone.utc) - refreshed_at
+    return age.total_seconds() > max_age_seconds
+
+
+def _older_than(field, cutoff):
+    return {"$or": [{field: {"$exists": False}}, {field: {"$lt": cutoff}}]}
+
+
+def claim_stale_refresh(max_age_seconds):
+    """
+    Mark the current summary as queued for refresh if it was last rebuilt
+    more than ``max_age_seconds`` ago.
+
+    Returns True for exactly one caller per stale period, so concurrent
+    readers queue a single refresh between them.
+    """
+    now = datetime.datetime.now(FINLAND_TZ)
+    cutoff = now - datetime.timedelta(seconds=max_age_seconds)
+    result = get_collection_efficiency().update_one(
+        {
+            **summary_key(),
+            "$and": [
+                _older_than("refreshed_at", cutoff),
+                _older_than("refresh_queued_at", cutoff),
+            ],
+        },
+        {"$set": {"refresh_queued_at": now}},
+    )
+    return result.modified_count == 1
+
+
+def _counted(order):
+    if order is not None and order.get("Osasto") in EFFICIENCY_OSASTOT:
+        return order
+    return None
+
+
+def _efficiency(total_field):
+    hours = "$viikon_tyotunnit"
+    return {
+        "$cond": [
+            {"$gt": [hours, 0]},
+            {"$round": [{"$divide": [total_field, hours]}, 2]},
+            None,
+        ]
+    }
+
+
+def apply_order_change(before, after):
+    """
+    Fold a single order write into the current week's summary.
+
+    ``before`` and ``after`` are the full order document around the write
+    (None for an insert or a delete). Only the difference in KPL totals is
+    added to the summary and only this order's entry in ``items`` is
+    replaced, so nothing else is re-read. Does nothing until weekly hours
+    have created the week's summary.
+    """
+    before, after = _counted(before), _counted(after)
+    if before is None and after is None:
+        return
+
+    order_id = (after or before)["_id"]
+    old_fields = kpl_fields(before) if before else {}
+    new_fields = kpl_fields(after) if after else {}
+    if after is not None:
+        stale = {
+            field: value
+            for field, value in new_fields.items()
+            if after.get(field) != value
+        }
+        if stale:
+            get_collection().update_one(
+                {"_id": order_id}, {"$set": {**stale, **revision_fields()}}
+            )
+
+    summary = get_collection_efficiency().find_one(
+        summary_key(), {"summary_name": 1, "items_spilled": 1}
+    )
+    if summary is None:
+        return
+
+    item = slim_item({**after, **new_fields}) if after is not None else None
+    if summary.get("items_spilled"):
+        _apply_spilled_item(summary["summary_name"], str(order_id), item)
+        items = "$items"
+    else:
+        items = _replace_item(str(order_id), item)
+
+    get_collection_efficiency().update_one(
+        {"_id": summary["_id"]},
+        [
+            {
+                "$set": {
+                    "total_kpl_std_ajalla": {
+                        "$add": [
+                            {"$ifNull": ["$total_kpl_std_ajalla", 0]},
+                            new_fields.get(KPL_STD, 0) - old_fields.get(KPL_STD, 0),
+                        ]
+                    },
+                    "total_kpl_target_ajalla": {
+                        "$add": [
+                            {"$ifNull": ["$total_kpl_target_ajalla", 0]},
+                            new_fields.get(KPL_TARGET, 0)
+                            - old_fields.get(KPL_TARGET, 0),
+                        ]
+                    },
+                    "items": items,
+                    "updated_at": datetime.datetime.now(FINLAND_TZ),
+                }
+            },
+            {
+                "$set": {
+                    "EFFICIENCY NOW": _efficiency("$total_kpl_std_ajalla"),
+                    "EFFICIENCY TARGET": _efficiency("$total_kpl_target_ajalla"),
+                }
+            },
+        ],
+    )
+
+
+def _replace_item(item_id, item):
+    """Pipeline expression for ``items`` with ``item_id`` replaced by ``item``."""
+    same_order = {"$eq": ["$$this._id", item_id]}
+    items = {
+        "$filter": {
+            "input": {"$ifNull": ["$items", []]},
+            "cond": {"$not": [same_order]},
+        }
+    }
+    if item is not None:
+        previous = {
+            "$arrayElemAt": [
+                {"$filter": {"input": {"$ifNull": ["$items", []]}, "cond": same_order}},
+                0,
+            ]
+        }
+        # Status is edited on the summary itself, so keep the stored one
+        status = {
+            "$ifNull": [
+                {"$let": {"vars": {"previous": previous}, "in": "$$previous.Status"}},
+                {"$literal": item.get("Status")},
+            ]
+        }
+        items = {
+            "$concatArrays": [
+                items,
+                [{"$mergeObjects": [{"$literal": item}, {"Status": status}]}],
+            ]
+        }
+    return items
+
+
+def _apply_spilled_item(summary_name, item_id, item):
+    """Replace (or with ``item`` None, remove) one item of a spilled summary."""
+    children = get_collection_efficiency_items()
+    key = {"summary_name": summary_name, "item_id": item_id}
+    if item is None:
+        children.delete_one(key)
+        return
+    fields = {field: value for field, value in item.items() if field != "_id"}
+    # Status is edited on the summary itself, so keep the stored one
+    status = fields.pop("Status", None)
+    update = {"$set": fields}
+    cleared = {field: "" for field in ITEM_FIELDS if field not in item}
+    cleared.pop("Status", None)
+    if cleared:
+        update["$unset"] = cleared
+    if status is not None:
+        update["$setOnInsert"] = {"Status": status}
+    children.update_one(key, update, upsert=True)
+
+
+def saved_summaries(years, weeks, include_items=True):
+    """
+    Saved summaries of the given ISO years and weeks, oldest first.
+
+    One query on the summary key index; ``include_items=False`` leaves the
+    order snapshots out.
+    """
+    return _find_summaries(
+        {"iso_year": {"$in": list(years)}, "iso_week": {"$in": list(weeks)}},
+        include_items,
+    )
+
+
+def recent_summaries(count, include_items=True, now=None):
+    """
+    Saved summaries of the last ``count`` weeks up to the current one.
+
+    A range on the summary key index: one scan, or three when the range
+    crosses a year boundary.
+    """
+    now = now or datetime.datetime.now(FINLAND_TZ)
+    first = summary_week(now - datetime.timedelta(weeks=count - 1))
+    last = summary_week(now)
+    if first["iso_year"] == last["iso_year"]:
+        query = {
+            "iso_year": last["iso_year"],
+            "iso_week": {"$gte": first["iso_week"], "$lte": last["iso_week"]},
+        }
+    else:
+        query = {
+            "$or": [
+                {
+                    "iso_year": first["iso_year"],
+                    "iso_week": {"$gte": first["iso_week"]},
+                },
+                {"iso_year": {"$gt": first["iso_year"], "$lt": last["iso_year"]}},
+                {"iso_year": last["iso_year"], "iso_week": {"$lte": last["iso_week"]}},
+            ]
+        }
+    return _find_summaries(query, include_items)
+
+
+def _find_summaries(query, include_items):
+    projection = None if include_items else {"items": 0}
+    return list(
+        get_collection_efficiency()
+        .find({"site": SITE, "kind": SAVED, **query}, projection)
+        .sort([("iso_year", 1), ("iso_week", 1)])
+    )
+
+
+def compare_weeks(summaries):
+    """
+    Per-week totals with the change from the previous week in the list.
+
+    ``summaries`` must be in chronological order; the first week has no
+    deltas.
+    """
+    compared = []
+    previous = None
+    for summary in summaries:
+        week = {
+            "iso_year": summary.get("iso_year"),
+            "iso_week": summary.get("iso_week"),
+            "viikon_tyotunnit": summary.get("viikon_tyotunnit"),
+            **{field: summary.get(field) for field in COMPARED_FIELDS},
+        }
+        week["delta"] = {
+            field: (
+                round(week[field] - previous[field], 2)
+                if previous is not None
+                and isinstance(week[field], (int, float))
+                and isinstance(previous[field], (int, float))
+                else None
+            )
+            for field in COMPARED_FIELDS
+        }
+        compared.append(week)
+        previous = week
+    return compared
+
+
+def _legacy_week(week, seen_at, fallback_year=None):
+    """
+    ISO year/week of a legacy summary name that only carried the week.
+
+    The year comes from ``seen_at`` (a save or refresh time of the summary),
+    moved by one when the week is on the other side of a year boundary.
+    """
+    if seen_at is None:
+        return {"iso_year": fallback_year, "iso_week": week}
+    if seen_at.tzinfo is None:
+        seen_at = pytz.utc.localize(seen_at)
+    year, seen_week, _ = seen_at.astimezone(FINLAND_TZ).isocalendar()
+    if week - seen_week > 26:
+        year -= 1
+    elif seen_week - week > 26:
+        year += 1
+    return {"iso_year": year, "iso_week": week}
+
+
+def backfill_summary_keys():
+    """
+    Add site/kind/iso_year/iso_week keys to summaries named the old way.
+
+    Weeks are parsed from the names; the year comes from stored week keys,
+    the save, refresh or creation time, or the saved name. Summaries are renamed to
+    summary_name() of their key, together with any spilled items.
+    Returns the number of summaries updated and ``[(name, new name)]`` of
+    those skipped because a summary with the new key already exists.
+    """
+    efficiency_collection = get_collection_efficiency()
+    updated = 0
+    skipped = []
+    for summary in efficiency_collection.find(
+        {"kind": {"$exists": False}},
+        {
+            "summary_name": 1,
+            "iso_year": 1,
+            "iso_week": 1,
+            "saved_at": 1,
+            "refreshed_at": 1,
+            "updated_at": 1,
+        },
+    ):
+        name = summary.get("summary_name") or ""
+        saved, live = SAVED_NAME.match(name), LEGACY_LIVE_NAME.match(name)
+        if saved:
+            kind = SAVED
+            week = (
+                {"iso_year": summary["iso_year"], "iso_week": summary["iso_week"]}
+                if "iso_week" in summary
+                else _legacy_week(
+                    int(saved.group(1)), summary.get("saved_at"), int(saved.group(2))
+                )
+            )
+        elif live:
+            kind = LIVE
+            week = _legacy_week(
+                int(live.group(1)),
+                summary.get("refreshed_at") or summary.get("updated_at")
+                # ObjectIds carry their creation time
+                or summary["_id"].generation_time,
+            )
+        else:
+            continue
+
+        key = summary_key(kind, week)
+        new_name = summary_name(key)
+        try:
+            efficiency_collection.update_one(
+                {"_id": summary["_id"]}, {"$set": {**key, "summary_name": new_name}}
+            )
+        except DuplicateKeyError:
+            skipped.append((name, new_name))
+            continue
+        get_collection_efficiency_items().update_many(
+            {"summary_name": name}, {"$set": {"summary_name": new_name}}
+        )
+        updated += 1
+    return updated, skipped
+
+
+def slim_summaries():
+    """
+    Rewrite every stored summary with slim items, spilling oversized ones.
+
+    Summaries are loaded one at a time. Returns the number rewritten.
+    """
+    efficiency_collection = get_collection_efficiency()
+    names = [
+        summary["summary_name"]
+        for summary in efficiency_collection.find(
+            {"summary_name": {"$exists": True}}, {"summary_name": 1}
+        )
+    ]
+    for name in names:
+        summary = efficiency_collection.find_one({"summary_name": name})
+        items = [slim_item(item) for item in summary_items(summary)]
+        efficiency_collection.update_one(
+            {"_id": summary["_id"]}, {"$set": place_items(name, items)}
+        )
+    return len(names)
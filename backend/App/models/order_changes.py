@@ -0,0 +1,127 @@
+from datetime import datetime, timedelta, timezone
+from pymongo import ReturnDocument
+from App.extensions.db import (
+    get_collection,
+    get_collection_counters,
+    get_collection_tombstones,
+)
+
+# Counter document holding the last order revision handed out
+REVISION_KEY = "orders:rev"
+# Counter document holding the newest revision of a pruned tombstone
+TOMBSTONE_HORIZON_KEY = "orders:tombstone_horizon"
+# Clients that have not synced for longer than this must reload everything
+TOMBSTONE_RETENTION_SECONDS = 30 * 24 * 3600
+
+
+def _osasto_key(osasto):
+    return f"osasto:{osasto}"
+
+
+def bump_osasto_versions(*osastot):
+    """
+    Increment the change counter of every department touched by a write.
+
+    Section views use the counter as their ETag, so any write that changes
+    what ``/api/osasto/<n>`` returns must bump the affected departments.
+    """
+    counters = get_collection_counters()
+    for osasto in {o for o in osastot if o is not None}:
+        counters.update_one(
+            {"_id": _osasto_key(osasto)}, {"$inc": {"seq": 1}}, upsert=True
+        )
+
+
+def get_osasto_version(osasto):
+    """Return the current change counter of a department."""
+    counter = get_collection_counters().find_one({"_id": _osasto_key(osasto)})
+    return counter["seq"] if counter else 0
+
+
+def get_osasto_versions(osastot):
+    """Return ``{osasto: counter}`` for several departments in one query."""
+    keys = {_osasto_key(osasto): osasto for osasto in osastot}
+    versions = dict.fromkeys(keys.values(), 0)
+    for counter in get_collection_counters().find({"_id": {"$in": list(keys)}}):
+        versions[keys[counter["_id"]]] = counter["seq"]
+    return versions
+
+
+def next_revision():
+    """Allocate the next order revision (monotonically increasing)."""
+    counter = get_collection_counters().find_one_and_update(
+        {"_id": REVISION_KEY},
+        {"$inc": {"seq": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return counter["seq"]
+
+
+def get_revision():
+    """Return the last revision handed out, 0 before the first write."""
+    counter = get_collection_counters().find_one({"_id": REVISION_KEY})
+    return counter["seq"] if counter else 0
+
+
+def revision_fields():
+    """
+    Fields to ``$set`` on every order write.
+
+    ``/api/orders/changes`` serves orders by ``_rev``, so a write that
+    skips these is never seen by syncing clients.
+    """
+    return {"_rev": next_revision(), "updated_at": datetime.now(timezone.utc)}
+
+
+def touch_orders(*order_ids):
+    """Stamp a new revision on orders changed by a write that did not set it."""
+    ids = [order_id for order_id in order_ids if order_id is not None]
+    if ids:
+        get_collection().update_many({"_id": {"$in": ids}}, {"$set": revision_fields()})
+
+
+def record_deletes(*order_ids):
+    """Leave a tombstone per deleted order so clients can drop their copy."""
+    ids = [order_id for order_id in order_ids if order_id is not None]
+    if not ids:
+        return
+    fields = revision_fields()
+    get_collection_tombstones().insert_many(
+        [
+            {
+                "order_id": order_id,
+                "_rev": fields["_rev"],
+                "deleted_at": fields["updated_at"],
+            }
+            for order_id in ids
+        ]
+    )
+
+
+def get_tombstone_horizon():
+    """Newest revision whose tombstones may have been pruned, 0 before any."""
+    counter = get_collection_counters().find_one({"_id": TOMBSTONE_HORIZON_KEY})
+    return counter["seq"] if counter else 0
+
+
+def prune_tombstones(max_age_seconds=TOMBSTONE_RETENTION_SECONDS):
+    """
+    Delete tombstones older than ``max_age_seconds``; returns how many.
+
+    The newest pruned revision is recorded first, so /orders/changes can
+    tell clients that synced before it to reload.
+    """
+    tombstones = get_collection_tombstones()
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=max_age_seconds)
+    newest = tombstones.find_one(
+        {"deleted_at": {"$lt": cutoff}}, {"_rev": 1}, sort=[("_rev", -1)]
+    )
+    if newest is None:
+        return 0
+    get_collection_counters().update_one(
+        {"_id": TOMBSTONE_HORIZON_KEY}, {"$max": {"seq": newest["_rev"]}}, upsert=True
+    )
+    return tombstones.delete_many(
+        {"deleted_at": {"$lt": cutoff}, "_rev": {"$lte": newest["_rev"]}}
+    ).deleted_count
@@ -0,0 +1,301 @@
+import csv
+import io
+from itertools import islice
+import pandas as pd
+from openpyxl import load_workbook
+from pymongo import InsertOne, UpdateOne
+
+# An order row is identified by these columns across re-imports
+ORDER_KEY_FIELDS = ("Sales order", "Item number", "Reference number")
+# Only set when a row is inserted, so re-imports keep the planning state
+INSERT_DEFAULTS = {"Osasto": 1, "Jononumero": 1}
+BATCH_SIZE = 1000
+# Rows parsed and enriched at a time, bounding memory for large exports
+CHUNK_SIZE = 5000
+SUPPORTED_EXTENSIONS = (".xlsx", ".csv")
+# Read as text from CSV, so e.g. leading zeros survive
+TEXT_COLUMNS = {field: str for field in ORDER_KEY_FIELDS}
+
+
+def read_order_chunks(stream, filename, chunk_size=CHUNK_SIZE):
+    """
+    Yield DataFrames of at most ``chunk_size`` rows from an uploaded file.
+
+    Reads straight from the (seekable) upload stream: CSV through pandas'
+    chunked reader, ``.xlsx`` through openpyxl's read-only mode, so the
+    workbook is never loaded as a whole. Uploads are kept in memory by
+    MemoryUploadRequest, so nothing is written to disk.
+    """
+    if filename.lower().endswith(".csv"):
+        yield from _read_csv_chunks(stream, chunk_size)
+    elif filename.lower().endswith(".xlsx"):
+        yield from _read_xlsx_chunks(stream, chunk_size)
+    else:
+        raise ValueError(
+            f"Unsupported file type, expected one of {', '.join(SUPPORTED_EXTENSIONS)}"
+        )
+
+
+def _read_csv_chunks(stream, chunk_size):
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    sample = text.read(4096)
+    text.seek(0)
+    try:
+        # ERP exports use ";" or "," depending on the locale
+        delimiter = csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+    except csv.Error:
+        delimiter = ","
+    yield from pd.read_csv(
+        text, sep=delimiter, chunksize=chunk_size, dtype=TEXT_COLUMNS
+    )
+
+
+def _read_xlsx_chunks(stream, chunk_size):
+    workbook = load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) if name is not None else "" for name in header]
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            # Formatted-but-empty rows are common at the end of exports
+            chunk = [row for row in chunk if any(value is not None for value in row)]
+            if chunk:
+                df = pd.DataFrame(chunk, columns=columns)
+                yield df.drop(columns="", errors="ignore")
+    finally:
+        workbook.close()
+
+
+def key_text(value):
+    """
+    An order key value as text, the same for CSV and Excel imports.
+
+    Excel hands over numbers (``12345`` or ``12345.0``) where CSV has
+    ``"12345"``; missing values stay missing.
+    """
+    if value is None or (isinstance(value, float) and value != value):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value)
+
+
+def load_codes(codes_collection):
+    """Load the codes table as a DataFrame keyed on the normalised item number."""
+    codes = pd.DataFrame(
+        list(
+            codes_collection.find(
+                {},
+                {
+                    "_id": 0,
+                    "Item number": 1,
+                    "Category": 1,
+                    "Standardiaika": 1,
+                    "Kategoria": 1,
+                },
+            )
+        ),
+        columns=["Item number", "Category", "Standardiaika", "Kategoria"],
+    )
+    codes["item_key"] = codes["Item number"].astype(str).str.strip().str.upper()
+    codes["Standardiaika"] = pd.to_numeric(
+        codes["Standardiaika"].astype(str).str.replace(",", ".", regex=False),
+        errors="coerce",
+    )
+    # Later duplicates win, like the dict lookup this replaces
+    return codes.drop(columns="Item number").drop_duplicates("item_key", keep="last")
+
+
+def enrich_orders(df, codes):
+    """
+    Add the codes-table fields and the ISO week (VKO) to an ERP export.
+
+    Works column-wise. Columns present in the export win over the derived
+    ones, and empty values are dropped from the returned records.
+    """
+    df = df.reset_index(drop=True)
+    for field in ORDER_KEY_FIELDS:
+        if field in df:
+            df[field] = df[field].map(key_text).astype(object)
+    item_keys = df.get("Item number", pd.Series("", index=df.index))
+    item_keys = item_keys.astype(str).str.strip().str.upper()
+
+    enriched = pd.DataFrame({"item_key": item_keys}).merge(
+        codes, on="item_key", how="left"
+    )
+    enriched["Category"] = enriched["Category"].fillna("Unknown")
+    enriched["Standardiaika"] = enriched["Standardiaika"].fillna(0)
+    enriched["Kategoria"] = enriched["Kategoria"].fillna("Unknown")
+
+    ship_dates = pd.to_datetime(
+        df.get("Ship date", pd.Series(None, index=df.index, dtype=object)),
+        format="%d/%m/%Y",
+        errors="coerce",
+    )
+    enriched["VKO"] = ship_dates.dt.isocalendar().week.astype("Int64")
+
+    derived = enriched.drop(columns="item_key")
+    derived = derived[[column for column in derived if column not in df]]
+    combined = pd.concat([derived, df], axis=1)
+
+    return [
+        {
+            key: value
+            for key, value in record.items()
+            if pd.notnull(value) and value != ""
+        }
+        for record in combined.to_dict("records")
+    ]
+
+
+def _write(collection, operations, report):
+    result = collection.bulk_write(operations, ordered=False)
+    report["inserted"] += result.inserted_count + result.upserted_count
+    report["updated"] += result.modified_count
+    report["unchanged"] += result.matched_count - result.modified_count
+
+
+def _order_key(document):
+    return tuple(document.get(field) for field in ORDER_KEY_FIELDS)
+
+
+def _stored_orders(collection, records):
+    """Existing orders matching the keys of ``records``, by key."""
+    keys = {_order_key(record) for record in records if record.get("Sales order")}
+    if not keys:
+        return {}
+    fields = {field for record in records for field in record}
+    stored = collection.find(
+        {"$or": [dict(zip(ORDER_KEY_FIELDS, key)) for key in keys]},
+        {"_id": 0, "Osasto": 1, **{field: 1 for field in fields}},
+    )
+    return {_order_key(document): document for document in stored}
+
+
+def upsert_orders(
+    collection,
+    records,
+    report=None,
+    batch_size=BATCH_SIZE,
+    stamp=None,
+    osastot=None,
+):
+    """
+    Write enriched records with batched, unordered upserts.
+
+    Rows are matched on ``ORDER_KEY_FIELDS``; rows without a sales order
+    cannot be matched and are inserted. Rows identical to the stored order
+    are skipped, the rest also get the ``stamp`` fields (the sync revision).
+    The departments of written orders, before and after, are added to the
+    ``osastot`` set. Returns (and updates) a report of
+    inserted/updated/unchanged counts.
+    """
+    if report is None:
+        report = {"inserted": 0, "updated": 0, "unchanged": 0}
+    stamp = stamp or {}
+    if osastot is None:
+        osastot = set()
+
+    for start in range(0, len(records), batch_size):
+        batch = records[start : start + batch_size]
+        stored = _stored_orders(collection, batch)
+        operations = []
+        for record in batch:
+            defaults = {
+                key: value
+                for key, value in INSERT_DEFAULTS.items()
+                if key not in record
+            }
+            if record.get("Sales order") is None:
+                operations.append(InsertOne({**defaults, **record, **stamp}))
+                osastot.add({**defaults, **record}.get("Osasto"))
+                continue
+
+            existing = stored.get(_order_key(record))
+            if existing is not None and all(
+                existing.get(key) == value for key, value in record.items()
+            ):
+                report["unchanged"] += 1
+                continue
+            if existing is None:
+                osastot.add({**defaults, **record}.get("Osasto"))
+            else:
+                osastot.update((existing.get("Osasto"), record.get("Osasto")))
+            update = {"$set": {**record, **stamp}}
+            if defaults:
+                update["$setOnInsert"] = defaults
+            operations.append(
+                UpdateOne(
+                    dict(zip(ORDER_KEY_FIELDS, _order_key(record))), update, upsert=True
+                )
+            )
+        if operations:
+            _write(collection, operations, report)
+
+    return report
+
+
+def normalize_order_keys(collection, stamp=None):
+    """
+    Store numeric order key values as text, as imports now write them.
+
+    Orders imported from Excel before keys were normalised hold numbers and
+    would not match the same row imported again. ``stamp`` fields are set
+    on every converted order. Returns the number of values converted.
+    """
+    updated = 0
+    for field in ORDER_KEY_FIELDS:
+        value = f"${field}"
+        # Whole doubles lose their ".0" the way key_text() drops it
+        whole = {
+            "$cond": [{"$eq": [{"$trunc": value}, value]}, {"$toLong": value}, value]
+        }
+        result = collection.update_many(
+            {field: {"$type": ["int", "long", "double", "decimal"]}},
+            [{"$set": {field: {"$toString": whole}, **(stamp or {})}}],
+        )
+        updated += result.modified_count
+    return updated
+
+
+def import_orders(
+    stream, filename, collection, codes_collection, progress=None, stamp=None
+):
+    """
+    Read, enrich and upsert an ERP export chunk by chunk.
+
+    ``progress(done)`` is called with the number of rows read after each
+    chunk. ``stamp()`` returns the fields stamped on the orders a chunk
+    changes. The result lists the departments whose orders were written in
+    ``osastot``. Raises ValueError when the file has no usable rows.
+    """
+    codes = load_codes(codes_collection)
+    report = {"inserted": 0, "updated": 0, "unchanged": 0}
+    osastot = set()
+    total_rows = 0
+    enriched_rows = 0
+    for df in read_order_chunks(stream, filename):
+        total_rows += len(df)
+        records = enrich_orders(df, codes)
+        enriched_rows += len(records)
+        upsert_orders(
+            collection,
+            records,
+            report,
+            stamp=stamp() if stamp else None,
+            osastot=osastot,
+        )
+        if progress:
+            progress(total_rows, message=f"{total_rows} rows imported")
+
+    if total_rows == 0:
+        raise ValueError("Uploaded Excel file is empty")
+    if enriched_rows == 0:
+        raise ValueError("No data was enriched or inserted")
+    osastot.discard(None)
+    return {"inserted_records": enriched_rows, **report, "osastot": sorted(osastot)}
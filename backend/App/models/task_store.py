@@ -0,0 +1,696 @@
+from datetime import datetime, time, timedelta, timezone
+from flask import current_app
+from pymongo import ReturnDocument, UpdateOne
+import pytz
+from App.extensions.db import get_collection, get_collection_tasks
+
+FINLAND_TZ = pytz.timezone("Europe/Helsinki")
+
+# Fields that only exist on task documents in the task collection
+INTERNAL_TASK_FIELDS = ("_id", "order_id", "open")
+# Sections whose completed quantity is tracked in total_made{section}
+COUNTED_SECTIONS = ("Hygienia", "Pakkaus")
+# Default and largest page of tasks_for_worker(); the embedded store
+# returns a page as one aggregation document, limited to 16 MB
+WORKER_PAGE_SIZE = 100
+MAX_WORKER_PAGE_SIZE = 1000
+
+
+def start_bounds(start):
+    """
+    Convert an optional ``(from, to)`` pair of dates into bounds on ``start``.
+
+    ``to`` is inclusive, so the upper bound is midnight (Finnish time) of
+    the following day.
+    """
+    start_from, start_to = start or (None, None)
+    if start_from is not None:
+        start_from = FINLAND_TZ.localize(datetime.combine(start_from, time.min))
+    if start_to is not None:
+        start_to = FINLAND_TZ.localize(
+            datetime.combine(start_to + timedelta(days=1), time.min)
+        )
+    return start_from, start_to
+
+
+def closed_task_query(section=None, start=None):
+    """Filter on task fields selecting closed tasks, optionally narrowed."""
+    query = {"end_time": {"$exists": True}, **start_query(start)}
+    if section:
+        query["section"] = section
+    return query
+
+
+def start_query(start):
+    """Query fragment restricting ``start`` to a ``(from, to)`` date range."""
+    start_from, start_to = start_bounds(start)
+    bounds = {}
+    if start_from is not None:
+        bounds["$gte"] = start_from
+    if start_to is not None:
+        bounds["$lt"] = start_to
+    return {"start": bounds} if bounds else {}
+
+
+def task_seconds(prefix):
+    """
+    Aggregation expression for the seconds worked on a task.
+
+    ``prefix`` is the path to the task (``"$Task."`` or ``"$"``).
+    """
+    return {"$ifNull": [f"{prefix}duration_seconds", 0]}
+
+
+def to_local(value):
+    """Return a stored task time as an aware Europe/Helsinki datetime."""
+    if isinstance(value, str):
+        # Tasks written before `flask backfill-task-times` store ISO strings
+        value = datetime.fromisoformat(value)
+        if value.tzinfo is None:
+            value = FINLAND_TZ.localize(value)
+    elif value.tzinfo is None:
+        # BSON dates are UTC and come back naive
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(FINLAND_TZ)
+
+
+def format_duration(seconds):
+    """Format seconds as the "hh:mm" string the frontend shows."""
+    hours, remainder = divmod(int(seconds), 3600)
+    return f"{hours:02}:{remainder // 60:02}"
+
+
+def serialize_task(task):
+    """
+    Render a stored task in the API format.
+
+    Times become Finnish local datetimes, which the JSON provider writes as
+    the ISO strings tasks stored before they had dates, and ``total_time``
+    is derived from ``duration_seconds``.
+    """
+    task = dict(task)
+    for field in ("start", "end_time"):
+        if isinstance(task.get(field), datetime):
+            task[field] = to_local(task[field])
+    if "duration_seconds" in task:
+        task["total_time"] = format_duration(task["duration_seconds"])
+    return task
+
+
+def get_task_store():
+    """Return the task store selected by the TASK_STORAGE setting."""
+    if current_app.config.get("TASK_STORAGE") == "collection":
+        return CollectionTaskStore(get_collection(), get_collection_tasks())
+    return EmbeddedTaskStore(get_collection())
+
+
+class EmbeddedTaskStore:
+    """
+    Tasks stored in the ``Task`` array of each order document.
+    """
+
+    def __init__(self, orders):
+        self.orders = orders
+
+    def add_tasks(self, order_id, tasks, set_fields):
+        """Append tasks to an order; returns the (projected) order or None."""
+        return self.orders.find_one_and_update(
+            {"_id": order_id},
+            {"$set": set_fields, "$push": {"Task": {"$each": tasks}}},
+            projection={"Osasto": 1},
+        )
+
+    def open_group_tasks(self, order_id, group_id):
+        document = self.orders.find_one({"_id": order_id}, {"Task": 1})
+        return [
+            task
+            for task in (document or {}).get("Task", [])
+            if task.get("group_id") == group_id and "end_time" not in task
+        ]
+
+    def close_tasks(self, order_id, closed, section=None, set_fields=None):
+        """
+        Merge ``closed`` (task_id -> fields) into still open tasks.
+
+        All tasks are closed by one pipeline update, and only if every one
+        of them is still open. The same update sets ``set_fields`` and, with
+        a counted ``section``, adds the tasks' ``kpl_done`` to
+        total_made{section} and derives Status{section} (see
+        section_total_stages). Returns the order's new ``(total_made,
+        status)`` of ``section``, or None when the tasks were not open.
+        """
+        query = {
+            "_id": order_id,
+            "$and": [
+                {"Task": {"$elemMatch": {"task_id": task_id, "end_time": None}}}
+                for task_id in closed
+            ],
+        }
+        is_open = {
+            "$and": [
+                {"$in": ["$$task.task_id", list(closed)]},
+                {"$eq": [{"$ifNull": ["$$task.end_time", None]}, None]},
+            ]
+        }
+        closing = {
+            "$switch": {
+                "branches": [
+                    {
+                        "case": {"$eq": ["$$task.task_id", task_id]},
+                        "then": {"$literal": fields},
+                    }
+                    for task_id, fields in closed.items()
+                ],
+                "default": {},
+            }
+        }
+        pipeline = [
+            {
+                "$set": {
+                    **{
+                        key: {"$literal": value}
+                        for key, value in (set_fields or {}).items()
+                    },
+                    "Task": {
+                        "$map": {
+                            "input": "$Task",
+                            "as": "task",
+                            "in": {
+                                "$cond": [
+                                    is_open,
+                                    {"$mergeObjects": ["$$task", closing]},
+                                    "$$task",
+                                ]
+                            },
+                        }
+                    },
+                }
+            }
+        ]
+        if section:
+            kpl_done = sum(fields.get("kpl_done", 0) for fields in closed.values())
+            pipeline.extend(section_total_stages(section, kpl_done))
+
+        document = self.orders.find_one_and_update(
+            query,
+            pipeline,
+            projection=section_projection(section),
+            return_document=ReturnDocument.AFTER,
+        )
+        return section_fields(document, section)
+
+    def update_task(self, order_id, task_id, fields):
+        """
+        Update a single task in place.
+
+        Returns the task as it was before the update, or None if it does
+        not exist.
+        """
+        document = self.orders.find_one_and_update(
+            {"_id": order_id, "Task.task_id": task_id},
+            {"$set": {f"Task.$.{key}": value for key, value in fields.items()}},
+            projection={"Task.$": 1},
+        )
+        return document["Task"][0] if document else None
+
+    def tasks_for_order(self, order_id, section=None):
+        document = self.orders.find_one({"_id": order_id}, {"Task": 1})
+        tasks = (document or {}).get("Task", [])
+        if section is not None:
+            tasks = [task for task in tasks if task.get("section") == section]
+        return tasks
+
+    def tasks_for_worker(
+        self,
+        worker_name,
+        projection,
+        section=None,
+        start=None,
+        skip=0,
+        limit=WORKER_PAGE_SIZE,
+    ):
+        """
+        Return ``([(order, task), ...], total)`` for a worker's tasks.
+
+        Only the worker's matching task elements leave the database: orders
+        are found through the multikey ``Task.workerName`` index, the array
+        is filtered server-side and unwound, newest tasks first.
+        ``start`` is an optional ``(from, to)`` pair of dates.
+        """
+        conditions = [{"$eq": ["$$task.workerName", worker_name]}]
+        if section is not None:
+            conditions.append({"$eq": ["$$task.section", section]})
+        for operator, bound in zip(("$gte", "$lt"), start_bounds(start)):
+            if bound is not None:
+                conditions.append({operator: ["$$task.start", bound]})
+
+        page = [{"$skip": skip}, {"$limit": min(limit, MAX_WORKER_PAGE_SIZE)}]
+        pipeline = [
+            {"$match": {"Task.workerName": worker_name}},
+            {
+                "$project": {
+                    **projection,
+                    "Task": {
+                        "$filter": {
+                            "input": "$Task",
+                            "as": "task",
+                            "cond": {"$and": conditions},
+                        }
+                    },
+                }
+            },
+            {"$unwind": "$Task"},
+            {"$sort": {"Task.start": -1, "_id": 1}},
+            {"$facet": {"rows": page, "total": [{"$count": "count"}]}},
+        ]
+        result = next(self.orders.aggregate(pipeline))
+        rows = [(doc, doc.pop("Task")) for doc in result["rows"]]
+        total = result["total"][0]["count"] if result["total"] else 0
+        return rows, total
+
+    def section_durations(self, fields, section=None, start=None):
+        """
+        Seconds worked per (order, section) over closed tasks.
+
+        Section and start-date filters are applied before ``$unwind``, so
+        only orders with matching tasks are read. Each row carries the
+        order ``_id``, ``section``, ``seconds`` and the requested ``fields``.
+        """
+        task_match = closed_task_query(section, start)
+        pipeline = [
+            {"$match": {"Task": {"$elemMatch": task_match}}},
+            {"$project": {**{field: 1 for field in fields}, "Task": 1}},
+            {"$unwind": "$Task"},
+            {"$match": {f"Task.{key}": value for key, value in task_match.items()}},
+            {
+                "$group": {
+                    "_id": {"order": "$_id", "section": "$Task.section"},
+                    "seconds": {"$sum": task_seconds("$Task.")},
+                    **{field: {"$first": f"${field}"} for field in fields},
+                }
+            },
+            {"$sort": {"_id.order": 1, "_id.section": 1}},
+        ]
+        for row in self.orders.aggregate(pipeline):
+            key = row.pop("_id")
+            yield {**row, "_id": key["order"], "section": key["section"]}
+
+    def open_tasks_stages(self, section):
+        """Aggregation stages replacing ``Task`` with a section's open tasks."""
+        return [
+            {
+                "$set": {
+                    "Task": {
+                        "$filter": {
+                            "input": {"$ifNull": ["$Task", []]},
+                            "as": "task",
+                            "cond": {
+                                "$and": [
+                                    {"$eq": ["$$task.section", section]},
+                                    {
+                                        "$eq": [
+                                            {"$type": "$$task.end_time"},
+                                            "missing",
+                                        ]
+                                    },
+                                ]
+                            },
+                        }
+                    }
+                }
+            }
+        ]
+
+    def clear(self, order_id):
+        """Remove every task of an order; returns the number of orders changed."""
+        result = self.orders.update_one({"_id": order_id}, {"$set": {"Task": []}})
+        return result.modified_count
+
+    def copy_tasks(self, source_id, target_id):
+        # Duplicated rows already carry the embedded Task array
+        pass
+
+    def delete_for_order(self, order_id):
+        # Tasks are deleted together with the order document
+        pass
+
+
+class CollectionTaskStore:
+    """
+    Tasks stored as one document each in a separate, indexed collection.
+
+    Every task document references its order through ``order_id`` and
+    carries an ``open`` flag, so all writes are single-document updates.
+    """
+
+    def __init__(self, orders, tasks):
+        self.orders = orders
+        self.tasks = tasks
+
+    @staticmethod
+    def public(task):
+        """Strip storage-only fields so tasks look like embedded ones."""
+        for field in INTERNAL_TASK_FIELDS:
+            task.pop(field, None)
+        return task
+
+    def add_tasks(self, order_id, tasks, set_fields):
+        document = self.orders.find_one_and_update(
+            {"_id": order_id}, {"$set": set_fields}, projection={"Osasto": 1}
+        )
+        if document is not None:
+            self.tasks.insert_many(
+                [{**task, "order_id": order_id, "open": True} for task in tasks]
+            )
+        return document
+
+    def open_group_tasks(self, order_id, group_id):
+        return [
+            self.public(task)
+            for task in self.tasks.find(
+                {"order_id": order_id, "group_id": group_id, "open": True}
+            )
+        ]
+
+    def close_tasks(self, order_id, closed, section=None, set_fields=None):
+        """
+        Close the tasks, then update the order's fields in one more update.
+
+        Tasks live in their own documents, so this cannot be one update;
+        ``set_fields``, the section total and the status still change
+        together.
+        """
+        count = 0
+        kpl_done = 0
+        for task_id, fields in closed.items():
+            result = self.tasks.update_one(
+                {"order_id": order_id, "task_id": task_id, "open": True},
+                {"$set": {**fields, "open": False}},
+            )
+            if result.modified_count:
+                count += 1
+                kpl_done += fields.get("kpl_done", 0)
+        if not count:
+            return None
+
+        pipeline = [
+            {
+                "$set": {
+                    key: {"$literal": value}
+                    for key, value in (set_fields or {}).items()
+                }
+            }
+        ]
+        if section:
+            pipeline.extend(section_total_stages(section, kpl_done))
+        document = self.orders.find_one_and_update(
+            {"_id": order_id},
+            pipeline,
+            projection=section_projection(section),
+            return_document=ReturnDocument.AFTER,
+        )
+        return section_fields(document, section)
+
+    def update_task(self, order_id, task_id, fields):
+        task = self.tasks.find_one_and_update(
+            {"order_id": order_id, "task_id": task_id}, {"$set": fields}
+        )
+        return self.public(task) if task else None
+
+    def tasks_for_order(self, order_id, section=None):
+        query = {"order_id": order_id}
+        if section is not None:
+            query["section"] = section
+        return [self.public(task) for task in self.tasks.find(query)]
+
+    def tasks_for_worker(
+        self,
+        worker_name,
+        projection,
+        section=None,
+        start=None,
+        skip=0,
+        limit=WORKER_PAGE_SIZE,
+    ):
+        query = {"workerName": worker_name, **start_query(start)}
+        if section is not None:
+            query["section"] = section
+
+        tasks = list(
+            self.tasks.find(query)
+            .sort([("start", -1), ("_id", 1)])
+            .skip(skip)
+            .limit(min(limit, MAX_WORKER_PAGE_SIZE))
+        )
+        total = self.tasks.count_documents(query)
+
+        order_ids = list({task["order_id"] for task in tasks})
+        orders = {
+            doc["_id"]: doc
+            for doc in self.orders.find({"_id": {"$in": order_ids}}, projection)
+        }
+        rows = [
+            (orders[task["order_id"]], self.public(task))
+            for task in tasks
+            if task["order_id"] in orders
+        ]
+        return rows, total
+
+    def section_durations(self, fields, section=None, start=None, batch_size=500):
+        totals = list(
+            self.tasks.aggregate(
+                [
+                    {"$match": closed_task_query(section, start)},
+                    {
+                        "$group": {
+                            "_id": {"order": "$order_id", "section": "$section"},
+                            "seconds": {"$sum": task_seconds("$")},
+                        }
+                    },
+                    {"$sort": {"_id.order": 1, "_id.section": 1}},
+                ]
+            )
+        )
+        projection = {field: 1 for field in fields}
+        for offset in range(0, len(totals), batch_size):
+            batch = totals[offset : offset + batch_size]
+            order_ids = list({row["_id"]["order"] for row in batch})
+            orders = {
+                doc["_id"]: doc
+                for doc in self.orders.find({"_id": {"$in": order_ids}}, projection)
+            }
+            for row in batch:
+                order = orders.get(row["_id"]["order"])
+                if order is not None:
+                    yield {
+                        **order,
+                        "section": row["_id"]["section"],
+                        "seconds": row["seconds"],
+                    }
+
+    def open_tasks_stages(self, section):
+        return [
+            {
+                "$lookup": {
+                    "from": self.tasks.name,
+                    "let": {"order_id": "$_id"},
+                    "pipeline": [
+                        {
+                            "$match": {
+                                "$expr": {"$eq": ["$order_id", "$$order_id"]},
+                                "section": section,
+                                "open": True,
+                            }
+                        },
+                        {"$project": {field: 0 for field in INTERNAL_TASK_FIELDS}},
+                    ],
+                    "as": "Task",
+                }
+            }
+        ]
+
+    def clear(self, order_id):
+        return self.tasks.delete_many({"order_id": order_id}).deleted_count
+
+    def copy_tasks(self, source_id, target_id):
+        copies = [
+            {**self.public(task), "order_id": target_id, "open": "end_time" not in task}
+            for task in self.tasks.find({"order_id": source_id})
+        ]
+        if copies:
+            self.tasks.insert_many(copies)
+
+    def delete_for_order(self, order_id):
+        self.tasks.delete_many({"order_id": order_id})
+
+
+def section_total_stages(section, delta):
+    """
+    Update pipeline stages adding ``delta`` to total_made{section} and
+    deriving Status{section} from the new total.
+    """
+    total_made_field = f"total_made{section}"
+    total_made = f"${total_made_field}"
+    quantity = {"$ifNull": ["$Quantity", 0]}
+    return [
+        {"$set": {total_made_field: {"$add": [{"$ifNull": [total_made, 0]}, delta]}}},
+        {
+            "$set": {
+                f"Status{section}": {
+                    "$switch": {
+                        "branches": [
+                            {
+                                "case": {"$eq": [total_made, quantity]},
+                                "then": "Valmis",
+                            },
+                            {
+                                "case": {"$gt": [total_made, quantity]},
+                                "then": "Yli",
+                            },
+                        ],
+                        "default": "Aloitettu",
+                    }
+                }
+            }
+        },
+    ]
+
+
+def section_projection(section):
+    """Projection of the fields section_total_stages() writes."""
+    if not section:
+        return {"_id": 1}
+    return {f"total_made{section}": 1, f"Status{section}": 1}
+
+
+def section_fields(document, section):
+    """``(total_made, status)`` of ``section`` in ``document``; None without one."""
+    if document is None:
+        return None
+    if not section:
+        return None, None
+    return document.get(f"total_made{section}"), document.get(f"Status{section}")
+
+
+def refresh_section_status(orders, order_id, section, delta=0):
+    """
+    Add ``delta`` to total_made{section} and derive Status{section} from it.
+
+    Both fields are computed by the server in one update, so concurrent
+    writers never overwrite each other's totals. Returns the new
+    ``(total_made, status)``.
+    """
+    document = orders.find_one_and_update(
+        {"_id": order_id},
+        section_total_stages(section, delta),
+        projection=section_projection(section),
+        return_document=ReturnDocument.AFTER,
+    )
+    return section_fields(document, section) or (None, None)
+
+
+def migrate_embedded_tasks(orders, tasks, batch_size=500):
+    """
+    Move embedded ``Task`` arrays into the task collection.
+
+    Tasks are upserted by order and ``task_id`` before the array is removed
+    from the order, so the migration can safely be re-run after an
+    interruption.
+    Returns ``(orders_migrated, tasks_migrated)``.
+    """
+    migrated_orders = 0
+    migrated_tasks = 0
+    cursor = orders.find({"Task.0": {"$exists": True}}, {"Task": 1})
+    for doc in cursor.batch_size(batch_size):
+        operations = []
+        for task in doc["Task"]:
+            task = {**task, "order_id": doc["_id"], "open": "end_time" not in task}
+            operations.append(
+                UpdateOne(
+                    {"order_id": doc["_id"], "task_id": task["task_id"]},
+                    {"$set": task},
+                    upsert=True,
+                )
+            )
+        tasks.bulk_write(operations, ordered=False)
+        orders.update_one({"_id": doc["_id"]}, {"$unset": {"Task": ""}})
+        migrated_orders += 1
+        migrated_tasks += len(operations)
+    return migrated_orders, migrated_tasks
+
+
+def _stored_times(task):
+    """
+    Return the fields that convert one legacy task to native dates.
+
+    Returns None when the task already stores dates.
+    """
+    if not isinstance(task.get("start"), str):
+        return None
+    fields = {"start": to_local(task["start"])}
+    if isinstance(task.get("end_time"), str):
+        fields["end_time"] = to_local(task["end_time"])
+        fields["duration_seconds"] = int(
+            (fields["end_time"] - fields["start"]).total_seconds()
+        )
+    return fields
+
+
+def backfill_task_times(orders, tasks, batch_size=500):
+    """
+    Convert ISO string times to BSON dates and add ``duration_seconds``.
+
+    Covers embedded ``Task`` arrays and the task collection. The derived
+    ``total_time`` string is dropped. Already converted tasks are skipped,
+    so the backfill can be re-run. Returns the number of tasks converted.
+
+    Embedded tasks are updated in place, matched on ``task_id`` and their
+    original start, so tasks pushed meanwhile by /start_task are kept.
+    """
+    converted = 0
+
+    operations = []
+    for doc in orders.find({"Task.start": {"$type": "string"}}, {"Task": 1}):
+        for task in doc["Task"]:
+            fields = _stored_times(task)
+            if not fields:
+                continue
+            match = {"t.start": task["start"]}
+            if "task_id" in task:
+                match["t.task_id"] = task["task_id"]
+            operations.append(
+                UpdateOne(
+                    {"_id": doc["_id"]},
+                    {
+                        "$set": {
+                            f"Task.$[t].{field}": value
+                            for field, value in fields.items()
+                        },
+                        "$unset": {"Task.$[t].total_time": ""},
+                    },
+                    array_filters=[match],
+                )
+            )
+            converted += 1
+        if len(operations) >= batch_size:
+            orders.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        orders.bulk_write(operations, ordered=False)
+
+    operations = []
+    for task in tasks.find({"start": {"$type": "string"}}):
+        operations.append(
+            UpdateOne(
+                {"_id": task["_id"]},
+                {"$set": _stored_times(task), "$unset": {"total_time": ""}},
+            )
+        )
+        converted += 1
+        if len(operations) == batch_size:
+            tasks.bulk_write(operations, ordered=False)
+            operations = []
+    if operations:
+        tasks.bulk_write(operations, ordered=False)
+
+    return converted
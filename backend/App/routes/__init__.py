@@ -3,6 +3,7 @@ from .section_routes import section_bp
 from .get_workdata import workdata_bp
 from .efficiency_routes import efficiency_bp
 from .user_routes import user_bp
+from .job_routes import job_bp
 
 # Export all blueprints for easy import in App initialization
 __all__ = [
@@ -11,11 +12,13 @@ __all__ = [
     "workdata_bp",
     "efficiency_bp",
     "user_bp",
+    "job_bp",
 ]
 all_blueprints = [
     task_bp,
     section_bp,
     workdata_bp,
     efficiency_bp,
-    user_bp, 
+    user_bp,
+    job_bp,
 ]
@@ -1,57 +1,42 @@
-from flask import Blueprint, request, jsonify
-from App.extensions.db import get_collection, get_collection_efficiency
-import math
-import datetime
-import pytz
+from flask import Blueprint, current_app, request, jsonify
+from App.extensions.db import get_collection_efficiency
+from App.extensions.jobs import enqueue
+from App.models.efficiency_summary import (
+    build_efficiency_summary,
+    claim_stale_refresh,
+    compare_weeks,
+    needs_refresh,
+    recent_summaries,
+    refresh_efficiency_summary,
+    save_summary,
+    saved_summaries,
+    set_item_status,
+    summary_items,
+    summary_key,
+)
 from bson.objectid import ObjectId
-import re
 
 efficiency_bp = Blueprint("efficiency", __name__)
-collection = get_collection()
-efficiency_collection = get_collection_efficiency()
-FINLAND_TZ = pytz.timezone("Europe/Helsinki")
 
 
-def clean_nan_values(data):
-    """
-    Recursively replace NaN values with None in a dictionary or list.
-    """
-    if isinstance(data, list):
-        return [clean_nan_values(item) for item in data]
-    elif isinstance(data, dict):
-        return {
-            key: (
-                None
-                if isinstance(value, float) and math.isnan(value)
-                else clean_nan_values(value)
-            )
-            for key, value in data.items()
-        }
-    return data
+def run_efficiency_summary(weekly_hours, progress):
+    """Background job body for POST /efficiency."""
+    summary = build_efficiency_summary(weekly_hours, progress)
+    summary.pop("items")
+    return {"message": "Efficiency summary created/updated successfully.", **summary}
 
 
-def convert_objectid_to_str(data):
-    """
-    Recursively convert ObjectId fields to strings in a dictionary or list.
-    """
-    if isinstance(data, list):
-        return [convert_objectid_to_str(item) for item in data]
-    elif isinstance(data, dict):
-        return {
-            key: (
-                str(value)
-                if isinstance(value, ObjectId)
-                else convert_objectid_to_str(value)
-            )
-            for key, value in data.items()
-        }
-    return data
+def run_efficiency_refresh(progress):
+    """Background job body for a summary rebuild."""
+    summary = refresh_efficiency_summary(progress)
+    summary.pop("items")
+    return {"message": "Efficiency summary refreshed.", **summary}
 
 
 @efficiency_bp.route("/efficiency", methods=["POST"])
 def create_efficiency_summary():
     """
-    Create or update the efficiency summary when weekly work hours are provided.
+    Queue the efficiency summary recompute for the given weekly work hours.
     """
     try:
         # Parse the request for weekly hours
@@ -64,97 +49,10 @@ def create_efficiency_summary():
                 400,
             )
 
-        now = datetime.datetime.now(FINLAND_TZ)
-        current_week = now.isocalendar()[1]
-        current_year = now.year
-
-        is_after_friday_1730 = now.weekday() > 4 or (
-            now.weekday() == 4 and now.hour >= 17 and now.minute >= 30
-        )
-        if is_after_friday_1730:
-            next_week = current_week + 1
-            if next_week > 52:
-                next_week = 1
-                current_year += 1
-            summary_name = f"PärnuEfficiency_Week{next_week}"
-        else:
-            summary_name = f"PärnuEfficiency_Week{current_week}"
-
-        # Filter documents where Osasto is 300 or 400
-        items = list(collection.find({"Osasto": {"$in": [300, 400]}}))
-        if not items:
-            return jsonify({"error": "No data found for osasto 300 or 400"}), 404
-
-        # Prepare summary document
-        current_week = datetime.datetime.now(FINLAND_TZ).isocalendar()[1]
-        summary_name = f"PärnuEfficiency_Week{current_week}"
-
-        total_kpl_std_ajalla = 0
-        total_kpl_target_ajalla = 0
-
-        processed_items = []
-        for item in items:
-            updates = {}
-            total_made = item.get("total_made", 0)
-            quantity = item.get("Quantity", 0)
-            standardiaika = item.get("Standardiaika", 0)
-
-            status = item.get("Status", None)
-            if status is not None:
-                updates["Status"] = status
-            # Calculate KPL STD ajalla
-            if total_made and standardiaika:
-                kpl_std_ajalla = round(float(total_made) * float(standardiaika), 2)
-                updates["KPL STD ajalla"] = kpl_std_ajalla
-                total_kpl_std_ajalla += kpl_std_ajalla
-
-            # Calculate KPL STD ajalla TARGET
-            if quantity and standardiaika:
-                kpl_target_ajalla = round(float(quantity) * float(standardiaika), 2)
-                updates["KPL STD ajalla TARGET"] = kpl_target_ajalla
-                total_kpl_target_ajalla += kpl_target_ajalla
-
-            # Update the document with the calculated fields
-            if updates:
-                collection.update_one({"_id": item["_id"]}, {"$set": updates})
-                item.update(updates)
-
-            item["_id"] = str(item["_id"])  # Convert ObjectId to string
-            processed_items.append(clean_nan_values(item))  # Clean NaN values
-
-        # Calculate Efficiency NOW and TARGET
-        efficiency_now = (
-            round(total_kpl_std_ajalla / weekly_hours, 2) if weekly_hours else None
-        )
-        efficiency_target = (
-            round(total_kpl_target_ajalla / weekly_hours, 2) if weekly_hours else None
-        )
-
-        # Save the summary document
-        summary_document = {
-            "summary_name": summary_name,
-            "viikon_tyotunnit": weekly_hours,
-            "EFFICIENCY NOW": efficiency_now,
-            "EFFICIENCY TARGET": efficiency_target,
-            "total_kpl_std_ajalla": total_kpl_std_ajalla,
-            "total_kpl_target_ajalla": total_kpl_target_ajalla,
-            "items": processed_items,
-            "updated_at": datetime.datetime.now(FINLAND_TZ),
-        }
-
-        # Use upsert to update the summary if it already exists
-        efficiency_collection.update_one(
-            {"summary_name": summary_name}, {"$set": summary_document}, upsert=True
-        )
-
+        job_id = enqueue("efficiency_summary", run_efficiency_summary, weekly_hours)
         return (
-            jsonify(
-                {
-                    "message": "Efficiency summary created/updated successfully.",
-                    "summary": summary_document,
-                }
-            ),
-            200,
+            jsonify({"message": "Efficiency summary queued", "job_id": job_id}),
+            202,
         )
 
     except Exception as e:
@@ -164,107 +62,50 @@ def create_efficiency_summary():
 
 @efficiency_bp.route("/efficiency", methods=["GET"])
 def get_efficiency_summary():
-    try:
-        current_week = datetime.datetime.now(FINLAND_TZ).isocalendar()[1]
-        summary_name = f"PärnuEfficiency_Week{current_week}"
-
-        # Fetch existing summary
-        existing_summary = efficiency_collection.find_one(
-            {"summary_name": summary_name}
-        )
+    """
+    Return the current week's summary; order writes keep it up to date.
 
-        # Fetch documents where Osasto is 300 or 400
-        items = list(collection.find({"Osasto": {"$in": [300, 400]}}))
-        if not items:
-            return jsonify({"error": "No data found for osasto 300 or 400"}), 404
+    Never writes on the common path. When the last full rebuild is older
+    than EFFICIENCY_REFRESH_SECONDS, one rebuild is queued in the
+    background and the cached summary is still served.
+    """
+    try:
+        summary = get_collection_efficiency().find_one(summary_key())
 
-        weekly_hours = (
-            existing_summary.get("viikon_tyotunnit", 0) if existing_summary else 0
-        )
-        if weekly_hours == 0:
+        if not summary or not summary.get("viikon_tyotunnit"):
             return (
                 jsonify({"error": "Weekly hours not set. Add weekly hours first."}),
                 400,
             )
+        summary["items"] = summary_items(summary)
+        if not summary["items"]:
+            return jsonify({"error": "No data found for osasto 300 or 400"}), 404
 
-        total_kpl_std_ajalla = 0
-        total_kpl_target_ajalla = 0
-        processed_items = []
-
-        for item in items:
-            updates = {}
-            total_made = item.get("total_made", 0)
-            quantity = item.get("Quantity", 0)
-            standardiaika = item.get("Standardiaika", 0)
-
-            # Check if this item already exists in the summary
-            existing_item = next(
-                (i for i in existing_summary["items"] if i["_id"] == str(item["_id"])),
-                None,
-            )
+        max_age = current_app.config.get("EFFICIENCY_REFRESH_SECONDS", 0)
+        if max_age and needs_refresh(summary, max_age) and claim_stale_refresh(max_age):
+            enqueue("efficiency_refresh", run_efficiency_refresh)
 
-            # Preserve Status from the existing item
-            status = existing_item.get("Status", None) if existing_item else None
-            if status is not None:
-                updates["Status"] = status
-
-            # Recalculate fields if necessary
-            if total_made and standardiaika:
-                kpl_std_ajalla = round(float(total_made) * float(standardiaika), 2)
-                if (
-                    existing_item
-                    and existing_item.get("KPL STD ajalla") != kpl_std_ajalla
-                ):
-                    updates["KPL STD ajalla"] = kpl_std_ajalla
-                total_kpl_std_ajalla += kpl_std_ajalla
-
-            if quantity and standardiaika:
-                kpl_target_ajalla = round(float(quantity) * float(standardiaika), 2)
-                if (
-                    existing_item
-                    and existing_item.get("KPL STD ajalla TARGET") != kpl_target_ajalla
-                ):
-                    updates["KPL STD ajalla TARGET"] = kpl_target_ajalla
-                total_kpl_target_ajalla += kpl_target_ajalla
-
-            # Only update the document if changes are detected
-            if updates:
-                collection.update_one({"_id": item["_id"]}, {"$set": updates})
-                item.update(updates)
-
-            item["_id"] = str(item["_id"])  # Convert ObjectId to string for JSON
-            processed_items.append(clean_nan_values(item))  # Clean NaN values
-
-        # Calculate Efficiency NOW and TARGET
-        efficiency_now = (
-            round(total_kpl_std_ajalla / weekly_hours, 2) if weekly_hours else None
-        )
-        efficiency_target = (
-            round(total_kpl_target_ajalla / weekly_hours, 2) if weekly_hours else None
-        )
+        return jsonify(summary), 200
 
-        # Update only changed fields in the summary document
-        summary_updates = {
-            "EFFICIENCY NOW": efficiency_now,
-            "EFFICIENCY TARGET": efficiency_target,
-            "total_kpl_std_ajalla": total_kpl_std_ajalla,
-            "total_kpl_target_ajalla": total_kpl_target_ajalla,
-            "updated_at": datetime.datetime.now(FINLAND_TZ),
-        }
+    except Exception as e:
+        print(f"Error in get_efficiency_summary: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
-        if "items" in existing_summary:
-            summary_updates["items"] = processed_items  # Update items array
 
-        efficiency_collection.update_one(
-            {"summary_name": summary_name}, {"$set": summary_updates}, upsert=True
+@efficiency_bp.route("/efficiency/refresh", methods=["POST"])
+def refresh_efficiency():
+    """
+    Queue a rebuild of the current summary from the orders.
+    """
+    try:
+        job_id = enqueue("efficiency_refresh", run_efficiency_refresh)
+        return (
+            jsonify({"message": "Efficiency refresh queued", "job_id": job_id}),
+            202,
         )
 
-        # Return the updated summary document
-        updated_summary = efficiency_collection.find_one({"summary_name": summary_name})
-        return jsonify(convert_objectid_to_str(updated_summary)), 200
-
     except Exception as e:
-        print(f"Error in get_efficiency_summary: {str(e)}")
+        print(f"Error in refresh_efficiency: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
@@ -291,6 +132,7 @@ def update_efficiency_status():
         )
 
         # Find the summary document
+        efficiency_collection = get_collection_efficiency()
         summary = efficiency_collection.find_one({"_id": ObjectId(summary_id)})
 
         # Debugging: Log the summary document
@@ -299,11 +141,8 @@ def update_efficiency_status():
         if not summary:
             return jsonify({"error": "Summary not found."}), 404
 
-        # Update the status in the items array
-        updated = efficiency_collection.update_one(
-            {"_id": ObjectId(summary_id), "items._id": item_id},
-            {"$set": {"items.$.Status": new_status}},
-        )
+        # Update the status of the item, inline or spilled
+        updated = set_item_status(summary, item_id, new_status)
 
         # Debugging: Log the update result
         print(
@@ -332,35 +171,13 @@ def update_efficiency_status():
 @efficiency_bp.route("/efficiencySave", methods=["POST"])
 def save_efficiency_summary():
     try:
-        current_week = datetime.datetime.now(FINLAND_TZ).isocalendar()[1]
-        current_year = datetime.datetime.now(FINLAND_TZ).year
-        summary_name = f"PärnuEfficiency_Week{current_week}"
-        saved_summary_name = f"PärnuEfficiency_{current_week}/{current_year}_saved"
-
-        existing_summary = efficiency_collection.find_one(
-            {"summary_name": summary_name}
-        )
-        if not existing_summary:
+        try:
+            _, replaced = save_summary()
+        except LookupError:
             return jsonify({"error": "Summary not found."}), 404
-
-        # Check if saved summary already exist s
-        existing_saved_summary = efficiency_collection.find_one(
-            {"summary_name": saved_summary_name}
-        )
-
-        saved_summary = existing_summary.copy()
-        saved_summary.pop("_id", None)  # Generate a new ObjectId
-        saved_summary["summary_name"] = saved_summary_name
-        saved_summary["saved_at"] = datetime.datetime.now(FINLAND_TZ)
-
-        if existing_saved_summary:
-            efficiency_collection.update_one(
-                {"summary_name": saved_summary_name}, {"$set": saved_summary}
-            )
+        if replaced:
             return jsonify({"message": "Summary updated successfully."}), 200
-        else:
-            efficiency_collection.insert_one(saved_summary)
-            return jsonify({"message": "Summary saved successfully."}), 200
+        return jsonify({"message": "Summary saved successfully."}), 200
 
     except Exception as e:
         print(f"Error in save_efficiency_summary: {str(e)}")
@@ -369,35 +186,40 @@ def save_efficiency_summary():
 
 @efficiency_bp.route("/efficiencyHistory", methods=["POST"])
 def efficiency_history():
+    """
+    Saved summaries for every combination of ``weeks`` and ``years``, or
+    for the ``last`` n weeks.
+
+    ``items: false`` leaves out the order snapshots. ``compare: true``
+    returns ``{"weeks": [...]}`` with each week's totals and their change
+    from the previous week instead.
+    """
     try:
         data = request.get_json()
-        weeks = data.get("weeks", [])
-        years = data.get("years", [])
-        print(f"Received data: weeks={weeks}, years={years}")
-
-        if not weeks or not years:
+        try:
+            last = int(data["last"]) if data.get("last") is not None else None
+            weeks = [int(week) for week in data.get("weeks", [])]
+            years = [int(year) for year in data.get("years", [])]
+        except (TypeError, ValueError):
+            return jsonify({"error": "weeks, years and last must be numbers."}), 400
+
+        if last is None and (not weeks or not years):
             return jsonify({"error": "weeks and years are required."}), 400
+        if last is not None and last < 1:
+            return jsonify({"error": "last must be at least 1."}), 400
 
-        response_data = []
-
-        for year in years:
-            for week in weeks:
-                # Build the query dynamically for each week and year
-                query = {
-                    "summary_name": f"PärnuEfficiency_{week}/{year}_saved",
-                }
-                print(f"Query filter for week {week}, year {year}: {query}")
-
-                # Fetch documents
-                documents = list(efficiency_collection.find(query))
-                print(
-                    f"Documents fetched for week {week}, year {year}: {len(documents)}"
-                )
-
-                for doc in documents:
-                    doc["_id"] = str(doc["_id"])
-                    response_data.append(doc)
-        return jsonify(response_data), 200
+        include_items = data.get("items", True) and not data.get("compare")
+        if last is not None:
+            summaries = recent_summaries(last, include_items)
+        else:
+            summaries = saved_summaries(years, weeks, include_items)
+
+        if data.get("compare"):
+            return jsonify({"weeks": compare_weeks(summaries)}), 200
+        if include_items:
+            for doc in summaries:
+                doc["items"] = summary_items(doc)
+        return jsonify(summaries), 200
 
     except Exception as e:
         print(f"Error: {e}")
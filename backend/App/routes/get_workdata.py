@@ -1,25 +1,76 @@
+from datetime import date
 from bson import ObjectId
 from flask import Blueprint, jsonify, request
 from App.extensions.db import get_collection
+from App.models.order_changes import (
+    bump_osasto_versions,
+    revision_fields,
+    touch_orders,
+)
+from App.models.task_store import (
+    COUNTED_SECTIONS,
+    MAX_WORKER_PAGE_SIZE,
+    WORKER_PAGE_SIZE,
+    get_task_store,
+    refresh_section_status,
+    serialize_task,
+)
 
 # Create blueprint
 workdata_bp = Blueprint("workdata", __name__)
 
 
+def parse_date_range(start_date, end_date):
+    """Parse optional YYYY-MM-DD strings into a ``(from, to)`` pair of dates."""
+    if not start_date and not end_date:
+        return None
+    return (
+        date.fromisoformat(start_date) if start_date else None,
+        date.fromisoformat(end_date) if end_date else None,
+    )
+
+
 @workdata_bp.route("/fetch_user_works", methods=["POST"])
 def fetch_user_tasks():
+    """
+    List a worker's tasks, newest first.
+
+    Optional filters: ``section``, ``start_date``/``end_date`` (YYYY-MM-DD,
+    inclusive) and ``page``/``page_size`` for pagination. Pages hold
+    WORKER_PAGE_SIZE tasks unless ``page_size`` (at most
+    MAX_WORKER_PAGE_SIZE) says otherwise.
+    """
     try:
-        collection = get_collection()
         data = request.get_json()
         worker_name = data.get("workerName")
 
         if not worker_name:
             return jsonify({"error": "Worker name is required"}), 400
 
-        documents = collection.find(
-            {"Task.workerName": worker_name},
+        try:
+            start = parse_date_range(data.get("start_date"), data.get("end_date"))
+        except ValueError:
+            return jsonify({"error": "Dates must be in YYYY-MM-DD format"}), 400
+
+        page = data.get("page", 1)
+        page_size = data.get("page_size", WORKER_PAGE_SIZE)
+        if not isinstance(page, int) or page < 1:
+            return jsonify({"error": "page must be a positive integer"}), 400
+        if not isinstance(page_size, int) or not 0 < page_size <= MAX_WORKER_PAGE_SIZE:
+            return (
+                jsonify(
+                    {
+                        "error": "page_size must be between 1 and "
+                        f"{MAX_WORKER_PAGE_SIZE}"
+                    }
+                ),
+                400,
+            )
+        skip = (page - 1) * page_size
+
+        worker_tasks, total = get_task_store().tasks_for_worker(
+            worker_name,
             {
-                "Task": 1,
                 "Jononumero": 1,
                 "Item number": 1,
                 "Reference number": 1,
@@ -35,10 +86,14 @@ def fetch_user_tasks():
                 "StatusPainatus": 1,
                 "Sales order": 1,
             },
+            section=data.get("section"),
+            start=start,
+            skip=skip,
+            limit=page_size,
         )
 
         results = []
-        for doc in documents:
+        for doc, task in worker_tasks:
             main_info = {
                 "id": str(doc["_id"]),
                 "Jononumero": doc.get("Jononumero"),
@@ -55,18 +110,17 @@ def fetch_user_tasks():
                 "Osasto": doc.get("Osasto"),
                 "Sales order": doc.get("Sales order"),
             }
-            user_tasks = [
-                task
-                for task in doc.get("Task", [])
-                if task.get("workerName") == worker_name
-            ]
-            for task in user_tasks:
-                results.append({**main_info, **task})
+            results.append({**main_info, **serialize_task(task)})
 
-        if not results:
+        if not total:
             return jsonify({"message": "No tasks found for this user"}), 404
 
-        return jsonify({"tasks": results}), 200
+        return (
+            jsonify(
+                {"tasks": results, "total": total, "page": page, "page_size": page_size}
+            ),
+            200,
+        )
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -88,12 +142,14 @@ def fetch_history():
         except:
             return jsonify({"error": "Invalid document ID"}), 400
 
-        document = collection.find_one({"_id": document_id})
+        document = collection.find_one({"_id": document_id}, {"_id": 1})
         if not document:
             return jsonify({"error": "Document not found"}), 404
 
-        tasks = document.get("Task", [])
-        filtered_tasks = [task for task in tasks if task.get("section") == section]
+        filtered_tasks = [
+            serialize_task(task)
+            for task in get_task_store().tasks_for_order(document_id, section)
+        ]
         if not filtered_tasks:
             return jsonify({"message": "No tasks found for this section"}), 404
 
@@ -126,25 +182,26 @@ def modify_task():
         except:
             return jsonify({"error": "Invalid document ID"}), 400
 
-        document = collection.find_one({"_id": document_id})
+        document = collection.find_one({"_id": document_id}, {"Osasto": 1})
         if not document:
             return jsonify({"error": "Document not found"}), 404
 
-        tasks = document.get("Task", [])
-        task_found = False
-
-        for task in tasks:
-            if task.get("task_id") == task_id:
-                task["kpl_done"] = new_quantity
-                task["phase"] = new_phase
-                task_found = True
-                break
+        # Update only the matching task
+        previous_task = get_task_store().update_task(
+            document_id, task_id, {"kpl_done": new_quantity, "phase": new_phase}
+        )
 
-        if not task_found:
+        if previous_task is None:
             return jsonify({"error": "Task not found"}), 404
 
-        # Update MongoDB with the modified task list
-        collection.update_one({"_id": document_id}, {"$set": {"Task": tasks}})
+        # Closed tasks are already counted in total_made{section}; apply the change
+        section = previous_task.get("section")
+        if section in COUNTED_SECTIONS and "end_time" in previous_task:
+            delta = (new_quantity or 0) - (previous_task.get("kpl_done") or 0)
+            if delta:
+                refresh_section_status(collection, document_id, section, delta)
+        touch_orders(document_id)
+        bump_osasto_versions(document.get("Osasto"))
 
         return jsonify({"message": "Task updated successfully"}), 200
 
@@ -201,12 +258,14 @@ def update_total_made_section():
         update_fields = {
             total_made_field: total_made,
             status_field: new_status,
+            **revision_fields(),
         }
 
         result = collection.update_one({"_id": document_id}, {"$set": update_fields})
 
         if result.matched_count == 0:
             return jsonify({"error": "Failed to update document"}), 500
+        bump_osasto_versions(document.get("Osasto"))
 
         return (
             jsonify(
@@ -223,14 +282,6 @@ def update_total_made_section():
         return jsonify({"error": str(e)}), 500
 
 
-def convert_to_minutes(total_time):
-    """Convert 'hh:mm' format to minutes."""
-    if not total_time:
-        return 0
-    hours, minutes = map(int, total_time.split(":"))
-    return hours * 60 + minutes
-
-
 def convert_to_hours_minutes(total_minutes):
     """Convert total minutes to 'hh:mm' format."""
     hours = total_minutes // 60
@@ -240,59 +291,44 @@ def convert_to_hours_minutes(total_minutes):
 
 @workdata_bp.route("/work_hours", methods=["POST"])
 def get_total_work_hours_by_section():
+    """
+    Total work hours per item and section, summed by the database.
+
+    Optional filters: ``section`` and ``start_date``/``end_date``
+    (YYYY-MM-DD, inclusive). ``include_tasks`` adds each row's tasks.
+    """
     data = request.get_json()
     section_filter = data.get("section")
-    collection = get_collection()
     try:
-        # Fetch all documents from the collection
-        documents = collection.find(
-            {},
-            {
-                "Task": 1,
-                "Item number": 1,
-                "Reference number": 1,
-                "Sales order": 1,
-                "total_made": 1,
-                "Osasto": 1,
-            },
+        start = parse_date_range(data.get("start_date"), data.get("end_date"))
+    except ValueError:
+        return jsonify({"error": "Dates must be in YYYY-MM-DD format"}), 400
+    try:
+        task_store = get_task_store()
+        rows = task_store.section_durations(
+            ["Item number", "Reference number", "Sales order", "total_made", "Osasto"],
+            section=section_filter,
+            start=start,
         )
-        item_totals = {}
-        # Process each document
-        for doc in documents:
-            object_id = str(doc["_id"])
-            item_number = doc.get("Item number")
-            reference_number = doc.get("Reference number")
-            sales_order = doc.get("Sales order")
-            osasto = doc.get("Osasto")
-            tasks = doc.get("Task", [])
-            total_made = doc.get("total_made", 0)
-
-            section_totals = {}
-            for task in tasks:
-                section = task.get("section")
-                total_time = task.get("total_time", "00:00")
-
-                if section and total_time:
-                    section_totals[section] = section_totals.get(
-                        section, 0
-                    ) + convert_to_minutes(total_time)
-
-            for sec, total_minutes in section_totals.items():
-                if section_filter and sec != section_filter:
-                    continue
-                unique_key = f"{object_id}_{item_number}"
-                item_totals[unique_key] = {
-                    "Item number": item_number,
-                    "Reference number": reference_number,
-                    "Osasto": osasto,
-                    "Sales order": sales_order,
-                    "section": sec,
-                    "total_work_hours": convert_to_hours_minutes(total_minutes),
-                    "object_id": object_id,
-                    "Task": tasks,
-                    "total_made": total_made,
-                }
-        results = list(item_totals.values())
+        results = []
+        for row in rows:
+            result = {
+                "Item number": row.get("Item number"),
+                "Reference number": row.get("Reference number"),
+                "Osasto": row.get("Osasto"),
+                "Sales order": row.get("Sales order"),
+                "section": row["section"],
+                "total_work_hours": convert_to_hours_minutes(row["seconds"] // 60),
+                "object_id": str(row["_id"]),
+                "total_made": row.get("total_made") or 0,
+            }
+            if data.get("include_tasks"):
+                result["Task"] = [
+                    serialize_task(task)
+                    for task in task_store.tasks_for_order(row["_id"], row["section"])
+                ]
+            results.append(result)
+
         if not results:
             return jsonify({"message": "No data found"}), 404
 
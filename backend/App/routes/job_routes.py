@@ -0,0 +1,21 @@
+from flask import Blueprint, jsonify
+from App.extensions.jobs import get_job
+
+job_bp = Blueprint("jobs", __name__)
+
+
+@job_bp.route("/jobs/<job_id>", methods=["GET"])
+def job_status(job_id):
+    """
+    Report the status, progress and result of a background job.
+    """
+    try:
+        job = get_job(job_id)
+        if not job:
+            return jsonify({"error": "Job not found"}), 404
+
+        job["id"] = str(job.pop("_id"))
+        return jsonify(job), 200
+
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -1,6 +1,15 @@
 from bson import ObjectId
 from flask import Blueprint, request, jsonify
 from App.extensions.db import get_collection
+from App.models.efficiency_engine import KPL_STD
+from App.models.efficiency_summary import apply_order_change
+from App.models.order_changes import (
+    bump_osasto_versions,
+    record_deletes,
+    revision_fields,
+    touch_orders,
+)
+from App.models.task_store import get_task_store
 
 section_bp = Blueprint("sections", __name__)
 
@@ -36,19 +45,19 @@ def update_osasto():
             return jsonify({"error": "Invalid input data"}), 400
 
         # Update the document
-        result = collection.update_one(
-            {"_id": object_id},
-            {
-                "$set": {
-                    "Osasto": new_osasto_value,
-                    "Jononumero": new_jononumero_value,
-                    "Quantity": new_quantity_value,
-                }
-            },
+        changes = {
+            "Osasto": new_osasto_value,
+            "Jononumero": new_jononumero_value,
+            "Quantity": new_quantity_value,
+        }
+        previous = collection.find_one_and_update(
+            {"_id": object_id}, {"$set": {**changes, **revision_fields()}}
         )
 
-        if result.matched_count == 0:
+        if previous is None:
             return jsonify({"error": "Document not found"}), 404
+        apply_order_change(previous, {**previous, **changes})
+        bump_osasto_versions(previous.get("Osasto"), new_osasto_value)
 
         return jsonify({"message": "Document updated successfully"}), 200
     except Exception as e:
@@ -80,7 +89,11 @@ def add_row():
 
         # Remove '_id' to avoid duplicate key errors and create a new document
         existing_doc.pop("_id", None)
+        existing_doc.update(revision_fields())
         result = collection.insert_one(existing_doc)
+        get_task_store().copy_tasks(object_id, result.inserted_id)
+        apply_order_change(None, existing_doc)
+        bump_osasto_versions(existing_doc.get("Osasto"))
 
         return (
             jsonify(
@@ -115,10 +128,14 @@ def delete_row():
         except Exception:
             return jsonify({"error": "Invalid document ID"}), 400
 
-        result = collection.delete_one({"_id": object_id})
+        deleted = collection.find_one_and_delete({"_id": object_id})
 
-        if result.deleted_count == 0:
+        if deleted is None:
             return jsonify({"error": "Document not found"}), 404
+        get_task_store().delete_for_order(object_id)
+        record_deletes(object_id)
+        apply_order_change(deleted, None)
+        bump_osasto_versions(deleted.get("Osasto"))
 
         return jsonify({"message": "Row deleted successfully"}), 200
     except Exception as e:
@@ -144,19 +161,27 @@ def empty_row():
         if not document:
             return jsonify({"error": "Document not found"}), 404
 
-        update_doc = {
-            "$unset": {
-                field: ""
-                for field in document.keys()
-                if field.startswith("Status") or field.startswith("total_made")
-            },
-            "$set": {"Task": []},
+        unset_fields = {
+            field: ""
+            for field in document.keys()
+            if field.startswith("Status") or field.startswith("total_made")
+            # Derived from total_made; KPL_TARGET comes from Quantity and stays
+            or field == KPL_STD
         }
 
-        result = collection.update_one({"_id": object_id}, update_doc)
+        modified_count = get_task_store().clear(object_id)
+        if unset_fields:
+            result = collection.update_one({"_id": object_id}, {"$unset": unset_fields})
+            modified_count += result.modified_count
 
-        if result.modified_count == 0:
+        if modified_count == 0:
             return jsonify({"error": "Document not updated"}), 500
+        touch_orders(object_id)
+        apply_order_change(
+            document,
+            {key: value for key, value in document.items() if key not in unset_fields},
+        )
+        bump_osasto_versions(document.get("Osasto"))
 
         return jsonify({"message": "Document updated successfully"}), 200
 
@@ -1,40 +1,299 @@
-from flask import Blueprint, jsonify, request
-from datetime import datetime
+from flask import (
+    Blueprint,
+    Response,
+    current_app,
+    jsonify,
+    request,
+    stream_with_context,
+)
+from datetime import datetime, timedelta, timezone
 import pytz
 from bson import ObjectId
 from App.extensions import db
-from App.extensions.db import get_collection, get_collection_koodit
-import os
-import pandas as pd
-import math
+from App.extensions.db import (
+    get_collection,
+    get_collection_koodit,
+    get_collection_tombstones,
+)
+from App.extensions.jobs import enqueue
+from App.models.efficiency_summary import (
+    EFFICIENCY_OSASTOT,
+    apply_order_change,
+    refresh_efficiency_summary,
+)
+from App.models.order_changes import (
+    bump_osasto_versions,
+    get_osasto_version,
+    get_tombstone_horizon,
+    revision_fields,
+)
+from App.models.order_import import SUPPORTED_EXTENSIONS, import_orders
+from App.models.task_store import (
+    COUNTED_SECTIONS,
+    get_task_store,
+    serialize_task,
+    to_local,
+)
+import io
+import itertools
+import queue
+import json
 import uuid
 
 FINLAND_TZ = pytz.timezone("Europe/Helsinki")
 
 # Create blueprint
 task_bp = Blueprint("tasks", __name__)
-# File upload folder
-UPLOAD_FOLDER = "uploads"
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# Upper bound for a single /getData page
+MAX_PAGE_SIZE = 1000
+# Idle seconds between keep-alive comments on event streams
+HEARTBEAT_SECONDS = 15
+# Default page size of /orders/changes
+CHANGES_PAGE_SIZE = 500
+# Types a Jononumero may hold, in MongoDB's sort order (null sorts first).
+# Arrays are left out: they sort by their smallest element.
+JONONUMERO_TYPES = ("number", "string", "object", "binData", "objectId", "bool", "date")
+
+
+def serialize_order(doc):
+    """
+    Render an order's tasks in the API format.
+
+    ObjectIds and NaN are left to the app's JSON provider.
+    """
+    if "Task" in doc:
+        doc["Task"] = [serialize_task(task) for task in doc["Task"]]
+    return doc
+
+
+def _sort_type(value):
+    """The JONONUMERO_TYPES entry a cursor's Jononumero sorts as."""
+    if isinstance(value, bool):
+        return "bool"
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    raise ValueError(f"Unsupported Jononumero in cursor: {value!r}")
+
+
+def parse_cursor(cursor, order_by):
+    """
+    Build the keyset filter that continues after ``cursor``.
+
+    Cursors are ``"<_id>"`` when ordering by ``_id`` and
+    ``"<Jononumero as JSON>:<_id>"`` when ordering by Jononumero.
+    ``$gt`` only compares values of the same type, so the filter also
+    takes every Jononumero of a type that sorts later.
+    """
+    if order_by == "_id":
+        return {"_id": {"$gt": ObjectId(cursor)}}
+
+    jononumero, last_id = cursor.rsplit(":", 1)
+    jononumero = json.loads(jononumero)
+    last_id = ObjectId(last_id)
+    if jononumero is None:
+        return {
+            "$or": [
+                {"Jononumero": None, "_id": {"$gt": last_id}},
+                {"Jononumero": {"$ne": None}},
+            ]
+        }
+    later = JONONUMERO_TYPES[JONONUMERO_TYPES.index(_sort_type(jononumero)) + 1 :]
+    return {
+        "$or": [
+            {"Jononumero": {"$gt": jononumero}},
+            {"Jononumero": jononumero, "_id": {"$gt": last_id}},
+            *({"Jononumero": {"$type": bson_type}} for bson_type in later),
+        ]
+    }
+
+
+def make_cursor(doc, order_by):
+    """Return the cursor pointing just after ``doc``."""
+    if order_by == "_id":
+        return str(doc["_id"])
+    return f"{json.dumps(doc.get('Jononumero'))}:{doc['_id']}"
 
 
 @task_bp.route("/getData", methods=["GET"])
 def get_data():
+    """
+    Stream orders as JSON straight from the database cursor.
+
+    Query parameters:
+        limit  -- page size. Without it every order is streamed as a plain
+                  array; with it the response is ``{"items": [...],
+                  "next_cursor": ...}``.
+        after  -- ``next_cursor`` of the previous page.
+        order  -- ``_id`` (default) or ``Jononumero``.
+        fields -- comma separated list of fields to return.
+    """
     try:
+        order_by = request.args.get("order", "_id")
+        if order_by not in ("_id", "Jononumero"):
+            return jsonify({"error": "order must be '_id' or 'Jononumero'"}), 400
+
+        limit = request.args.get("limit", type=int)
+        if limit is not None and not 0 < limit <= MAX_PAGE_SIZE:
+            return (
+                jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}),
+                400,
+            )
+
+        query = {}
+        after = request.args.get("after")
+        if after:
+            try:
+                query = parse_cursor(after, order_by)
+            except Exception:
+                return jsonify({"error": "Invalid cursor"}), 400
+
+        projection = None
+        fields = request.args.get("fields")
+        if fields:
+            names = (field.strip() for field in fields.split(","))
+            projection = {name: 1 for name in names if name}
+            projection["Jononumero"] = 1
+
+        sort = [("_id", 1)] if order_by == "_id" else [("Jononumero", 1), ("_id", 1)]
+
         # Use default collection or fetch another dynamically
         collection = get_collection()  # Default collection is used from .env
-        result = list(collection.find())
-
-        # Convert ObjectId to string and replace NaN with empty strings
-        for doc in result:
-            doc["_id"] = str(doc["_id"])
-            for key, value in doc.items():
-                if isinstance(value, float) and math.isnan(value):  # Check if NaN
-                    doc[key] = ""
-                elif value is None:
-                    doc[key] = ""
-
-        return jsonify(result), 200
+        cursor = collection.find(query, projection).sort(sort).batch_size(500)
+        if limit is not None:
+            # One extra row tells whether another page exists
+            cursor = cursor.limit(limit + 1)
+
+        dumps = current_app.json.dumps
+        # Run the query before the 200 goes out, so its errors get a 500
+        docs = iter(cursor)
+        first = next(docs, None)
+        if first is not None:
+            docs = itertools.chain([first], docs)
+
+        def generate():
+            count = 0
+            next_cursor = None
+            last_cursor = None
+            yield "[" if limit is None else '{"items": ['
+            try:
+                for doc in docs:
+                    if limit is not None and count == limit:
+                        # The extra row exists, so resume after the last one sent
+                        next_cursor = last_cursor
+                        break
+                    last_cursor = make_cursor(doc, order_by)
+                    yield ("," if count else "") + dumps(serialize_order(doc))
+                    count += 1
+            except Exception:
+                current_app.logger.exception("/getData failed mid-stream")
+                # Re-raised, the server drops the connection without ending
+                # the chunked body, so clients see an incomplete response
+                raise
+
+            if limit is None:
+                yield "]"
+            else:
+                yield f'], "next_cursor": {json.dumps(next_cursor)}}}'
+
+        return Response(stream_with_context(generate()), mimetype="application/json")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+
+def parse_since(since):
+    """
+    Split an /orders/changes position into ``(rev, filter)``.
+
+    Positions are ``"<rev>"`` or ``"<rev>:<_id>"``; many documents share a
+    revision, so ``_id`` orders the ones with the same ``_rev``.
+    """
+    rev, _, last_id = since.partition(":")
+    rev = int(rev)
+    if rev < 0:
+        raise ValueError("since must not be negative")
+    if not last_id:
+        return rev, {"_rev": {"$gt": rev}}
+    return rev, {
+        "$or": [
+            {"_rev": {"$gt": rev}},
+            {"_rev": rev, "_id": {"$gt": ObjectId(last_id)}},
+        ]
+    }
+
+
+def _settled(written_at, cutoff):
+    """Whether a write is old enough that no lower revision can still commit."""
+    if written_at is None:
+        return True
+    if written_at.tzinfo is None:
+        written_at = written_at.replace(tzinfo=timezone.utc)
+    return written_at <= cutoff
+
+
+@task_bp.route("/orders/changes", methods=["GET"])
+def get_order_changes():
+    """
+    Orders written or deleted after revision ``since``, oldest first.
+
+    Returns ``{"changes": [...], "deleted": [ids], "next": position,
+    "has_more": bool, "reset": bool}``; pass ``next`` back as ``since``.
+    ``since=0`` pages through every order. Revisions are handed out before
+    the write commits, so ``next`` stops short of writes newer than
+    SYNC_LAG_SECONDS and those are sent again on the next call.
+
+    ``reset`` is true when tombstones newer than ``since`` have been pruned:
+    a client whose copy dates from ``since`` may hold deleted orders and
+    must drop it and page from ``since=0``. Pages of such a full sync can
+    ignore the flag, as the client holds nothing older than the sync.
+    """
+    try:
+        since = request.args.get("since", "0")
+        limit = request.args.get("limit", CHANGES_PAGE_SIZE, type=int)
+        try:
+            since_rev, query = parse_since(since)
+        except Exception:
+            return jsonify({"error": "Invalid since"}), 400
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            return (
+                jsonify({"error": f"limit must be between 1 and {MAX_PAGE_SIZE}"}),
+                400,
+            )
+
+        sort = [("_rev", 1), ("_id", 1)]
+        orders = get_collection().find(query).sort(sort).limit(limit + 1)
+        tombstones = get_collection_tombstones().find(query).sort(sort).limit(limit + 1)
+        # Each side holds its first limit + 1 entries, enough for a full page
+        entries = sorted(
+            [(doc.get("updated_at"), doc, False) for doc in orders]
+            + [(doc.get("deleted_at"), doc, True) for doc in tombstones],
+            key=lambda entry: (entry[1]["_rev"], entry[1]["_id"]),
+        )
+
+        lag = timedelta(seconds=current_app.config.get("SYNC_LAG_SECONDS", 5))
+        cutoff = datetime.now(timezone.utc) - lag
+        changes, deleted = [], []
+        next_since = since
+        settled = True
+        for written_at, doc, is_delete in entries[:limit]:
+            if is_delete:
+                deleted.append(str(doc["order_id"]))
+            else:
+                changes.append(serialize_order(doc))
+            settled = settled and _settled(written_at, cutoff)
+            if settled:
+                next_since = f"{doc['_rev']}:{doc['_id']}"
+
+        return jsonify(
+            {
+                "changes": changes,
+                "deleted": deleted,
+                "next": next_since,
+                "has_more": settled and len(entries) > limit,
+                "reset": 0 < since_rev < get_tombstone_horizon(),
+            }
+        )
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -42,7 +301,6 @@ def get_data():
 @task_bp.route("/start_task", methods=["POST"])
 def start_task():
     try:
-        collection = get_collection()
         data = request.get_json()
 
         document_id = data.get("id")
@@ -64,7 +322,7 @@ def start_task():
         new_tasks = [
             {
                 "task_id": str(uuid.uuid4()),
-                "start": current_time.isoformat(),
+                "start": current_time,
                 "workerName": worker,
                 "phase": phase,
                 "section": section,
@@ -72,15 +330,12 @@ def start_task():
             }
             for worker in worker_names
         ]
-        result = collection.update_one(
-            {"_id": document_id},
-            {
-                "$set": {status_field: "Aloitettu"},
-                "$push": {"Task": {"$each": new_tasks}},
-            },
+        document = get_task_store().add_tasks(
+            document_id, new_tasks, {status_field: "Aloitettu", **revision_fields()}
         )
-        if result.matched_count == 0:
+        if document is None:
             return jsonify({"error": "Document not found"}), 404
+        bump_osasto_versions(document.get("Osasto"))
 
         return jsonify({"message": "Task started successfully"}), 200
     except Exception as e:
@@ -106,20 +361,15 @@ def end_task():
         except Exception:
             return jsonify({"error": "Invalid ID"}), 400
 
-        document = collection.find_one({"_id": document_id})
+        document = collection.find_one({"_id": document_id}, {"Osasto": 1})
         if not document:
             return jsonify({"error": "Document not found"}), 404
 
-        tasks = document.get("Task", [])
-        task_found = False
+        task_store = get_task_store()
         section = None
 
         # Step 1: Filter tasks with the same group_id and no end_time
-        group_tasks = [
-            task
-            for task in tasks
-            if task.get("group_id") == group_id and "end_time" not in task
-        ]
+        group_tasks = task_store.open_group_tasks(document_id, group_id)
 
         if not group_tasks:
             return (
@@ -140,75 +390,41 @@ def end_task():
         # Step 3: Update each task in the group
         end_time = datetime.now(FINLAND_TZ)
 
-        # Modify tasks in place
-        for idx, task in enumerate(tasks):
-            if task.get("group_id") == group_id and "end_time" not in task:
-                task_found = True
-                section = task.get("section")
-                start_time = task["start"]
-
-                # Ensure start_time is timezone-aware
-                if isinstance(start_time, str):
-                    start_time = datetime.fromisoformat(start_time)
-                elif not isinstance(start_time, datetime):
-                    raise ValueError("Invalid start time format")
-
-                # If start_time is naive, localize it to FINLAND_TZ
-                if start_time.tzinfo is None:
-                    start_time = FINLAND_TZ.localize(start_time)
-
-                total_seconds = (end_time - start_time).total_seconds()
-                hours, remainder = divmod(int(total_seconds), 3600)
-                minutes = remainder // 60
-                total_time_formatted = f"{hours:02}:{minutes:02}"
-
-                # Assign pre-calculated kpl_done
-                task_kpl_done = distributed_kpl_done.pop(0)
-                task.update(
-                    {
-                        "end_time": end_time.isoformat(),
-                        "total_time": total_time_formatted,
-                        "kpl_done": task_kpl_done,
-                        "comment": comment,
-                    }
-                )
+        closed_tasks = {}
+        for task in group_tasks:
+            section = task.get("section")
 
-        if not task_found:
-            return jsonify({"error": "Task not found"}), 404
-
-        # Step 4: Conditionally calculate total_made and status ONLY if section is "Hygienia" or "Pakkaus"
-        update_fields = {"Task": tasks}  # Update all tasks, preserving unrelated ones
-        if section in ["Hygienia", "Pakkaus"]:
-            total_made_field = f"total_made{section}"
-            status_field = f"Status{section}"
-            total_made = sum(
-                task.get("kpl_done", 0)
-                for task in tasks
-                if task.get("section") == section
-            )
+            # Stored as a BSON date; older tasks may still hold ISO strings
+            if not isinstance(task["start"], (str, datetime)):
+                raise ValueError("Invalid start time format")
+            start_time = to_local(task["start"])
 
-            # Compare total_made with Quantity
-            quantity = document.get("Quantity", 0)
-            if total_made == quantity:
-                new_status = "Valmis"
-            elif total_made > quantity:
-                new_status = "Yli"
-            else:
-                new_status = "Aloitettu"
-
-            # Update total_made and status dynamically
-            update_fields.update(
-                {
-                    total_made_field: total_made,
-                    status_field: new_status,
-                }
-            )
+            total_seconds = (end_time - start_time).total_seconds()
 
-        # Step 5: Update the document in the database
-        result = collection.update_one({"_id": document_id}, {"$set": update_fields})
+            # Assign pre-calculated kpl_done
+            task_kpl_done = distributed_kpl_done.pop(0)
+            closed_tasks[task["task_id"]] = {
+                "end_time": end_time,
+                "duration_seconds": int(total_seconds),
+                "kpl_done": task_kpl_done,
+                "comment": comment,
+            }
 
-        if result.matched_count == 0:
-            return jsonify({"error": "Failed to update task"}), 500
+        # Step 4: Close the group; total_made and the status are only
+        # tracked for some sections, and are updated together with it
+        total_made_field = f"total_made{section}"
+        status_field = f"Status{section}"
+        counted = section in COUNTED_SECTIONS
+        result = task_store.close_tasks(
+            document_id,
+            closed_tasks,
+            section if counted else None,
+            set_fields=revision_fields(),
+        )
+        if result is None:
+            return jsonify({"error": "Task not found"}), 404
+        total_made, new_status = result
+        bump_osasto_versions(document.get("Osasto"))
 
         response = {"message": "Task ended successfully"}
         if section == "Hygienia":
@@ -221,83 +437,50 @@ def end_task():
         return jsonify({"error": str(e)}), 500
 
 
+def run_import(stream, filename, progress):
+    """Background job body for /import_excel."""
+    with stream:
+        result = import_orders(
+            stream,
+            filename,
+            get_collection(),
+            get_collection_koodit(),
+            progress,
+            stamp=revision_fields,
+        )
+    bump_osasto_versions(*result["osastot"])
+    result["summary_refreshed"] = False
+    if set(result["osastot"]) & set(EFFICIENCY_OSASTOT):
+        # Import writes bypass apply_order_change, so rebuild the totals
+        try:
+            refresh_efficiency_summary()
+            result["summary_refreshed"] = True
+        except LookupError:
+            # No summary for this week yet
+            pass
+    return {"message": "Data imported and enriched successfully", **result}
+
+
 @task_bp.route("/import_excel", methods=["POST"])
 def import_excel():
+    """
+    Queue an ERP export (.xlsx or .csv) for import; poll /jobs/<job_id>.
+    """
     try:
         if "file" not in request.files:
             return jsonify({"error": "No file uploaded"}), 400
 
         file = request.files["file"]
-        file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-        file.save(file_path)
-        df = pd.read_excel(file_path)
-        if df.empty:
-            return jsonify({"error": "Uploaded Excel file is empty"}), 400
-        koodit_collection = get_collection_koodit()
-        koodit_data = list(koodit_collection.find({}, {"_id": 0}))
-        koodit_lookup = {
-            item["Item number"]
-            .strip()
-            .upper(): {
-                "Category": item.get("Category", "Unknown"),
-                "Standardiaika": float(
-                    str(item.get("Standardiaika", "0")).replace(",", ".")
-                ),
-                "Kategoria": item.get("Kategoria", "Unknown"),
-            }
-            for item in koodit_data
-        }
-
-        enriched_data = []
-        for _, row in df.iterrows():
-            item_number = str(row.get("Item number", "")).strip().upper()
-            koodit_match = koodit_lookup.get(item_number, {})
-
-            ship_date = row.get("Ship date")
-            formatted_date = ""
-            vko_value = None
-            if pd.notnull(ship_date):
-                try:
-                    date_obj = pd.to_datetime(
-                        ship_date, format="%d/%m/%Y", dayfirst=True
-                    )
-                    formatted_date = date_obj.strftime("%d.%m.%Y")
-                    vko_value = date_obj.isocalendar()[1]
-                except Exception as e:
-                    print(f"Error parsing 'Ship date': {e}")
-            document = {
-                "Item number": item_number,
-                "Category": koodit_match.get("Category", "Unknown"),
-                "Standardiaika": koodit_match.get("Standardiaika", 0),
-                "Kategoria": koodit_match.get("Kategoria", "Unknown"),
-                "Ship date": formatted_date,
-                "VKO": vko_value,
-                "Osasto": 1,
-                "Jononumero": 1,
-                **row.to_dict(),
-            }
-            document = {
-                key: value
-                for key, value in document.items()
-                if pd.notnull(value) and value != ""
-            }
-
-            enriched_data.append(document)
-
-        suomi_collection = get_collection()
-        if enriched_data:
-            suomi_collection.insert_many(enriched_data)
-            return (
-                jsonify(
-                    {
-                        "message": "Data imported and enriched successfully",
-                        "inserted_records": len(enriched_data),
-                    }
-                ),
-                200,
-            )
-        else:
-            return jsonify({"error": "No data was enriched or inserted"}), 400
+        if not file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+            return jsonify({"error": "Only .xlsx and .csv files are supported"}), 400
+
+        # The request stream is closed once the response is sent
+        upload = io.BytesIO(file.read())
+        job_id = enqueue("import_excel", run_import, upload, file.filename)
+        return (
+            jsonify({"message": "Import queued", "job_id": job_id}),
+            202,
+        )
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -320,11 +503,14 @@ def update_press():
         except Exception:
             return jsonify({"error": "Invalid ID"}), 400
 
-        result = collection.update_one(
-            {"_id": document_id}, {"$set": {"total_made": total_made}}
+        document = collection.find_one_and_update(
+            {"_id": document_id},
+            {"$set": {"total_made": total_made, **revision_fields()}},
         )
-        if result.matched_count == 0:
+        if document is None:
             return jsonify({"error": "Document not found"}), 404
+        apply_order_change(document, {**document, "total_made": total_made})
+        bump_osasto_versions(document.get("Osasto"))
 
         return jsonify({"message": "Press updated successfully"}), 200
 
@@ -332,91 +518,134 @@ def update_press():
         return jsonify({"error": str(e)}), 500
 
 
-@task_bp.route("/getOsasto100", methods=["GET"])
-def get_osasto100():
-    try:
-        collection = get_collection()  # Access the "Suomi" collection
-
-        # Query MongoDB for documents where Osasto == 100
-        result = list(collection.find({"Osasto": 100}))
+def osasto_rows(osasto, section=None, order_ids=None):
+    """
+    Load the rows of a department as served to the section views.
 
-        # Convert MongoDB ObjectId to string for JSON serialization
-        for doc in result:
-            doc["_id"] = str(doc["_id"])
+    With ``section`` the ``Task`` array only holds that section's open
+    tasks; ``order_ids`` restricts the read to those orders.
+    """
+    match = {"Osasto": osasto}
+    if order_ids is not None:
+        match["_id"] = {"$in": list(order_ids)}
+    pipeline = [{"$match": match}, {"$sort": {"Jononumero": 1}}]
+    if section:
+        pipeline.extend(get_task_store().open_tasks_stages(section))
 
-        return jsonify(result), 200
+    return [serialize_order(doc) for doc in get_collection().aggregate(pipeline)]
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
 
+@task_bp.route("/osasto/<int:osasto>", methods=["GET"])
+@task_bp.route("/getOsasto<int:osasto>", methods=["GET"])
+def get_osasto(osasto):
+    """
+    Return the orders of one department (Osasto).
 
-@task_bp.route("/getOsasto200", methods=["GET"])
-def get_osasto200():
+    With ``?section=<name>`` the ``Task`` array only contains the open tasks
+    of that section. Responses carry an ETag built from the department's
+    change counter, so unchanged polls are answered with 304.
+    """
     try:
-        collection = get_collection()
-        result = list(collection.find({"Osasto": 200}))
+        section = request.args.get("section")
+        version = get_osasto_version(osasto)
+        etag = f"osasto-{osasto}-{version}-{section or 'all'}"
+        if etag in request.if_none_match:
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
 
-        for doc in result:
-            doc["_id"] = str(doc["_id"])
+        result = osasto_rows(osasto, section)
 
-        return jsonify(result), 200
+        response = jsonify(result)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "no-cache"
+        return response, 200
 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 
-@task_bp.route("/getOsasto300", methods=["GET"])
-def get_osasto300():
-    try:
-        collection = get_collection()
-        result = list(collection.find({"Osasto": 300}))
+def _same(old, new):
+    # NaN never compares equal, so two NaNs would otherwise always differ
+    return old == new or (old != old and new != new)
 
-        for doc in result:
-            doc["_id"] = str(doc["_id"])
 
-        return jsonify(result), 200
+def row_changes(old, new):
+    """Fields of ``new`` that differ from ``old`` and fields it no longer has."""
+    fields = {
+        key: value for key, value in new.items() if not _same(old.get(key), value)
+    }
+    removed = [key for key in old if key not in new]
+    return fields, removed
 
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-
-@task_bp.route("/getOsasto400", methods=["GET"])
-def get_osasto400():
-    try:
-        collection = get_collection()
-        result = list(collection.find({"Osasto": 400}))
-
-        for doc in result:
-            doc["_id"] = str(doc["_id"])
 
-        return jsonify(result), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+@task_bp.route("/osasto/<int:osasto>/events", methods=["GET"])
+def osasto_events(osasto):
+    """
+    Stream live changes of one department as server-sent events.
 
+    Sends the full list once (``reset``), then a ``change`` event with the
+    changed fields of each order that changes and a ``delete`` event for
+    orders that leave the department. ``?section=`` works as for
+    /osasto/<n>.
+    """
+    section = request.args.get("section")
+    events = current_app.extensions["order_events"]
+    updates = events.subscribe(osasto)
+    dumps = current_app.json.dumps
 
-@task_bp.route("/getOsasto500", methods=["GET"])
-def get_osasto500():
-    try:
-        collection = get_collection()
-        result = list(collection.find({"Osasto": 500}))
+    def message(event, data):
+        return f"event: {event}\ndata: {dumps(data)}\n\n"
 
-        for doc in result:
-            doc["_id"] = str(doc["_id"])
+    def load(order_ids=None):
+        rows = osasto_rows(osasto, section, order_ids)
+        return {str(row["_id"]): row for row in rows}
 
-        return jsonify(result), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-
-@task_bp.route("getOsasto600", methods=["GET"])
-def get_osasto600():
-    try:
-        collection = get_collection()
-        result = list(collection.find({"Osasto": 600}))
-
-        for doc in result:
-            doc["_id"] = str(doc["_id"])
-
-        return jsonify(result), 200
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    def stream():
+        try:
+            rows = load()
+            yield message("reset", list(rows.values()))
+            while True:
+                try:
+                    pending = [updates.get(timeout=HEARTBEAT_SECONDS)]
+                except queue.Empty:
+                    yield ": ping\n\n"
+                    continue
+                # Coalesce bursts into one read
+                while not updates.empty():
+                    pending.append(updates.get_nowait())
+
+                if any(order_id is None for order_id, _ in pending):
+                    fresh = load()
+                    changed = set(rows) | set(fresh)
+                else:
+                    changed = {
+                        str(order_id)
+                        for order_id, targeted in pending
+                        if targeted or str(order_id) in rows
+                    }
+                    if not changed:
+                        continue
+                    fresh = load(map(ObjectId, changed))
+
+                for order_id in changed:
+                    old, new = rows.get(order_id), fresh.get(order_id)
+                    if new is None:
+                        if rows.pop(order_id, None) is not None:
+                            yield message("delete", {"id": order_id})
+                        continue
+                    fields, removed = row_changes(old or {}, new)
+                    if fields or removed:
+                        rows[order_id] = new
+                        yield message(
+                            "change",
+                            {"id": order_id, "fields": fields, "removed": removed},
+                        )
+        finally:
+            events.unsubscribe(updates)
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,50 @@
+import datetime
+from App.extensions.db import db
+from App.extensions.scheduler import daily, weekly
+from App.models.efficiency_model import EfficiencyModel
+from App.models.efficiency_summary import (
+    WEEK_CUTOFF_TIME,
+    WEEK_CUTOFF_WEEKDAY,
+    refresh_efficiency_summary,
+    roll_over_week,
+)
+from App.models.order_changes import prune_tombstones
+
+# Local time of the nightly recomputation, before the morning shift
+NIGHTLY_TIME = datetime.time(2, 0)
+
+
+def nightly_precompute(progress=None):
+    """
+    Recompute KokkolaEfficiency and the current summary while nobody works,
+    and prune expired order tombstones.
+    """
+    processed = EfficiencyModel(db).calculate_efficiency()
+    try:
+        summary = refresh_efficiency_summary(progress)["summary_name"]
+    except LookupError:
+        summary = None
+    return {
+        "processed": processed,
+        "summary": summary,
+        "tombstones_pruned": prune_tombstones(),
+    }
+
+
+def register_schedule(app):
+    """Add the scheduled jobs to the app's scheduler."""
+    scheduler = app.extensions["scheduler"]
+    # A missed snapshot is worth catching up on through the weekend
+    scheduler.add(
+        "weekly-rollover",
+        weekly(WEEK_CUTOFF_WEEKDAY, WEEK_CUTOFF_TIME),
+        roll_over_week,
+        catch_up=datetime.timedelta(days=3),
+    )
+    # Too late a nightly run would land in the morning shift
+    scheduler.add(
+        "nightly-precompute",
+        daily(NIGHTLY_TIME),
+        nightly_precompute,
+        catch_up=datetime.timedelta(hours=4),
+    )
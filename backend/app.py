@@ -1,7 +1,10 @@
+import os
 from App import create_app
+from App.extensions import start_scheduler
 
-# Change "development" to "production" for production environments
-app = create_app(config_name="development")
+# Development server only; production runs wsgi.py (see gunicorn.conf.py)
+app = create_app(config_name=os.getenv("FLASK_CONFIG", "development"))
 
 if __name__ == "__main__":
+    start_scheduler(app)
     app.run()
@@ -0,0 +1,18 @@
+"""
+Benchmarks, run from backend/ as ``python -m benchmarks.<name>``.
+
+App/__init__ wires up MongoDB on import; the client connects lazily, so
+placeholders are enough when no .env is present. Set here, before any
+benchmark imports App.
+"""
+
+import os
+
+for name, value in {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "DATABASE_NAME": "benchmark",
+    "COLLECTION_NAME": "orders",
+    "EFFICIENCY_COLLECTION_NAME": "efficiency",
+    "CODES_COLLECTION_NAME": "codes",
+}.items():
+    os.environ.setdefault(name, value)
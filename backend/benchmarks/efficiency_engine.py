@@ -0,0 +1,104 @@
+"""
+Throughput of the efficiency calculation: per-document loop vs. the engine.
+
+Run from backend/:  python -m benchmarks.efficiency_engine [sizes...]
+Works on synthetic orders in memory; no database is touched. Results
+are recorded in benchmarks/README.md.
+"""
+
+import random
+import sys
+import time
+from App.models.efficiency_engine import (
+    KPL_STD,
+    KPL_TARGET,
+    kpl,
+    kpl_frame,
+    row_fields,
+    totals,
+    to_numeric,
+)
+
+DEFAULT_SIZES = (10_000, 100_000)
+REPEAT = 3
+
+
+def make_orders(count, seed=1):
+    rng = random.Random(seed)
+    orders = []
+    for _ in range(count):
+        order = {
+            "Quantity": rng.randint(1, 500),
+            "Standardiaika": rng.choice([0, 0.25, 0.5, 1.2, 2.75, float("nan")]),
+            "Osasto": rng.choice([300, 400]),
+        }
+        if rng.random() < 0.8:
+            order["total_made"] = rng.randint(0, 500)
+        orders.append(order)
+    return orders
+
+
+def loop(orders):
+    """The per-document calculation the routes used before the engine."""
+    total_std = 0
+    total_target = 0
+    fields = []
+    for order in orders:
+        updates = {}
+        total_made = order.get("total_made", 0)
+        quantity = order.get("Quantity", 0)
+        standardiaika = order.get("Standardiaika", 0)
+        if total_made and standardiaika:
+            updates[KPL_STD] = round(float(total_made) * float(standardiaika), 2)
+            total_std += updates[KPL_STD]
+        if quantity and standardiaika:
+            updates[KPL_TARGET] = round(float(quantity) * float(standardiaika), 2)
+            total_target += updates[KPL_TARGET]
+        fields.append(updates)
+    return fields, total_std, total_target
+
+
+def engine(orders):
+    frame = kpl_frame(orders)
+    return row_fields(frame), totals(frame)
+
+
+def columns(orders):
+    """Split into columns once, as a projected columnar read would."""
+    return {
+        field: to_numeric([order.get(field) for order in orders])
+        for field in ("total_made", "Quantity", "Standardiaika")
+    }
+
+
+def columnar(data):
+    """The vectorised arithmetic alone."""
+    std = kpl(data["total_made"], data["Standardiaika"])
+    target = kpl(data["Quantity"], data["Standardiaika"])
+    return std, target
+
+
+def best_of(func, orders):
+    best = float("inf")
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func(orders)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main(sizes):
+    print("orders/s, best of", REPEAT)
+    print(f"{'orders':>10} {'loop':>12} {'engine':>12} {'columnar':>12}")
+    for size in sizes:
+        orders = make_orders(size)
+        rates = [
+            size / best_of(loop, orders),
+            size / best_of(engine, orders),
+            size / best_of(columnar, columns(orders)),
+        ]
+        print(f"{size:>10}" + "".join(f" {rate:>12,.0f}" for rate in rates))
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,141 @@
+"""
+Load test for a running server: GET /api/osasto/<n> and the
+start_task + endTask cycle.
+
+Run from backend/ against a test database (the endtask scenario writes):
+
+    python -m benchmarks.http_load --url http://127.0.0.1:5000 \
+        --osasto 300 --order-id <ObjectId> --concurrency 16 --seconds 20
+
+Compare the servers by pointing it at each in turn:
+
+    FLASK_CONFIG=production flask --app app run --port 5000
+    FLASK_CONFIG=production gunicorn -c gunicorn.conf.py wsgi:app
+
+and record requests/s and latency percentiles per scenario in
+benchmarks/README.md, together with the core count and
+WEB_WORKERS/WEB_THREADS. Use the same data set for both runs; the osasto
+response size dominates the GET path.
+"""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+
+def _request(url, payload=None):
+    data = None if payload is None else json.dumps(payload).encode()
+    request = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        response.read()
+        return response.status
+
+
+def get_osasto(args, worker):
+    _request(f"{args.url}/api/osasto/{args.osasto}")
+
+
+def end_task_cycle(args, worker):
+    """Start a task group for this worker and close it again."""
+    base = f"{args.url}/api/"
+    _request(
+        base + "start_task",
+        {
+            "id": args.order_id,
+            "workerNames": [f"bench-{worker}"],
+            "phase": "benchmark",
+            "section": args.section,
+        },
+    )
+    # The group id is generated server side; find this worker's open group
+    with urllib.request.urlopen(
+        f"{base}osasto/{args.osasto}?section={args.section}", timeout=30
+    ) as response:
+        rows = json.load(response)
+    group_id = next(
+        task["group_id"]
+        for row in rows
+        if row["_id"] == args.order_id
+        for task in row.get("Task", [])
+        if task.get("workerName") == f"bench-{worker}" and not task.get("end_time")
+    )
+    _request(
+        base + "endTask",
+        {"id": args.order_id, "group_id": group_id, "kpl_done": 0},
+    )
+
+
+SCENARIOS = {"osasto": get_osasto, "endtask": end_task_cycle}
+
+
+def run(scenario, args):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+
+    def loop(worker):
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                scenario(args, worker)
+            except (urllib.error.URLError, OSError, StopIteration, KeyError):
+                with lock:
+                    errors[0] += 1
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    threads = [
+        threading.Thread(target=loop, args=(worker,))
+        for worker in range(args.concurrency)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors[0], time.perf_counter() - started
+
+
+def report(name, latencies, errors, elapsed):
+    if not latencies:
+        print(f"{name:>8}: no successful requests ({errors} errors)")
+        return
+    cuts = statistics.quantiles(latencies, n=100)
+    print(
+        f"{name:>8}: {len(latencies) / elapsed:8.1f} req/s  "
+        f"p50 {cuts[49] * 1000:7.1f} ms  p95 {cuts[94] * 1000:7.1f} ms  "
+        f"p99 {cuts[98] * 1000:7.1f} ms  errors {errors}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--osasto", type=int, default=300)
+    parser.add_argument("--order-id", help="order used by the endtask scenario")
+    parser.add_argument("--section", default="Hygienia")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument(
+        "--scenario", choices=sorted(SCENARIOS), action="append", dest="scenarios"
+    )
+    args = parser.parse_args()
+
+    scenarios = args.scenarios or sorted(SCENARIOS)
+    if "endtask" in scenarios and not args.order_id:
+        parser.error("the endtask scenario needs --order-id")
+    print(f"{args.url}, {args.concurrency} clients, {args.seconds:g} s per scenario")
+    for name in scenarios:
+        report(name, *run(SCENARIOS[name], args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+JSON encoding of order payloads: the old cleaners + stdlib jsonify vs.
+MongoJSONProvider with and without orjson.
+
+Run from backend/:  python -m benchmarks.json_encoding [orders...]
+Works on synthetic orders in memory; no database is touched. Results
+are recorded in benchmarks/README.md.
+"""
+
+import copy
+import datetime
+import math
+import random
+import sys
+import time
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from App.extensions import json_provider
+from App.models.task_store import serialize_task
+
+DEFAULT_SIZES = (5_000,)
+REPEAT = 5
+
+
+def make_orders(count, seed=1):
+    rng = random.Random(seed)
+    start = datetime.datetime(2026, 10, 12, 6)
+    orders = []
+    for index in range(count):
+        order = {
+            "_id": ObjectId(),
+            "Osasto": rng.choice([100, 200, 300, 400]),
+            "Jononumero": rng.randint(0, 40),
+            "VKO": rng.randint(1, 52),
+            "Sales order": f"SO{rng.randint(10000, 99999)}",
+            "Item number": f"IT-{rng.randint(1000, 9999)}",
+            "Reference number": rng.choice([None, f"R{index}"]),
+            "Category": rng.choice(["A", "B", float("nan")]),
+            "Ship date": "17/10/2026",
+            "Quantity": rng.randint(1, 500),
+            "total_made": rng.randint(0, 500),
+            "Deliver remainder": rng.choice([0, 5, float("nan")]),
+            "Standardiaika": rng.choice([0.25, 0.5, 1.2, float("nan")]),
+            "StatusLeikkaus": rng.choice(["", "Aloitettu", "Valmis"]),
+            "updated_at": start + datetime.timedelta(minutes=index),
+            "_rev": index,
+            "Task": [
+                {
+                    "task_id": f"t{index}-{n}",
+                    "group_id": f"g{index}",
+                    "workerName": f"worker{rng.randint(1, 30)}",
+                    "section": "Hygienia",
+                    "start": start + datetime.timedelta(hours=n),
+                    "end_time": start + datetime.timedelta(hours=n, minutes=30),
+                    "duration_seconds": 1800,
+                    "kpl_done": rng.randint(0, 50),
+                }
+                for n in range(rng.randint(0, 3))
+            ],
+        }
+        orders.append(order)
+    return orders
+
+
+def make_summary(orders):
+    items = [
+        {
+            "_id": str(order["_id"]),
+            **{
+                field: order[field]
+                for field in ("Osasto", "Jononumero", "Quantity", "total_made")
+            },
+            "KPL STD ajalla": order["Standardiaika"] * order["total_made"],
+        }
+        for order in orders
+    ]
+    return {
+        "_id": ObjectId(),
+        "summary_name": "PärnuEfficiency_Week42/2026",
+        "EFFICIENCY NOW": float("nan"),
+        "refreshed_at": datetime.datetime(2026, 10, 16, 12),
+        "items": items,
+    }
+
+
+def legacy_task(task):
+    """serialize_task() when it still wrote the ISO strings itself."""
+    task = serialize_task(task)
+    for field in ("start", "end_time"):
+        if isinstance(task.get(field), datetime.datetime):
+            task[field] = task[field].isoformat()
+    return task
+
+
+def clean_document(doc):
+    """/getData and /orders/changes before the provider."""
+    doc["_id"] = str(doc["_id"])
+    if "Task" in doc:
+        doc["Task"] = [legacy_task(task) for task in doc["Task"]]
+    for key, value in doc.items():
+        if isinstance(value, float) and math.isnan(value):
+            doc[key] = ""
+        elif value is None:
+            doc[key] = ""
+    return doc
+
+
+def clean_nan_values(data):
+    if isinstance(data, list):
+        return [clean_nan_values(item) for item in data]
+    if isinstance(data, dict):
+        return {
+            key: (
+                None
+                if isinstance(value, float) and math.isnan(value)
+                else clean_nan_values(value)
+            )
+            for key, value in data.items()
+        }
+    return data
+
+
+def convert_objectid_to_str(data):
+    if isinstance(data, list):
+        return [convert_objectid_to_str(item) for item in data]
+    if isinstance(data, dict):
+        return {
+            key: (
+                str(value)
+                if isinstance(value, ObjectId)
+                else convert_objectid_to_str(value)
+            )
+            for key, value in data.items()
+        }
+    return data
+
+
+def serialize_order(doc):
+    if "Task" in doc:
+        doc["Task"] = [serialize_task(task) for task in doc["Task"]]
+    return doc
+
+
+def legacy_orders(app, orders):
+    return app.json.dumps([clean_document(order) for order in orders])
+
+
+def provider_orders(app, orders):
+    return app.json.dumps([serialize_order(order) for order in orders])
+
+
+def legacy_summary(app, summary):
+    return app.json.dumps(convert_objectid_to_str(clean_nan_values(summary)))
+
+
+def provider_summary(app, summary):
+    return app.json.dumps(summary)
+
+
+def best_of(func, app, payload):
+    best = float("inf")
+    for _ in range(REPEAT):
+        # The cleaners work in place, so every run gets its own copy
+        data = copy.deepcopy(payload)
+        started = time.perf_counter()
+        func(app, data)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def apps():
+    legacy = Flask("legacy")
+    legacy.json = DefaultJSONProvider(legacy)
+    stdlib = Flask("stdlib")
+    stdlib.json = json_provider.MongoJSONProvider(stdlib)
+    fast = Flask("orjson")
+    fast.json = json_provider.MongoJSONProvider(fast)
+    return legacy, stdlib, fast
+
+
+def timed(orjson, func, app, payload):
+    saved = json_provider.orjson
+    json_provider.orjson = orjson
+    try:
+        return best_of(func, app, payload)
+    finally:
+        json_provider.orjson = saved
+
+
+def main(sizes):
+    legacy, stdlib, fast = apps()
+    orjson = json_provider.orjson
+    print("milliseconds per payload, best of", REPEAT)
+    if orjson is None:
+        print("orjson is not installed; its column is skipped")
+    print(f"{'payload':>16} {'legacy':>10} {'stdlib':>10} {'orjson':>10}")
+    for size in sizes:
+        orders = make_orders(size)
+        for name, old, new, payload in (
+            (f"{size} orders", legacy_orders, provider_orders, orders),
+            (f"{size} items", legacy_summary, provider_summary, make_summary(orders)),
+        ):
+            times = [
+                timed(orjson, old, legacy, payload),
+                timed(None, new, stdlib, payload),
+                timed(orjson, new, fast, payload) if orjson else None,
+            ]
+            print(
+                f"{name:>16}"
+                + "".join(
+                    f" {elapsed * 1000:>10.1f}" if elapsed else f" {'-':>10}"
+                    for elapsed in times
+                )
+            )
+
+
+if __name__ == "__main__":
+    main([int(arg) for arg in sys.argv[1:]] or DEFAULT_SIZES)
@@ -0,0 +1,29 @@
+"""
+gunicorn settings: ``gunicorn -c gunicorn.conf.py wsgi:app``.
+
+Graceful reload: ``kill -HUP <master pid>`` starts workers on the new code
+and lets the old ones finish their requests for ``graceful_timeout``.
+Open event streams are closed at that point and browsers reconnect.
+"""
+
+from serving import bind_address, thread_count, worker_count
+
+bind = bind_address()
+workers = worker_count()
+# Threaded workers, so long-lived event streams don't block a whole process
+worker_class = "gthread"
+threads = thread_count()
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+# Recycle workers periodically to bound memory held after large imports
+max_requests = 2000
+max_requests_jitter = 200
+accesslog = "-"
+
+
+def post_worker_init(worker):
+    """Start the scheduler in each worker once it has loaded the app."""
+    from App.extensions import start_scheduler
+
+    start_scheduler(worker.wsgi)
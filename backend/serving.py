@@ -0,0 +1,20 @@
+"""Server sizing shared by gunicorn.conf.py and the waitress entry point."""
+
+import multiprocessing
+import os
+
+
+def bind_address():
+    """BIND, or all interfaces on PORT (default 5000)."""
+    return os.getenv("BIND", f"0.0.0.0:{os.getenv('PORT', '5000')}")
+
+
+def worker_count():
+    """WEB_WORKERS, or gunicorn's 2 x cores + 1 rule of thumb."""
+    configured = os.getenv("WEB_WORKERS")
+    return int(configured) if configured else multiprocessing.cpu_count() * 2 + 1
+
+
+def thread_count():
+    """Threads per worker. Every open event stream holds one."""
+    return int(os.getenv("WEB_THREADS", "8"))
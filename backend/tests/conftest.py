@@ -0,0 +1,39 @@
+import importlib
+import os
+import pytest
+
+# App/extensions/db.py reads these on import; the database is mongomock
+for name, value in {
+    "MONGO_URI": "mongodb://localhost:27017",
+    "DATABASE_NAME": "pcs_test",
+    "COLLECTION_NAME": "orders",
+    "EFFICIENCY_COLLECTION_NAME": "efficiency",
+    "CODES_COLLECTION_NAME": "codes",
+    "JWT": "test",
+    "MONGO_ENSURE_INDEXES": "0",
+    "SCHEDULER": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+mongomock = pytest.importorskip("mongomock")
+
+from App import create_app  # noqa: E402
+
+# App.extensions re-exports the ``db`` proxy under the module's name
+db_module = importlib.import_module("App.extensions.db")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr(db_module, "MongoClient", mongomock.MongoClient)
+    monkeypatch.setattr(db_module, "_client", None)
+    monkeypatch.setattr(db_module, "_extensions", {})
+    app = create_app("development")
+    app.config.update(TESTING=True, SYNC_LAG_SECONDS=0)
+    yield app
+    db_module.get_client().drop_database(db_module.database_name)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
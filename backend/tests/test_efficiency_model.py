@@ -0,0 +1,21 @@
+from App.extensions.db import db
+from App.models.efficiency_model import EfficiencyModel
+
+
+def test_incremental_run_writes_changed_sources(app):
+    source = db["Kokkola"]
+    source.insert_many(
+        [
+            {"KEY": "a", "Standardiaika": 2, "Total made": 10, "Viikon työtunnit": 40},
+            {"KEY": "b", "Standardiaika": 1, "Total made": 5, "Viikon työtunnit": 40},
+        ]
+    )
+    model = EfficiencyModel(db)
+    assert model.calculate_efficiency(incremental=True) == 2
+    assert model.calculate_efficiency(incremental=True) == 0
+
+    source.update_one({"KEY": "b"}, {"$set": {"Total made": 8}})
+
+    assert model.calculate_efficiency(incremental=True) == 1
+    result = db["KokkolaEfficiency"].find_one({"KEY": "b"})
+    assert result["Viikonvalmistuneet kappaleet std"] == 8
@@ -0,0 +1,56 @@
+import datetime
+from App.extensions.db import (
+    get_collection,
+    get_collection_efficiency,
+    get_collection_efficiency_items,
+)
+from App.models import efficiency_summary
+from App.models.efficiency_summary import (
+    FINLAND_TZ,
+    SAVED,
+    live_week,
+    place_items,
+    roll_over_week,
+    summary_items,
+    summary_key,
+    summary_name,
+)
+
+WEEK_42 = {"iso_year": 2026, "iso_week": 42}
+WEEK_43 = {"iso_year": 2026, "iso_week": 43}
+
+
+def test_spilled_items_are_replaced_in_place(app, monkeypatch):
+    monkeypatch.setattr(efficiency_summary, "MAX_INLINE_ITEMS_BYTES", 0)
+    children = get_collection_efficiency_items()
+    place_items("week", [{"_id": "a", "Quantity": 1}, {"_id": "b", "Quantity": 2}])
+    kept = children.find_one({"item_id": "a"})["_id"]
+
+    fields = place_items("week", [{"_id": "a", "Quantity": 3}, {"_id": "c"}])
+
+    items = summary_items({"summary_name": "week", **fields})
+    assert sorted(items, key=lambda item: item["_id"]) == [
+        {"_id": "a", "Quantity": 3},
+        {"_id": "c"},
+    ]
+    # Replaced, not deleted and re-inserted
+    assert children.find_one({"item_id": "a"})["_id"] == kept
+
+
+def test_live_week_moves_on_at_the_rollover_not_the_cutoff(app):
+    monday = FINLAND_TZ.localize(datetime.datetime(2026, 10, 12, 8))
+    friday_evening = FINLAND_TZ.localize(datetime.datetime(2026, 10, 16, 18))
+    roll_over_week(now=monday)
+    get_collection().insert_one({"Osasto": 300, "Quantity": 5, "Standardiaika": 1})
+    get_collection_efficiency().insert_one(
+        {**summary_key(week=WEEK_42), "summary_name": "w42", "viikon_tyotunnit": 40}
+    )
+
+    # Past the cutoff, before the rollover: still the week being saved
+    assert live_week(friday_evening) == WEEK_42
+
+    result = roll_over_week(now=friday_evening)
+
+    assert result["saved"] == summary_name(summary_key(SAVED, WEEK_42))
+    assert result["built"] == summary_name(summary_key(week=WEEK_43))
+    assert live_week(friday_evening) == WEEK_43
@@ -0,0 +1,30 @@
+from App.extensions.db import get_collection, get_collection_tasks
+
+
+def test_end_task_closes_group_and_updates_status_together(app, client):
+    # The embedded store's $mergeObjects pipeline is not supported by mongomock
+    app.config["TASK_STORAGE"] = "collection"
+    order_id = get_collection().insert_one({"Osasto": 300, "Quantity": 4}).inserted_id
+    client.post(
+        "/api/start_task",
+        json={
+            "id": str(order_id),
+            "workerNames": ["Anna", "Bert"],
+            "phase": "1",
+            "section": "Hygienia",
+        },
+    )
+    group_id = get_collection_tasks().find_one({"order_id": order_id})["group_id"]
+
+    response = client.post(
+        "/api/endTask", json={"id": str(order_id), "group_id": group_id, "kpl_done": 4}
+    )
+
+    assert response.get_json() == {
+        "message": "Task ended successfully",
+        "total_madeHygienia": 4,
+        "StatusHygienia": "Valmis",
+    }
+    order = get_collection().find_one({"_id": order_id})
+    assert order["StatusHygienia"] == "Valmis"
+    assert order["_rev"] == 2
@@ -0,0 +1,51 @@
+from pymongo.errors import AutoReconnect
+from App.extensions.db import get_collection
+from App.routes import task_routes
+
+
+def page_through(client, limit):
+    """Every page of /getData?order=Jononumero; returns the Jononumero values."""
+    after, values = None, []
+    while True:
+        url = f"/api/getData?order=Jononumero&limit={limit}"
+        if after:
+            url += f"&after={after}"
+        page = client.get(url).get_json()
+        values += [item.get("Jononumero") for item in page["items"]]
+        after = page["next_cursor"]
+        if after is None:
+            return values
+
+
+def test_jononumero_pages_cross_types(app, client):
+    get_collection().insert_many(
+        [{"Jononumero": value} for value in (None, 1, 2, 2, "a", 3, "b", True)]
+    )
+
+    assert page_through(client, limit=1) == [None, 1, 2, 2, 3, "a", "b", True]
+
+
+class FailingCursor:
+    """A find() cursor whose first batch fails, as on a lost connection."""
+
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def __iter__(self):
+        raise AutoReconnect("connection closed")
+
+
+class FailingCollection:
+    def find(self, *args):
+        return FailingCursor()
+
+
+def test_query_errors_are_a_500(app, client, monkeypatch):
+    monkeypatch.setattr(task_routes, "get_collection", lambda: FailingCollection())
+
+    response = client.get("/api/getData")
+
+    assert response.status_code == 500
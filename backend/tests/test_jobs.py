@@ -0,0 +1,22 @@
+import pytest
+from pymongo.errors import AutoReconnect
+from App.extensions import jobs
+from App.extensions.db import get_collection_jobs
+
+
+class Unreachable:
+    """Jobs collection of a server that went away after enqueue()."""
+
+    def update_one(self, *args, **kwargs):
+        raise AutoReconnect("connection closed")
+
+
+def test_job_is_disowned_when_its_status_cannot_be_written(app, monkeypatch):
+    job_id = get_collection_jobs().insert_one({"status": "queued"}).inserted_id
+    jobs._own(job_id)
+    monkeypatch.setattr(jobs, "get_collection_jobs", lambda: Unreachable())
+
+    with pytest.raises(AutoReconnect):
+        jobs._run(app, job_id, lambda progress: None, (), {})
+
+    assert job_id not in jobs._owned
@@ -0,0 +1,38 @@
+from App.extensions.db import get_collection
+from App.models.order_changes import record_deletes
+
+
+def sync(client, limit):
+    """Page /orders/changes from the start; returns (changed ids, deleted ids)."""
+    since, changed, deleted = "0", [], []
+    while True:
+        response = client.get(f"/api/orders/changes?since={since}&limit={limit}")
+        assert response.status_code == 200
+        page = response.get_json()
+        changed += [order["_id"] for order in page["changes"]]
+        deleted += page["deleted"]
+        since = page["next"]
+        if not page["has_more"]:
+            return changed, deleted
+
+
+def test_bulk_stamp_larger_than_page_syncs_every_order(app, client):
+    orders = get_collection()
+    orders.insert_many([{"Osasto": 100, "Jononumero": n} for n in range(1200)])
+    result = app.test_cli_runner().invoke(args=["backfill-revisions"])
+    assert "Stamped 1200 orders" in result.output
+
+    changed, _ = sync(client, limit=500)
+
+    assert len(changed) == 1200
+    assert set(changed) == {str(order["_id"]) for order in orders.find()}
+
+
+def test_deletes_sharing_a_revision_page_completely(app, client):
+    orders = [{"Osasto": 100, "Jononumero": n} for n in range(30)]
+    ids = get_collection().insert_many(orders).inserted_ids
+    record_deletes(*ids)
+
+    _, deleted = sync(client, limit=7)
+
+    assert sorted(deleted) == sorted(str(order_id) for order_id in ids)
@@ -0,0 +1,60 @@
+import io
+from App.extensions.db import (
+    get_collection,
+    get_collection_efficiency,
+    get_collection_koodit,
+)
+from App.models.efficiency_summary import summary_key
+from App.models.order_changes import get_osasto_version
+from App.routes.task_routes import run_import
+
+EXPORT = """Sales order;Item number;Reference number;Quantity;Ship date
+S1;I1;R1;7;16/10/2026
+S2;I2;R2;3;16/10/2026
+"""
+
+
+def import_export():
+    return run_import(io.BytesIO(EXPORT.encode()), "export.csv", None)
+
+
+def test_import_bumps_every_department_it_writes(app):
+    get_collection().insert_one(
+        {
+            "Sales order": "S1",
+            "Item number": "I1",
+            "Reference number": "R1",
+            "Osasto": 300,
+            "Quantity": 5,
+        }
+    )
+
+    result = import_export()
+
+    assert result["osastot"] == [1, 300]
+    assert get_osasto_version(300) == 1
+    assert get_osasto_version(1) == 1
+
+
+def test_import_rebuilds_the_summary_of_counted_departments(app):
+    get_collection().insert_one(
+        {
+            "Sales order": "S1",
+            "Item number": "I1",
+            "Reference number": "R1",
+            "Osasto": 300,
+            "Quantity": 5,
+            "Standardiaika": 2,
+        }
+    )
+    get_collection_koodit().insert_one({"Item number": "I1", "Standardiaika": "2"})
+    get_collection_efficiency().insert_one(
+        {**summary_key(), "viikon_tyotunnit": 10, "total_kpl_target_ajalla": 10}
+    )
+
+    result = import_export()
+
+    assert result["summary_refreshed"]
+    summary = get_collection_efficiency().find_one(summary_key())
+    # Quantity went from 5 to 7 at 2 per piece
+    assert summary["total_kpl_target_ajalla"] == 14
@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+from App.extensions.db import get_collection
+from App.models.task_store import MAX_WORKER_PAGE_SIZE, WORKER_PAGE_SIZE
+
+
+def add_tasks(count):
+    start = datetime(2026, 10, 1, 6)
+    get_collection().insert_one(
+        {
+            "Osasto": 100,
+            "Task": [
+                {
+                    "task_id": f"t{n}",
+                    "workerName": "Anna",
+                    "section": "Hygienia",
+                    "start": start + timedelta(minutes=n),
+                }
+                for n in range(count)
+            ],
+        }
+    )
+
+
+def test_worker_history_is_paged_by_default(app, client):
+    add_tasks(WORKER_PAGE_SIZE + 20)
+
+    response = client.post("/api/fetch_user_works", json={"workerName": "Anna"})
+
+    data = response.get_json()
+    assert len(data["tasks"]) == WORKER_PAGE_SIZE
+    assert data["total"] == WORKER_PAGE_SIZE + 20
+    assert data["tasks"][0]["task_id"] == f"t{WORKER_PAGE_SIZE + 19}"
+
+
+def test_worker_history_page_size_is_bounded(app, client):
+    response = client.post(
+        "/api/fetch_user_works",
+        json={"workerName": "Anna", "page_size": MAX_WORKER_PAGE_SIZE + 1},
+    )
+
+    assert response.status_code == 400
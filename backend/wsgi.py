@@ -0,0 +1,26 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app      (Linux)
+    python wsgi.py                             (waitress, e.g. on Windows)
+
+The config is picked with FLASK_CONFIG (default "production").
+"""
+
+import os
+from App import create_app
+
+# The scheduler is started by the server (gunicorn.conf.py, or below for
+# waitress) so `flask` commands, which may import this module, never run it
+app = create_app(config_name=os.getenv("FLASK_CONFIG", "production"))
+
+
+if __name__ == "__main__":
+    from waitress import serve
+    from App.extensions import start_scheduler
+    from serving import bind_address, thread_count, worker_count
+
+    start_scheduler(app)
+
+    # waitress serves from one process, so it gets every worker's threads
+    serve(app, listen=bind_address(), threads=worker_count() * thread_count())
@@ -0,0 +1,28 @@
+import axios from 'axios';
+import API_URL from './config.js';
+
+// Poll a background job until it finishes. Resolves with the job document,
+// rejects with the job's error message if it failed, or once `timeout` ms
+// have passed. The server fails jobs whose worker stopped, so the timeout
+// only guards against a job that never reports back.
+const waitForJob = async (jobId, { interval = 1000, timeout = 30 * 60 * 1000, onProgress } = {}) => {
+    const deadline = Date.now() + timeout;
+    for (;;) {
+        const { data } = await axios.get(`${API_URL}/api/jobs/${jobId}`);
+        if (data.status === 'done') {
+            return data;
+        }
+        if (data.status === 'failed') {
+            throw new Error(data.error || 'Job failed');
+        }
+        if (onProgress && data.progress) {
+            onProgress(data.progress);
+        }
+        if (Date.now() >= deadline) {
+            throw new Error('Job did not finish in time');
+        }
+        await new Promise((resolve) => setTimeout(resolve, interval));
+    }
+};
+
+export default waitForJob;
@@ -0,0 +1,41 @@
+import { useEffect, useRef } from 'react';
+import API_URL from './config.js';
+
+// Follow the live changes of one department (Osasto). The server sends the
+// full list once ("reset") and then only the changed fields of each order,
+// which are patched into the rows here. onRows receives the raw rows after
+// every change, in the same shape as /api/osasto/<n> returns them.
+const useOsastoEvents = (osasto, section, onRows) => {
+    const onRowsRef = useRef(onRows);
+    onRowsRef.current = onRows;
+
+    useEffect(() => {
+        let rows = new Map();
+        const publish = () => onRowsRef.current([...rows.values()]);
+        const source = new EventSource(
+            `${API_URL}/api/osasto/${osasto}/events?section=${encodeURIComponent(section)}`,
+            { withCredentials: true }
+        );
+
+        // Also sent again after every reconnect
+        source.addEventListener('reset', (event) => {
+            rows = new Map(JSON.parse(event.data).map((row) => [row._id, row]));
+            publish();
+        });
+        source.addEventListener('change', (event) => {
+            const { id, fields, removed } = JSON.parse(event.data);
+            const row = { ...(rows.get(id) || { _id: id }), ...fields };
+            removed.forEach((field) => delete row[field]);
+            rows.set(id, row);
+            publish();
+        });
+        source.addEventListener('delete', (event) => {
+            rows.delete(JSON.parse(event.data).id);
+            publish();
+        });
+
+        return () => source.close();
+    }, [osasto, section]);
+};
+
+export default useOsastoEvents;
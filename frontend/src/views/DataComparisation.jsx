@@ -37,12 +37,13 @@ const DataComparisation = () => {
             const response = await axios.post(`${API_URL}/api/efficiencyHistory`, {
                 weeks: selectedWeeks,
                 years: selectedYears,
+                items: false, // Only the weekly totals are charted
             });
 
             // Process the fetched data
             const fetchedData = response.data.map((entry) => ({
-                week: parseInt(entry.summary_name.match(/KokkolaEfficiency_(\d+)/)?.[1] || 0, 10),
-                year: new Date(entry.updated_at).getFullYear(),
+                week: entry.iso_week,
+                year: entry.iso_year,
                 efficiencyNow: parseFloat(entry['EFFICIENCY NOW'] || 0),
                 efficiencyTarget: parseFloat(entry['EFFICIENCY TARGET'] || 0),
                 viikonTyotunnit: parseFloat(entry['viikon_tyotunnit'] || 0),
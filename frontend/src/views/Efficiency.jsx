@@ -22,6 +22,7 @@ import {
 } from "@mui/material";
 import axios from "axios";
 import API_URL from "../api/config";
+import waitForJob from "../api/jobs";
 import { useTranslation } from "react-i18next";
 
 const Efficiency = () => {
@@ -78,7 +79,9 @@ const Efficiency = () => {
       const response = await axios.post(`${API_URL}/api/efficiency`, {
         weekly_hours: parseInt(weeklyHours),
       });
-      if (response.status === 200) {
+      if (response.status === 202) {
+        // The recompute runs as a background job on the server
+        await waitForJob(response.data.job_id);
         setSnackbarMessage("Weekly hours updated successfully");
         setSnackbarSeverity("success");
         fetchEfficiencySummary();
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useState } from 'react';
 import {
     Container,
     Typography,
@@ -25,6 +25,7 @@ import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import { useTranslation } from 'react-i18next';
 import API_URL from '../api/config.js';
+import useOsastoEvents from '../api/useOsastoEvents';
 import InfoIcon from '@mui/icons-material/Info';
 import phases from '../contexts/phases';
 
@@ -62,56 +63,36 @@ const Erkoispuoli = () => {
 
     axios.defaults.withCredentials = true;
 
-    const fetchData = (osasto) => {
-        setLoading(true);
-        axios.get(`${API_URL}/api/getOsasto${osasto}`, { withCredentials: true })
-            .then(response => {
-                setLoading(false);
-                console.log(`Response from backend for Osasto ${osasto}:`, response);
-    
-                let responseData = response.data;
-    
-                if (typeof responseData === 'string') {
-                    responseData = responseData.replace(/NaN/g, 'null');
-                    responseData = JSON.parse(responseData);
-                }
-    
-                if (Array.isArray(responseData)) {
-                    const cleanedData = responseData.map(row => ({
-                        Jononumero: row.Jononumero ? parseFloat(row.Jononumero) : null,
-                        "Item number": row["Item number"] ?? 'N/A',
-                        "Reference number": row["Reference number"] ?? 'N/A',
-                        "Quantity": row["Quantity"] ?? 'N/A',
-                        "object_id": row["_id"] ?? 'N/A',
-                        "Hygienialuokka": row["Hygienialuokka"] ?? '-',
-                        "StatusErikoispuoli": row["StatusErikoispuoli"] ?? 'Ei aloitettu',
-                        "total_madeErikoispuoli": row["total_madeErikoispuoli"] ?? '-',
-                        "section": osasto,
-                        "SOnumber" : row["Sales order"] ?? 'Ei ole',
-                        "Deliver remainder": row["Deliver remainder"] ?? 'Ei ole'
-                    }));
-                    console.log("Cleaned Data:", cleanedData);
-    
-                    // Sort the data by Jononumero in ascending order
-                    cleanedData.sort((a, b) => (a.Jononumero === null ? 1 : (b.Jononumero === null ? -1 : a.Jononumero - b.Jononumero)));
-    
-                    setData(cleanedData);
-                    setFilteredData(cleanedData);
-                } else {
-                    console.error('Expected an array but got:', typeof responseData);
-                    setData([]);
-                }
-            })
-            .catch(error => {
-                setLoading(false);
-                console.error(`Error fetching data for osasto ${osasto}:`, error);
-                setData([]);
-            });
+    // Map the raw department rows to table rows; fed by the live event stream
+    const showRows = (responseData, osasto) => {
+        if (Array.isArray(responseData)) {
+            const cleanedData = responseData.map(row => ({
+                Jononumero: row.Jononumero ? parseFloat(row.Jononumero) : null,
+                "Item number": row["Item number"] ?? 'N/A',
+                "Reference number": row["Reference number"] ?? 'N/A',
+                "Quantity": row["Quantity"] ?? 'N/A',
+                "object_id": row["_id"] ?? 'N/A',
+                "Hygienialuokka": row["Hygienialuokka"] ?? '-',
+                "StatusErikoispuoli": row["StatusErikoispuoli"] ?? 'Ei aloitettu',
+                "total_madeErikoispuoli": row["total_madeErikoispuoli"] ?? '-',
+                "section": osasto,
+                "SOnumber" : row["Sales order"] ?? 'Ei ole',
+                "Deliver remainder": row["Deliver remainder"] ?? 'Ei ole'
+            }));
+            console.log("Cleaned Data:", cleanedData);
+
+            // Sort the data by Jononumero in ascending order
+            cleanedData.sort((a, b) => (a.Jononumero === null ? 1 : (b.Jononumero === null ? -1 : a.Jononumero - b.Jononumero)));
+
+            setData(cleanedData);
+            setFilteredData(cleanedData);
+        } else {
+            console.error('Expected an array but got:', typeof responseData);
+            setData([]);
+        }
     };
     
-    useEffect(() => {
-        fetchData(selectedField); // Fetch data for the initial osasto value
-    }, [selectedField]); // Dependency ensures data refresh when osasto changes
+    useOsastoEvents(selectedField, 'Erikoispuoli', (rows) => showRows(rows, selectedField));
 
     const handleRowClick = (row) => { 
         navigate('/StartWork', { state: {...row, section: "Erikoispuoli" }});
@@ -120,7 +101,6 @@ const Erkoispuoli = () => {
     const handleFieldChange = (event) => {
         const selected = event.target.value;
         setSelectedField(selected);
-        fetchData(selected); // Dynamically fetch new osasto data
     };
 
     const handleHistory = (row) => {
@@ -218,7 +198,6 @@ const Erkoispuoli = () => {
                 setSnackbarSeverity("success");
                 setOpenModal(false); // Close the modal
                 setTotalMadeInput(''); // Clear the input field
-                fetchData(selectedField); // Refresh the data
             })
             .catch(error => {
                 setUpdating(false);
@@ -266,7 +245,6 @@ const Erkoispuoli = () => {
             setSnackbarSeverity("success");
             setIsEditing(false);
             setOpenModal(false); // Close the modal
-            fetchData(selectedField); // Refresh the data
         })
         .catch(error => {
             setUpdating(false);
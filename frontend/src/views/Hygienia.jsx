@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { useState } from 'react';
 import { 
     Container,
     Typography,
@@ -22,6 +22,7 @@ import axios from 'axios';
 import { useNavigate } from 'react-router-dom';
 import { useTranslation } from 'react-i18next';
 import API_URL from '../api/config.js';
+import useOsastoEvents from '../api/useOsastoEvents';
 import InfoIcon from '@mui/icons-material/Info';
 
 const Hygienia = () => {
@@ -46,53 +47,35 @@ const Hygienia = () => {
 
     axios.defaults.withCredentials = true;
 
-    const fetchData = (osasto) => {
-        setLoading(true);
-        axios.get(`${API_URL}/api/getOsasto${osasto}` , { withCredentials: true })
-            .then(response => {
-                setLoading(false);
-                console.log('Response:', response);
-                let responseData = response.data;
-                
-                if (typeof responseData === "string") {
-                    responseData = responseData.replace(/NaN/g, 'null');
-                    responseData = JSON.parse(responseData);
-                }
-                if (Array.isArray(responseData)) {
-                    const cleanedData = responseData.map(row => ({
-                        Jononumero: row.Jononumero ? parseFloat(row.Jononumero) : null,
-                        "Item number": row["Item number"] ?? 'N/A',
-                        "Reference number": row["Reference number"] ?? 'N/A',
-                        "Quantity": row["Quantity"] ?? 'N/A',
-                        "object_id": row["_id"] ?? 'N/A',
-                        "Hygienialuokka": row["Hygienialuokka"] ?? '-',
-                        "StatusHygienia": row["StatusHygienia"] ?? 'Ei aloitettu',
-                        "total_madeHygienia": row["total_madeHygienia"] ?? '-',
-                        "section": osasto,
-                        "SOnumber" : row["Sales order"] ?? "Ei ole",
-                        "Deliver remainder" : row["Deliver remainder"] ?? "Ei ole"
-                    }));
-                    console.log("Cleaned Data:", cleanedData);
+    // Map the raw department rows to table rows; fed by the live event stream
+    const showRows = (responseData, osasto) => {
+        if (Array.isArray(responseData)) {
+            const cleanedData = responseData.map(row => ({
+                Jononumero: row.Jononumero ? parseFloat(row.Jononumero) : null,
+                "Item number": row["Item number"] ?? 'N/A',
+                "Reference number": row["Reference number"] ?? 'N/A',
+                "Quantity": row["Quantity"] ?? 'N/A',
+                "object_id": row["_id"] ?? 'N/A',
+                "Hygienialuokka": row["Hygienialuokka"] ?? '-',
+                "StatusHygienia": row["StatusHygienia"] ?? 'Ei aloitettu',
+                "total_madeHygienia": row["total_madeHygienia"] ?? '-',
+                "section": osasto,
+                "SOnumber" : row["Sales order"] ?? "Ei ole",
+                "Deliver remainder" : row["Deliver remainder"] ?? "Ei ole"
+            }));
+            console.log("Cleaned Data:", cleanedData);
 
-                    // Sort the data by Jononumero in ascending order
-                    cleanedData.sort((a, b) => (a.Jononumero === null ? 1 : (b.Jononumero === null ? -1 : a.Jononumero - b.Jononumero)));
-                    setData(cleanedData);
-                    setFilteredData(cleanedData);
-                } else {
-                    console.error('Expected an array but got:', typeof responseData);
-                    setData([]); // Set data to an empty array if the response is not as expected
-                }
-            })
-            .catch(error => {
-                setLoading(false);
-                console.error('There was an error fetching the data!', error);
-                setData([]); // Set data to an empty array on error
-            });
+            // Sort the data by Jononumero in ascending order
+            cleanedData.sort((a, b) => (a.Jononumero === null ? 1 : (b.Jononumero === null ? -1 : a.Jononumero - b.Jononumero)));
+            setData(cleanedData);
+            setFilteredData(cleanedData);
+        } else {
+            console.error('Expected an array but got:', typeof responseData);
+            setData([]); // Set data to an empty array if the response is not as expected
+        }
     };
 
-    useEffect(() => {
-        fetchData(selectedField);
-    }, [selectedField]);
+    useOsastoEvents(selectedField, 'Hygienia', (rows) => showRows(rows, selectedField));
 
     const handleRowClick = (row) => {
         navigate('/StartWork', { state: {...row, section: "Hygienia" }});
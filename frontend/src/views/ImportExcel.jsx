@@ -5,6 +5,7 @@ import { readBinaryFile } from '@tauri-apps/api/fs';
 import axios from 'axios';
 import { useTranslation } from 'react-i18next';
 import API_URL from '../api/config.js';
+import waitForJob from '../api/jobs.js';
 
 const ImportExcel = () => {
     const [filePath, setFilePath] = useState('');
@@ -18,7 +19,7 @@ const ImportExcel = () => {
     const selectFile = async () => {
         try {
             const selectedFilePath = await open({
-                filters: [{ name: 'Excel Files', extensions: ['xlsx'] }]
+                filters: [{ name: 'Excel / CSV Files', extensions: ['xlsx', 'csv'] }]
             });
             if (selectedFilePath) {
                 setFilePath(selectedFilePath);
@@ -26,9 +27,10 @@ const ImportExcel = () => {
                 // Read the file as binary data
                 const fileData = await readBinaryFile(selectedFilePath);
                 const fileName = selectedFilePath.split('\\').pop();
-                const file = new File([new Uint8Array(fileData)], fileName, {
-                    type: 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-                });
+                const type = fileName.toLowerCase().endsWith('.csv')
+                    ? 'text/csv'
+                    : 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet';
+                const file = new File([new Uint8Array(fileData)], fileName, { type });
                 setFile(file); // Set the File object in state
             }
         } catch (error) {
@@ -55,10 +57,16 @@ const ImportExcel = () => {
                     'Content-Type': 'multipart/form-data'
                 }
             });
+            // The import runs as a background job on the server
+            const job = await waitForJob(response.data.job_id, {
+                onProgress: (progress) => setMessage(progress.message || ''),
+            });
+            setMessage('');
             setSnackbarMessage("File uploaded successfully");
             setSnackbarSeverity('success');
-            console.log(response.data);
+            console.log(job.result);
         } catch (error) {
+            setMessage('');
             setSnackbarMessage(`Error: ${error.response?.data?.error || error.message}`);
             setSnackbarSeverity('error');
         } finally {
@@ -322,7 +322,7 @@ const PlanningMasterModal = ({isOpen, onClose}) => {
                                             <TableCell sx={{ py: 1, width: '5%' }}>
                                                 {editRowIndex === index ? (
                                                     <TextField
-                                                        value={editedRow['Osasto']}
+                                                        value={editedRow['Osasto'] ?? ''}
                                                         onChange={(e) => handleInputChange(e, 'Osasto')}
                                                         fullWidth
                                                         size="small"
@@ -334,7 +334,7 @@ const PlanningMasterModal = ({isOpen, onClose}) => {
                                             <TableCell sx={{ py: 1, width: '5%' , backgroundColor: getJononumero(row['Jononumero']), color:'black'}}>
                                                 {editRowIndex === index ? (
                                                     <TextField
-                                                        value={editedRow['Jononumero']}
+                                                        value={editedRow['Jononumero'] ?? ''}
                                                         onChange={(e) => handleInputChange(e, 'Jononumero')}
                                                         fullWidth
                                                         size="small"
@@ -358,7 +358,7 @@ const PlanningMasterModal = ({isOpen, onClose}) => {
                                             <TableCell sx={{ py: 1, width: '5%' }}>
                                                 {editRowIndex === index ? (
                                                     <TextField
-                                                        value={editedRow['Quantity']}
+                                                        value={editedRow['Quantity'] ?? ''}
                                                         onChange={(e) => handleInputChange(e, 'Quantity')}
                                                         fullWidth
                                                         size="small"
@@ -1,8 +1,9 @@
-import React, {useState, useEffect} from 'react';
+import React, { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { useTranslation } from 'react-i18next';
 import axios from 'axios';
 import API_URL from '../api/config';
+import useOsastoEvents from '../api/useOsastoEvents';
 import { Container,Snackbar,Alert, Typography, Paper, Table, TableContainer, TableHead, TableRow, TableCell, TableBody, Button, Modal, Box, TextField, CircularProgress, FormControl, InputLabel, Select, MenuItem, } from '@mui/material';
 
 const Press = () => {
@@ -34,62 +35,41 @@ const Press = () => {
     const { t } = useTranslation(); // Initialize the t function for translations
 
 
-    const fetchData = (osasto) => {
-        setLoading(true);
-        axios.get(`${API_URL}/api/getOsasto${osasto}`)
-            .then(response => {
-                setLoading(false);
-                console.log(`Response from backend for Osasto ${osasto}:`, response);
-    
-                let responseData = response.data;
-    
-                if (typeof responseData === 'string') {
-                    responseData = responseData.replace(/NaN/g, 'null');
-                    responseData = JSON.parse(responseData);
-                }
-    
-                if (Array.isArray(responseData)) {
-                    const cleanedData = responseData.map(row => ({
-                        Jononumero: row.Jononumero ? parseFloat(row.Jononumero) : null,
-                        "Item number": row["Item number"] ?? 'N/A',
-                        "Reference number": row["Reference number"] ?? 'N/A',
-                        "Quantity": row["Quantity"] ?? 'N/A',
-                        "object_id": row["_id"] ?? 'N/A',
-                        "Hygienialuokka": row["Hygienialuokka"] ?? 'N/A',
-                        "StatusLeikkaus": row["StatusPress"] ?? 'Ei aloitettu',
-                        "total_made": row["total_made"] ?? '-',
-                        "section": osasto,
-                        "SOnumber": row["Sales order"] ?? 'Ei ole',
-                        "Deliver remainder": row["Deliver remainder"] ?? 'Ei ole',
-                    }));
-                    console.log("Cleaned Data:", cleanedData);
-    
-                    // Sort the data by Jononumero in ascending order
-                    cleanedData.sort((a, b) => (a.Jononumero === null ? 1 : (b.Jononumero === null ? -1 : a.Jononumero - b.Jononumero)));
-    
-                    setData(cleanedData);
-                    setFilteredData(cleanedData);
-                } else {
-                    console.error('Expected an array but got:', typeof responseData);
-                    setData([]);
-                }
-            })
-            .catch(error => {
-                setLoading(false);
-                console.error(`Error fetching data for osasto ${osasto}:`, error);
-                setData([]);
-            });
+    // Map the raw department rows to table rows; fed by the live event stream
+    const showRows = (responseData, osasto) => {
+        if (Array.isArray(responseData)) {
+            const cleanedData = responseData.map(row => ({
+                Jononumero: row.Jononumero ? parseFloat(row.Jononumero) : null,
+                "Item number": row["Item number"] ?? 'N/A',
+                "Reference number": row["Reference number"] ?? 'N/A',
+                "Quantity": row["Quantity"] ?? 'N/A',
+                "object_id": row["_id"] ?? 'N/A',
+                "Hygienialuokka": row["Hygienialuokka"] ?? 'N/A',
+                "StatusLeikkaus": row["StatusPress"] ?? 'Ei aloitettu',
+                "total_made": row["total_made"] ?? '-',
+                "section": osasto,
+                "SOnumber": row["Sales order"] ?? 'Ei ole',
+                "Deliver remainder": row["Deliver remainder"] ?? 'Ei ole',
+            }));
+            console.log("Cleaned Data:", cleanedData);
+
+            // Sort the data by Jononumero in ascending order
+            cleanedData.sort((a, b) => (a.Jononumero === null ? 1 : (b.Jononumero === null ? -1 : a.Jononumero - b.Jononumero)));
+
+            setData(cleanedData);
+            setFilteredData(cleanedData);
+        } else {
+            console.error('Expected an array but got:', typeof responseData);
+            setData([]);
+        }
     };
     
-    useEffect(() => {
-        fetchData(selectedField); // Fetch data for the initial osasto value
-    }, [selectedField]); // Dependency ensures data refresh when osasto changes
+    useOsastoEvents(selectedField, 'Press', (rows) => showRows(rows, selectedField));
 
 
     const handleFieldChange = (event) => {
         const selected = event.target.value;
         setSelectedField(selected);
-        fetchData(selected); // Dynamically fetch new osasto data
     };
 
     const handleRowClick = (row) => {
@@ -111,7 +91,6 @@ const Press = () => {
             })
             .then(response => {
                 console.log("Successfully updated total_made:", response.data);
-                fetchData(selectedField); // Refresh data after update
             })
             .catch(error => {
                 console.error("Error updating total_made:", error.response?.data?.error || error.message);
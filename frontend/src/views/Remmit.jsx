@@ -1,4 +1,4 @@
-import React, {useEffect, useState} from 'react';
+import React, { useState } from 'react';
 import {
     Container,
     Typography,
@@ -24,6 +24,7 @@ import {
 import axios from 'axios';
 import {useTranslation} from 'react-i18next';
 import API_URL from '../api/config';
+import useOsastoEvents from '../api/useOsastoEvents';
 import InfoIcon from '@mui/icons-material/Info';
 import {useNavigate} from 'react-router-dom';
 import phases from '../contexts/phases';
@@ -62,53 +63,36 @@ const Remmit = () => {
 
     axios.defaults.withCredentials = true;
 
-    const fetchData = (osasto) => {
-        setLoading(true);
-        axios.get(`${API_URL}/api/getOsasto${osasto}`,{wirthCredentials: true})    
-            .then((response) => {
-                setLoading(false);
-                let responseData = response.data;
-                if (typeof responseData === 'string') {
-                    responseData = responseData.replace(/NaN/g, 'null');
-                    responseData = JSON.parse(responseData);
-                }
-    
-                if (Array.isArray(responseData)) {
-                    const cleanedData = responseData.map(row => ({
-                        Jononumero: row.Jononumero ? parseFloat(row.Jononumero) : null,
-                        "Item number": row["Item number"] ?? 'N/A',
-                        "Reference number": row["Reference number"] ?? 'N/A',
-                        "Quantity": row["Quantity"] ?? 'N/A',
-                        "object_id": row["_id"] ?? 'N/A',
-                        "Hygienialuokka": row["Hygienialuokka"] ?? '-',
-                        "StatusRemmit": row["StatusRemmit"] ?? 'Ei aloitettu',
-                        "total_madeRemmit": row["total_madeRemmit"] ?? '-',
-                        "section": osasto,
-                        "SOnumber" : row["Sales order"] ?? 'Ei ole',
-                        "Deliver remainder": row["Deliver remainder"] ?? 'Ei ole'
-                    }));
-                    console.log("Cleaned Data:", cleanedData);
-    
-                    // Sort the data by Jononumero in ascending order
-                    cleanedData.sort((a, b) => (a.Jononumero === null ? 1 : (b.Jononumero === null ? -1 : a.Jononumero - b.Jononumero)));
-    
-                    setData(cleanedData);
-                    setFilteredData(cleanedData);
-                } else {
-                    console.error('Expected an array but got:', typeof responseData);
-                    setData([]);
-                }
-            })
-            .catch(error => {
-                setLoading(false);
-                console.error(`Error fetching data for osasto ${osasto}:`, error);
-                setData([]);
-            });
+    // Map the raw department rows to table rows; fed by the live event stream
+    const showRows = (responseData, osasto) => {
+        if (Array.isArray(responseData)) {
+            const cleanedData = responseData.map(row => ({
+                Jononumero: row.Jononumero ? parseFloat(row.Jononumero) : null,
+                "Item number": row["Item number"] ?? 'N/A',
+                "Reference number": row["Reference number"] ?? 'N/A',
+                "Quantity": row["Quantity"] ?? 'N/A',
+                "object_id": row["_id"] ?? 'N/A',
+                "Hygienialuokka": row["Hygienialuokka"] ?? '-',
+                "StatusRemmit": row["StatusRemmit"] ?? 'Ei aloitettu',
+                "total_madeRemmit": row["total_madeRemmit"] ?? '-',
+                "section": osasto,
+                "SOnumber" : row["Sales order"] ?? 'Ei ole',
+                "Deliver remainder": row["Deliver remainder"] ?? 'Ei ole'
+            }));
+            console.log("Cleaned Data:", cleanedData);
+
+            // Sort the data by Jononumero in ascending order
+            cleanedData.sort((a, b) => (a.Jononumero === null ? 1 : (b.Jononumero === null ? -1 : a.Jononumero - b.Jononumero)));
+
+            setData(cleanedData);
+            setFilteredData(cleanedData);
+        } else {
+            console.error('Expected an array but got:', typeof responseData);
+            setData([]);
+        }
     };
     
-    useEffect(() => {
-        fetchData(selectedField); // Fetch data for the initial osasto value
-    }, [selectedField]); // Dependency ensures data refresh when osasto changes
+    useOsastoEvents(selectedField, 'Remmit', (rows) => showRows(rows, selectedField));
 
     const handleRowClick = (row) => {
         navigate('/StartWork', {state: {...row, section: "Remmit"}})
@@ -218,7 +202,6 @@ const Remmit = () => {
                 setSnackbarSeverity("success");
                 setOpenModal(false); // Close the modal
                 setTotalMadeInput(''); // Clear the input field
-                fetchData(selectedField); // Refresh the data
             })
             .catch(error => {
                 setUpdating(false);
@@ -264,7 +247,6 @@ const Remmit = () => {
             setSnackbarSeverity("success");
             setIsEditing(false);
             setOpenModal(false); // Close the modal
-            fetchData(selectedField); // Refresh the data
         })
         .catch(error => {
             setUpdating(false);
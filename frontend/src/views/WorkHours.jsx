@@ -65,9 +65,22 @@ const WorkHours = () => {
     };
 
     const handleItemClick = (item) => {
-        setSelectedItem(item);
+        setSelectedItem({ ...item, Task: [] });
         setDialogOpen(true);
         console.log("Item clicked:", item);
+
+        // Tasks are no longer part of the listing; load them for the dialog
+        axios.post(`${API_URL}/api/fetch_history`, { id: item.object_id, section: item.section })
+            .then(response => {
+                setSelectedItem(current =>
+                    current && current.object_id === item.object_id
+                        ? { ...current, Task: response.data.tasks || [] }
+                        : current
+                );
+            })
+            .catch(err => {
+                console.error("Error fetching tasks:", err);
+            });
     };
 
     const handleDialogClose = () => {
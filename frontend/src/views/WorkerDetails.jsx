@@ -29,17 +29,20 @@ const WorkerTasks = () => {
     const navigate = useNavigate();
     const [workerName, setWorkerName] = useState(null);
     const [tasks, setTasks] = useState([]);
+    const [page, setPage] = useState(1);
+    const [total, setTotal] = useState(0);
     const [selectedTask, setSelectedTask] = useState(null); // Initialize as null
     const [openErrorDialog, setOpenErrorDialog] = useState(false); // Track error dialog state
     const { t } = useTranslation();
 
     axios.defaults.withCredentials = true;
-    const fetchWorkerTasks = () => {
+    // The server returns the newest tasks a page at a time
+    const fetchWorkerTasks = (nextPage = 1) => {
         if (!workerName) {
             console.error('Worker name is required!');
             return;
         }
-        const requestData = {workerName: workerName.label || workerName};
+        const requestData = {workerName: workerName.label || workerName, page: nextPage};
         axios.post(`${API_URL}/api/fetch_user_works`, requestData, {
             headers:
             {
@@ -48,8 +51,9 @@ const WorkerTasks = () => {
         })
             .then(response => {
                 if (response.data.tasks) {
-                    setTasks(response.data.tasks);
-                    console.log(tasks)
+                    setTasks(previous => nextPage === 1 ? response.data.tasks : [...previous, ...response.data.tasks]);
+                    setTotal(response.data.total);
+                    setPage(nextPage);
                 } else {
                     console.error('Expected an array but got', response.data);
                     setTasks([]);  // Fallback to an empty array if the response is not an array
@@ -225,7 +229,7 @@ const WorkerTasks = () => {
                     )}
                     sx={{ width: '300px', mr: 2 }}
                 />
-                <Button variant="contained" onClick={fetchWorkerTasks}>
+                <Button variant="contained" onClick={() => fetchWorkerTasks(1)}>
                     {t('search')}
                 </Button>
             </Box>
@@ -306,6 +310,13 @@ const WorkerTasks = () => {
                     </Table>
                 </TableContainer>
             </Paper>
+            {tasks.length < total && (
+                <Box sx={{ display: 'flex', justifyContent: 'center', mt: 1 }}>
+                    <Button onClick={() => fetchWorkerTasks(page + 1)}>
+                        {t('load_more')}
+                    </Button>
+                </Box>
+            )}
         </Container>
     );
 };